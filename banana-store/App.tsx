@@ -170,6 +170,9 @@ export default function App() {
 
       if (checkoutStatus === 'cancel') {
         clearQuery();
+        if (token) {
+          ShopApiService.cancelPayment(token).catch(() => undefined);
+        }
         alert('Payment was cancelled.');
         return;
       }
@@ -173,6 +173,8 @@ export const AdminPanel: React.FC<AdminPanelProps> = ({ products, setProducts, s
   const [inventoryTierId, setInventoryTierId] = useState('');
   const [inventoryKeysInput, setInventoryKeysInput] = useState('');
   const [inventoryBusy, setInventoryBusy] = useState(false);
+  const [inventoryFile, setInventoryFile] = useState<File | null>(null);
+  const [inventoryProgress, setInventoryProgress] = useState('');
   const [draft, setDraft] = useState<Product>(newProduct());
   const [featuresText, setFeaturesText] = useState('');
   const [detailsText, setDetailsText] = useState('');
@@ -459,6 +461,8 @@ export const AdminPanel: React.FC<AdminPanelProps> = ({ products, setProducts, s
     setInventoryProductId('');
     setInventoryTierId('');
     setInventoryKeysInput('');
+    setInventoryFile(null);
+    setInventoryProgress('');
   };
 
   const submitInventoryKeys = () => {
@@ -477,6 +481,28 @@ export const AdminPanel: React.FC<AdminPanelProps> = ({ products, setProducts, s
       }
     }
 
+    if (inventoryFile) {
+      const product = inventoryProduct;
+      setInventoryBusy(true);
+      setInventoryProgress('Uploading...');
+      ShopApiService.importInventory(product.id, inventoryFile, tierId || undefined, (progress) => {
+        setInventoryProgress(`Read ${progress.received} lines, added ${progress.added}, ${progress.duplicates} duplicates skipped`);
+      })
+        .then(async (result) => {
+          setProducts(await ShopApiService.getProducts());
+          const suffix = tierId ? ` [${tierId}]` : '';
+          const skipped = result.skipped ? `, ${result.skipped} lines skipped` : '';
+          setMessage(`Imported ${result.added} stock keys for ${product.name}${suffix} (${result.duplicates} duplicates${skipped}).`);
+          closeInventoryModal();
+        })
+        .catch((error) => {
+          console.error('Failed to import stock inventory:', error);
+          setMessage(error instanceof Error ? error.message : 'Failed to import stock inventory.');
+          setInventoryBusy(false);
+        });
+      return;
+    }
+
     const items = inventoryKeysInput
       .split('\n')
       .map((entry) => entry.trim())
@@ -1127,6 +1153,20 @@ export const AdminPanel: React.FC<AdminPanelProps> = ({ products, setProducts, s
                   Ready to add: <span className="font-semibold text-white">{inventoryItemsCount}</span> line(s)
                 </div>
               </div>
+
+              <div className="rounded-xl border border-[#facc15]/20 bg-[#090909] p-3">
+                <label className="mb-2 block text-sm font-bold">Or upload a file (.txt one key per line, or .csv with a key column)</label>
+                <input
+                  type="file"
+                  accept=".txt,.csv,text/plain,text/csv"
+                  onChange={(e) => setInventoryFile(e.target.files?.[0] || null)}
+                  className="text-xs text-yellow-200/80"
+                  disabled={inventoryBusy}
+                />
+                <div className="mt-2 text-xs text-yellow-200/70">
+                  Keys already in stock are skipped. {inventoryProgress}
+                </div>
+              </div>
             </div>
 
             <div className="flex items-center justify-end gap-2 border-t border-[#facc15]/20 p-4">
@@ -1144,7 +1184,7 @@ export const AdminPanel: React.FC<AdminPanelProps> = ({ products, setProducts, s
                 className={primaryButtonClass}
                 disabled={inventoryBusy}
               >
-                {inventoryBusy ? 'Adding...' : inventoryItemsCount > 0 ? `Add ${inventoryItemsCount} Key${inventoryItemsCount === 1 ? '' : 's'}` : 'Add Keys'}
+                {inventoryBusy ? 'Adding...' : inventoryFile ? `Import ${inventoryFile.name}` : inventoryItemsCount > 0 ? `Add ${inventoryItemsCount} Key${inventoryItemsCount === 1 ? '' : 's'}` : 'Add Keys'}
               </button>
             </div>
           </div>
@@ -22,6 +22,19 @@ const withTimeout = async (url: string, init: RequestInit): Promise<Response> =>
   }
 };
 
+export type InventoryImportProgress = {
+  ok: boolean;
+  done?: boolean;
+  message?: string;
+  received: number;
+  added: number;
+  duplicates: number;
+  skipped: number;
+  batches: number;
+  stock?: Record<string, number>;
+  unknownHolders?: string[];
+};
+
 type ProductPayload = Product & {
   original_price?: number;
   features_json?: string;
@@ -82,6 +95,17 @@ export const ShopApiService = {
     return products.map(normalizeProduct);
   },
 
+  async searchProducts(query: string, limit: number = 20): Promise<Product[]> {
+    const params = new URLSearchParams({ q: query, limit: String(limit) });
+    const response = await withTimeout(resolvePath(`/search?${params.toString()}`), {
+      method: 'GET',
+      headers: buildHeaders()
+    });
+    if (!response.ok) throw new Error(`Product search failed (${response.status})`);
+    const payload = await response.json() as { products?: ProductPayload[] };
+    return (payload.products || []).map(normalizeProduct);
+  },
+
   async getPaymentMethods(): Promise<{ card: { enabled: boolean; automated: boolean }; paypal: { enabled: boolean; automated: boolean }; crypto: { enabled: boolean; automated: boolean } }> {
     const response = await withTimeout(resolvePath('/payment-methods'), {
       method: 'GET',
@@ -167,6 +191,57 @@ export const ShopApiService = {
     };
   },
 
+  async importInventory(
+    productId: string,
+    file: Blob,
+    tierId?: string,
+    onProgress?: (progress: InventoryImportProgress) => void,
+  ): Promise<InventoryImportProgress> {
+    const query = new URLSearchParams({ productId });
+    if (tierId) query.set('tierId', tierId);
+    const isCsv = file.type === 'text/csv' || (file instanceof File && file.name.toLowerCase().endsWith('.csv'));
+    query.set('format', isCsv ? 'csv' : 'lines');
+    const headers: Record<string, string> = { 'Content-Type': isCsv ? 'text/csv' : 'text/plain' };
+    if (STORE_API_KEY) headers['x-api-key'] = STORE_API_KEY;
+    // No timeout: large files take a while, and the server reports progress after every batch.
+    const response = await fetch(`${resolvePath('/inventory/import')}?${query.toString()}`, {
+      method: 'POST',
+      headers,
+      body: file,
+      credentials: STORE_API_BASE_URL ? 'omit' : 'same-origin',
+    });
+    if (!response.ok || !response.body) {
+      let message = `Import inventory failed (${response.status})`;
+      try {
+        const payload = await response.json() as { message?: string };
+        if (payload.message) message = `${payload.message} (${response.status})`;
+      } catch {
+        // Keep generic error message.
+      }
+      throw new Error(message);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffered = '';
+    let last: InventoryImportProgress | null = null;
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (value) buffered += decoder.decode(value, { stream: true });
+      const lines = buffered.split('\n');
+      buffered = done ? '' : lines.pop() || '';
+      for (const line of lines) {
+        if (!line.trim()) continue;
+        last = JSON.parse(line) as InventoryImportProgress;
+        if (!last.ok) throw new Error(last.message || 'Import inventory failed');
+        onProgress?.(last);
+      }
+      if (done) break;
+    }
+    if (!last || !last.done) throw new Error('Import ended before the server finished.');
+    return last;
+  },
+
   async buy(order: Order, user: User | null, paymentMethod: string, paymentVerified: boolean = false): Promise<{ ok: boolean; products?: Product[]; orderId?: string; order?: Order }> {
     const response = await withTimeout(resolvePath('/buy'), {
       method: 'POST',
@@ -232,11 +307,46 @@ export const ShopApiService = {
       }
       throw new Error(message);
     }
+    if (response.status === 202) {
+      // Payment verified; keys are still being delivered by the fulfilment queue.
+      return this.waitForPayment(token);
+    }
     const payload = await response.json() as { ok: boolean; order?: Order; products?: ProductPayload[] };
     return {
       ok: Boolean(payload.ok),
       order: payload.order,
       products: payload.products ? payload.products.map(normalizeProduct) : undefined,
     };
+  },
+
+  async cancelPayment(token: string): Promise<void> {
+    // Releases the keys held for this checkout; the hold also lapses on its own when the payment expires.
+    await withTimeout(resolvePath('/payments/cancel'), {
+      method: 'POST',
+      headers: buildHeaders(),
+      body: JSON.stringify({ token }),
+    });
+  },
+
+  async waitForPayment(token: string, maxAttempts: number = 30, delayMs: number = 2000): Promise<{ ok: boolean; order?: Order; products?: Product[] }> {
+    for (let attempt = 0; attempt < maxAttempts; attempt++) {
+      await new Promise((resolve) => setTimeout(resolve, delayMs));
+      const response = await withTimeout(resolvePath(`/payments/${encodeURIComponent(token)}/status`), {
+        method: 'GET',
+        headers: buildHeaders(),
+      });
+      const payload = await response.json() as { ok: boolean; status?: string; message?: string; order?: Order; products?: ProductPayload[] };
+      if (!response.ok) {
+        throw new Error(payload.message ? `${payload.message} (${response.status})` : `Payment status request failed (${response.status})`);
+      }
+      if (payload.status === 'completed') {
+        return {
+          ok: true,
+          order: payload.order,
+          products: payload.products ? payload.products.map(normalizeProduct) : undefined,
+        };
+      }
+    }
+    throw new Error('Payment confirmed but delivery is still processing. Open Account > Member Vault shortly to view your keys.');
   }
 };
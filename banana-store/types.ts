@@ -13,6 +13,7 @@ export interface ProductTier {
   price: number;
   originalPrice?: number;
   stock: number;
+  reserved?: number;
   image?: string;
   duration?: string;
 }
@@ -40,6 +41,7 @@ export interface Product {
   popular?: boolean;
   featured?: boolean;
   stock: number;
+  reserved?: number;
   verified?: boolean;
   instantDelivery?: boolean;
   tiers?: ProductTier[];
@@ -0,0 +1,329 @@
+"""Load test for the website bridge API.
+
+Boots WebsiteBridgeServer in API-only mode against a freshly seeded store, points Stripe and OxaPay at
+local stub servers, then drives the shop endpoints at a fixed concurrency and reports latency
+percentiles, throughput and errors per endpoint.
+
+    python bench_api.py                                  # JSON store in a temp dir
+    python bench_api.py --backend supabase --db-url postgresql://localhost/bench
+    python bench_api.py --requests 5000 --concurrency 64 --output bench_output.txt
+
+The Postgres run uses tables prefixed with ``bench_`` and truncates them first.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import secrets
+import socket
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable
+
+from aiohttp import ClientSession, TCPConnector, web
+
+
+class _ApiOnlyBot:
+    guilds = []
+
+    def get_channel(self, channel_id):
+        return None
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _start_gateway_stubs(port: int, latency: float) -> web.AppRunner:
+    """Minimal Stripe checkout-session and OxaPay merchant endpoints that always report a paid order."""
+    stripe_sessions: dict[str, str] = {}
+
+    async def stripe_create(request: web.Request) -> web.Response:
+        await asyncio.sleep(latency)
+        form = await request.post()
+        session_id = f"cs_bench_{secrets.token_hex(8)}"
+        stripe_sessions[session_id] = str(form.get("metadata[token]", ""))
+        return web.json_response({"id": session_id, "url": f"https://checkout.invalid/{session_id}"})
+
+    async def stripe_get(request: web.Request) -> web.Response:
+        await asyncio.sleep(latency)
+        session_id = request.match_info["session_id"]
+        token = stripe_sessions.get(session_id)
+        if token is None:
+            return web.json_response({"error": {"message": "no such session"}}, status=404)
+        return web.json_response({"id": session_id, "payment_status": "paid", "metadata": {"token": token}})
+
+    async def oxapay_request(request: web.Request) -> web.Response:
+        await asyncio.sleep(latency)
+        track_id = secrets.token_hex(6)
+        return web.json_response({"result": 100, "trackId": track_id, "payLink": f"https://pay.invalid/{track_id}"})
+
+    async def oxapay_inquiry(request: web.Request) -> web.Response:
+        await asyncio.sleep(latency)
+        return web.json_response({"result": 100, "status": "Paid"})
+
+    app = web.Application()
+    app.router.add_post("/v1/checkout/sessions", stripe_create)
+    app.router.add_get("/v1/checkout/sessions/{session_id}", stripe_get)
+    app.router.add_post("/merchants/request", oxapay_request)
+    app.router.add_post("/merchants/inquiry", oxapay_inquiry)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+def _seed_products(product_count: int, tiers_per_product: int, keys_per_tier: int) -> list[dict[str, Any]]:
+    products = []
+    for product_index in range(product_count):
+        product_id = f"bench-{product_index}"
+        tiers = [
+            {
+                "id": f"{product_id}-tier-{tier_index}",
+                "name": f"Tier {tier_index}",
+                "price": 4.99 + tier_index,
+                "inventory": [f"{product_id}-{tier_index}-KEY-{key:07d}" for key in range(keys_per_tier)],
+            }
+            for tier_index in range(tiers_per_product)
+        ]
+        products.append({"id": product_id, "name": f"Bench Product {product_index}", "price": 4.99, "tiers": tiers})
+    return products
+
+
+class _Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+        self.elapsed: dict[str, float] = {}
+
+    def add(self, name: str, seconds: float, ok: bool) -> None:
+        self.latencies.setdefault(name, []).append(seconds)
+        if not ok:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+class _Driver:
+    def __init__(self, session: ClientSession, base_url: str, api_key: str, products: list[dict[str, Any]], recorder: _Recorder):
+        self.session = session
+        self.base_url = base_url
+        self.headers = {"x-api-key": api_key}
+        self.products = products
+        self.recorder = recorder
+
+    async def _call(self, name: str, method: str, path: str, payload: Any = None) -> dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            async with self.session.request(method, f"{self.base_url}{path}", json=payload, headers=self.headers) as response:
+                body = await response.json(content_type=None) if response.status != 304 else {}
+                ok = response.status < 400
+        except Exception:
+            body, ok = {}, False
+        self.recorder.add(name, time.perf_counter() - started, ok)
+        return body if isinstance(body, dict) else {}
+
+    def _order(self, index: int) -> dict[str, Any]:
+        product = self.products[index % len(self.products)]
+        tier = product["tiers"][(index // len(self.products)) % len(product["tiers"])]
+        return {
+            "id": f"bench-{secrets.token_hex(8)}",
+            "total": tier["price"],
+            "items": [
+                {
+                    "id": f"{product['id']}::{tier['id']}",
+                    "productId": product["id"],
+                    "tierId": tier["id"],
+                    "name": product["name"],
+                    "price": tier["price"],
+                    "quantity": 1,
+                }
+            ],
+        }
+
+    async def products_list(self, index: int) -> None:
+        await self._call("GET /shop/products", "GET", "/shop/products")
+
+    async def buy(self, index: int) -> None:
+        await self._call("POST /shop/buy", "POST", "/shop/buy", {"order": self._order(index), "paymentMethod": "paypal"})
+
+    async def card_checkout(self, index: int) -> None:
+        created = await self._call(
+            "POST /shop/payments/create (card)",
+            "POST",
+            "/shop/payments/create",
+            {"order": self._order(index), "paymentMethod": "card"},
+        )
+        if created.get("token"):
+            await self._call(
+                "POST /shop/payments/confirm (card)",
+                "POST",
+                "/shop/payments/confirm",
+                {"token": created["token"], "sessionId": created.get("sessionId", ""), "paymentMethod": "card"},
+            )
+
+    async def crypto_checkout(self, index: int) -> None:
+        created = await self._call(
+            "POST /shop/payments/create (crypto)",
+            "POST",
+            "/shop/payments/create",
+            {"order": self._order(index), "paymentMethod": "crypto"},
+        )
+        if created.get("token"):
+            await self._call(
+                "POST /shop/payments/confirm (crypto)",
+                "POST",
+                "/shop/payments/confirm",
+                {"token": created["token"], "trackId": created.get("trackId", ""), "paymentMethod": "crypto"},
+            )
+
+
+async def _run_scenario(name: str, action: Callable[[int], Awaitable[None]], requests: int, concurrency: int, recorder: _Recorder) -> None:
+    counter = iter(range(requests))
+
+    async def worker() -> None:
+        for index in counter:
+            await action(index)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    recorder.elapsed[name] = time.perf_counter() - started
+
+
+def _report(recorder: _Recorder, args: argparse.Namespace) -> str:
+    lines = [
+        f"backend={args.backend} requests={args.requests} concurrency={args.concurrency} "
+        f"products={args.products}x{args.tiers} keys/tier={args.keys} gateway_latency={args.gateway_latency_ms}ms",
+        f"{'endpoint':<38}{'count':>7}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}",
+    ]
+    for name, values in recorder.latencies.items():
+        ordered = sorted(values)
+        lines.append(
+            f"{name:<38}{len(ordered):>7}{recorder.errors.get(name, 0):>8}"
+            f"{_percentile(ordered, 0.50) * 1000:>9.2f}{_percentile(ordered, 0.95) * 1000:>9.2f}"
+            f"{_percentile(ordered, 0.99) * 1000:>9.2f}{ordered[-1] * 1000:>9.2f}"
+        )
+    lines.append("")
+    for scenario, seconds in recorder.elapsed.items():
+        lines.append(f"{scenario:<38}{args.requests / seconds:>10.1f} flows/s  ({seconds:.2f}s)")
+    return "\n".join(lines)
+
+
+async def _main(args: argparse.Namespace) -> int:
+    api_port = _free_port()
+    stub_port = _free_port()
+    stub_url = f"http://127.0.0.1:{stub_port}"
+    api_key = secrets.token_hex(16)
+    data_dir = tempfile.mkdtemp(prefix="bench-shop-")
+
+    # The bridge reads its configuration from the environment when it is constructed.
+    os.environ.update(
+        {
+            "BOT_API_HOST": "127.0.0.1",
+            "BOT_API_PORT": str(api_port),
+            "BOT_API_KEY": api_key,
+            "BOT_API_KEY_HEADER": "x-api-key",
+            "SHOP_DATA_DIR": data_dir,
+            "SHOP_STORAGE_BACKEND": args.backend,
+            "SHOP_TABLE_PREFIX": "bench_",
+            "STRIPE_SECRET_KEY": "sk_test_bench",
+            "STRIPE_API_URL": stub_url,
+            "OXAPAY_MERCHANT_API_KEY": "bench",
+            "OXAPAY_API_URL": stub_url,
+            "OXAPAY_MIN_AMOUNT": "0.01",
+            # Every simulated buyer shares one address; per-client limits would throttle the run itself.
+            "SHOP_RATE_LIMITS": "off",
+        }
+    )
+    if args.backend == "supabase":
+        if not args.db_url:
+            print("--db-url (or DATABASE_URL) is required for the supabase backend", file=sys.stderr)
+            return 2
+        os.environ["DATABASE_URL"] = args.db_url
+    else:
+        os.environ.pop("DATABASE_URL", None)
+        os.environ.pop("SUPABASE_DATABASE_URL", None)
+
+    from src.services.http_client import http_client
+    from src.services.web_bridge import WebsiteBridgeServer
+    from src.utils.logger import logger
+
+    if not args.verbose:
+        logger.setLevel(logging.ERROR)
+
+    stubs = await _start_gateway_stubs(stub_port, args.gateway_latency_ms / 1000)
+    server = WebsiteBridgeServer(_ApiOnlyBot(), send_order_logs=False)
+    await server.start()
+    if args.backend == "supabase" and server.storage.backend_name != "supabase":
+        print("Postgres storage failed to initialize; see the log above", file=sys.stderr)
+        await server.stop()
+        await stubs.cleanup()
+        return 1
+
+    try:
+        if server.pg_pool is not None:
+            await server.pg_pool.execute(
+                "TRUNCATE bench_products, bench_product_tiers, bench_inventory_items, bench_inventory_counts, "
+                "bench_orders, bench_order_events, bench_pending_payments, bench_pending_payments_archive CASCADE"
+            )
+        products = _seed_products(args.products, args.tiers, args.keys)
+        for product in products:
+            await server.storage.save_product(server._normalize_product(product))
+
+        recorder = _Recorder()
+        connector = TCPConnector(limit=args.concurrency)
+        async with ClientSession(connector=connector) as session:
+            driver = _Driver(session, f"http://127.0.0.1:{api_port}", api_key, products, recorder)
+            scenarios = {
+                "products": driver.products_list,
+                "buy": driver.buy,
+                "card": driver.card_checkout,
+                "crypto": driver.crypto_checkout,
+            }
+            for scenario in args.scenarios:
+                await _run_scenario(scenario, scenarios[scenario], args.requests, args.concurrency, recorder)
+
+        report = _report(recorder, args)
+        print(report)
+        if args.output:
+            with open(args.output, "a", encoding="utf-8") as handle:
+                handle.write(f"# {time.strftime('%Y-%m-%d %H:%M:%S')}\n{report}\n\n")
+        return 1 if any(recorder.errors.values()) else 0
+    finally:
+        await server.stop()
+        await http_client.close()
+        await stubs.cleanup()
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load test the website bridge API.")
+    parser.add_argument("--backend", choices=["json", "supabase"], default="json")
+    parser.add_argument("--db-url", default=os.getenv("DATABASE_URL") or os.getenv("SUPABASE_DATABASE_URL") or "")
+    parser.add_argument("--requests", type=int, default=1000, help="flows per scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--products", type=int, default=4)
+    parser.add_argument("--tiers", type=int, default=3, help="tiers per product")
+    parser.add_argument("--keys", type=int, default=2000, help="stock keys seeded per tier")
+    parser.add_argument("--gateway-latency-ms", type=float, default=0.0, help="artificial delay in the Stripe/OxaPay stubs")
+    parser.add_argument(
+        "--scenarios",
+        nargs="+",
+        choices=["products", "buy", "card", "crypto"],
+        default=["products", "buy", "card", "crypto"],
+    )
+    parser.add_argument("--output", default="", help="append the report to this file (e.g. bench_output.txt)")
+    parser.add_argument("--verbose", action="store_true", help="keep the bridge's info/warning logging")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(_main(_parse_args())))
@@ -0,0 +1,151 @@
+"""Micro-benchmark for transcript rendering.
+
+Renders a synthetic ticket channel (stand-in message objects, no Discord connection) and reports the
+markdown renderer's throughput with a cold and a warm cache, then the full transcript build.
+
+    python bench_transcript.py                      # 10k messages
+    python bench_transcript.py --messages 50000 --output bench_output.txt
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import discord
+
+from src.services import transcript_service
+from src.services.transcript_service import generate_transcript, parse_markdown_basic
+
+# Typical ticket traffic: short replies that repeat a lot, bot embeds, and a few long formatted messages.
+_CONTENT = [
+    "hello",
+    "ok",
+    "thanks!",
+    "any update on my order?",
+    "I paid with **crypto**, order id is `ORD-{n}`",
+    "Please send proof of payment to <@{user}> in <#{channel}>",
+    "*Waiting* for the __owner__ to reply, ~~ETA 5 min~~ ETA <t:{unix}:R>",
+    "Key does not work: ```\nXXXX-{n}-YYYY-ZZZZ\nerror: invalid license\n```",
+    "See the guide: [how to redeem](https://robloxkeys.store/guide) and **read _all_ steps**",
+    "Replaced, new key below **__DO NOT SHARE__**\n`KEY-{n}`\nThanks for your patience <@&{role}>",
+]
+
+
+class _Channel:
+    def __init__(self, messages: list[SimpleNamespace]):
+        self.messages = messages
+        self.name = "ticket-0001"
+        self.id = 1200000000000000000
+        self.created_at = messages[0].created_at if messages else datetime.now(timezone.utc)
+        self.guild = SimpleNamespace(name="Bench Guild", id=1100000000000000000, icon=None)
+
+    async def history(self, limit=None, oldest_first=True):
+        for message in self.messages[:limit]:
+            yield message
+
+
+def _synthetic_messages(count: int, seed: int) -> list[SimpleNamespace]:
+    rng = random.Random(seed)
+    authors = [
+        SimpleNamespace(
+            id=1000000000000000000 + index,
+            name=f"user{index}",
+            display_name=f"User {index}",
+            bot=index == 0,
+            color=discord.Colour(0x5865F2),
+            display_avatar=SimpleNamespace(url=f"https://cdn.discordapp.com/embed/avatars/{index % 5}.png"),
+        )
+        for index in range(8)
+    ]
+    moment = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    messages = []
+    for index in range(count):
+        moment += timedelta(seconds=rng.choice((3, 20, 90, 900)))
+        template = rng.choice(_CONTENT)
+        # Half the messages carry a per-message value, so the cache sees both repeats and unique text.
+        n = index if rng.random() < 0.5 else index % 20
+        messages.append(
+            SimpleNamespace(
+                id=1300000000000000000 + index,
+                type=discord.MessageType.default,
+                author=rng.choice(authors),
+                content=template.format(n=n, user=authors[1].id, channel=1200000000000000000, role=42, unix=1790000000),
+                edited_at=None,
+                embeds=[],
+                attachments=[],
+                stickers=[],
+                components=[],
+                reactions=[],
+                reference=None,
+                created_at=moment,
+            )
+        )
+    return messages
+
+
+def _time_markdown(contents: list[str]) -> float:
+    started = time.perf_counter()
+    for content in contents:
+        parse_markdown_basic(content)
+    return time.perf_counter() - started
+
+
+async def _main(args: argparse.Namespace) -> str:
+    messages = _synthetic_messages(args.messages, args.seed)
+    contents = [message.content for message in messages]
+    chars = sum(len(content) for content in contents)
+
+    transcript_service._render_markdown_cached.cache_clear()
+    cold = _time_markdown(contents)
+    warm = _time_markdown(contents)
+    uncached_started = time.perf_counter()
+    for content in contents:
+        transcript_service._render_markdown(content)
+    uncached = time.perf_counter() - uncached_started
+    cache_info = transcript_service._render_markdown_cached.cache_info()
+
+    transcript_service._render_markdown_cached.cache_clear()
+    started = time.perf_counter()
+    transcript = await generate_transcript(_Channel(messages))
+    build = time.perf_counter() - started
+    size = transcript.size
+    transcript.close()
+
+    # Traced separately: tracemalloc slows allocation-heavy code down several times.
+    transcript_service._render_markdown_cached.cache_clear()
+    tracemalloc.start()
+    (await generate_transcript(_Channel(messages))).close()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    lines = [
+        f"transcript benchmark: {args.messages} messages, {chars / 1e6:.2f}M chars of content",
+        f"{'markdown, cold cache':<28}{cold * 1000:>10.1f} ms  {args.messages / cold:>12,.0f} msg/s",
+        f"{'markdown, warm cache':<28}{warm * 1000:>10.1f} ms  {args.messages / warm:>12,.0f} msg/s",
+        f"{'markdown, no cache':<28}{uncached * 1000:>10.1f} ms  {args.messages / uncached:>12,.0f} msg/s",
+        f"{'cache':<28}{cache_info.hits} hits, {cache_info.misses} misses, {cache_info.currsize} entries",
+        f"{'full transcript':<28}{build * 1000:>10.1f} ms  {args.messages / build:>12,.0f} msg/s",
+        f"{'output':<28}{size / 1e6:>10.2f} MB  peak traced memory {peak / 1e6:.1f} MB",
+    ]
+    return "\n".join(lines)
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark transcript rendering on a synthetic channel.")
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default="", help="append the report to this file (e.g. bench_output.txt)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    report = asyncio.run(_main(args))
+    print(report)
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as handle:
+            handle.write(report + "\n\n")
@@ -1,31 +1,177 @@
+import argparse
 import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+from multiprocessing.synchronize import Event
+from typing import Optional
+
+import discord
 from dotenv import load_dotenv
 
 load_dotenv()
 
+from src.services.http_client import http_client
 from src.services.web_bridge import WebsiteBridgeServer
 from src.utils.logger import logger
 
+# A worker that dies sooner than this after starting is restarted only once this much time has passed.
+_RESTART_BACKOFF_SECONDS = 5.0
+
 
 class _ApiOnlyBot:
+    """Stands in for the Discord bot. Logged in with a token it can still post to channels over the REST API."""
+
     guilds = []
 
+    def __init__(self):
+        self._client: Optional[discord.Client] = None
+
+    @property
+    def logged_in(self) -> bool:
+        return self._client is not None
+
+    async def login(self, token: str) -> None:
+        client = discord.Client(intents=discord.Intents.none())
+        try:
+            await client.login(token)
+        except BaseException:
+            await client.close()
+            raise
+        self._client = client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
     def get_channel(self, channel_id):
-        return None
+        if self._client is None:
+            return None
+        return self._client.get_partial_messageable(channel_id)
 
 
-async def _run() -> None:
-    server = WebsiteBridgeServer(_ApiOnlyBot())
-    await server.start()
-    logger.info("API-only mode active (Discord bot is not connected).")
+async def _run(reuse_port: bool = False, ready: Optional[Event] = None, primary: bool = True) -> None:
+    # Only the primary worker sends order logs and resumes queued fulfilments, so the others do not race it.
+    bot = _ApiOnlyBot()
+    token = (os.getenv("DISCORD_TOKEN") or "").strip()
+    if primary and token:
+        try:
+            await bot.login(token)
+        except Exception as exc:
+            logger.error(f"Discord login for order logs failed: {exc}")
+    # Without a Discord login, order logs are left in the shared store for the bot (BOT_API_MODE=external).
+    server = WebsiteBridgeServer(
+        bot, reuse_port=reuse_port, send_order_logs=bot.logged_in, resume_fulfilment=primary
+    )
+    try:
+        await server.start()
+    except BaseException:
+        await bot.close()
+        raise
+    logger.info(f"API-only mode active (Discord gateway is not connected, pid {os.getpid()}, primary={primary}).")
+    if ready is not None:
+        ready.set()
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stopped.set)
+        except (NotImplementedError, RuntimeError):
+            # Windows: Ctrl+C still interrupts asyncio.run and the finally block below runs.
+            pass
     try:
-        while True:
-            await asyncio.sleep(3600)
-    except KeyboardInterrupt:
-        pass
+        await stopped.wait()
     finally:
         await server.stop()
+        await bot.close()
+        await http_client.close()
+
+
+def _serve_worker(ready: Event, primary: bool) -> None:
+    try:
+        asyncio.run(_run(reuse_port=True, ready=ready, primary=primary))
+    except RuntimeError as exc:
+        logger.critical(f"API worker failed to start: {exc}")
+        sys.exit(1)
+
+
+def _supervise(workers: int) -> int:
+    context = multiprocessing.get_context("spawn")
+    processes: dict[int, multiprocessing.process.BaseProcess] = {}
+    started_at: dict[int, float] = {}
+    stopping = False
+
+    def spawn(slot: int) -> Event:
+        ready = context.Event()
+        process = context.Process(target=_serve_worker, args=(ready, slot == 0), name=f"api-worker-{slot}")
+        process.start()
+        processes[slot] = process
+        started_at[slot] = time.monotonic()
+        return ready
+
+    def request_stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    # The first worker has to come up on the shared Postgres storage before any other worker may open the store.
+    first_ready = spawn(0)
+    while not first_ready.wait(0.5):
+        if stopping or not processes[0].is_alive():
+            processes[0].join(timeout=15)
+            if not stopping:
+                logger.critical("The first API worker could not start on shared storage; not starting the others.")
+            return 0 if stopping else 1
+    for slot in range(1, workers):
+        spawn(slot)
+    logger.info(f"Started {workers} API workers sharing port {os.getenv('BOT_API_PORT') or os.getenv('PORT') or '8080'}.")
+
+    try:
+        while not stopping:
+            time.sleep(1)
+            for slot, process in list(processes.items()):
+                if process.is_alive() or stopping:
+                    continue
+                if time.monotonic() - started_at[slot] < _RESTART_BACKOFF_SECONDS:
+                    continue
+                logger.warning(f"API worker {slot} (pid {process.pid}) exited with code {process.exitcode}; restarting.")
+                spawn(slot)
+    finally:
+        for process in processes.values():
+            if process.is_alive():
+                process.terminate()
+        for process in processes.values():
+            process.join(timeout=15)
+    return 0
+
+
+def _worker_count(requested: int) -> int:
+    if requested <= 1:
+        return 1
+    if not hasattr(socket, "SO_REUSEPORT"):
+        logger.warning("This platform has no SO_REUSEPORT; running a single API worker.")
+        return 1
+    # Whether the storage is shared is only known once the first worker has opened it (see _supervise).
+    return requested
 
 
 if __name__ == "__main__":
-    asyncio.run(_run())
+    parser = argparse.ArgumentParser(description="Run the website bridge API without the Discord bot.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("BOT_API_WORKERS") or 1),
+        help="API worker processes sharing the port (default BOT_API_WORKERS or 1)",
+    )
+    args = parser.parse_args()
+    workers = _worker_count(args.workers)
+    if workers == 1:
+        asyncio.run(_run())
+    else:
+        sys.exit(_supervise(workers))
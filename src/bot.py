@@ -8,6 +8,9 @@ from .utils.logger import logger
 from .utils.constants import Emojis, Colors
 from .utils.components_v2 import patch_components_v2
 from .services.database import init_db
+from .services.http_client import http_client
+from .services.transcript_capture import transcript_capture
+from .services.transcript_jobs import transcript_jobs
 from .services.web_bridge import WebsiteBridgeServer
 
 class RobloxKeysBot(commands.Bot):
@@ -41,10 +44,11 @@ class RobloxKeysBot(commands.Bot):
             logger.critical(f"{Emojis.ERROR} Database failed to initialize: {e}")
             sys.exit(1)
 
-        # 2. Start website bridge API
+        # 2. Start website bridge API ("external": API workers run via run_api_only.py, the bot only sends their order logs)
         try:
+            api_mode = (os.getenv("BOT_API_MODE") or "embedded").strip().lower()
             self.website_bridge = WebsiteBridgeServer(self)
-            await self.website_bridge.start()
+            await self.website_bridge.start(serve_http=api_mode != "external")
             logger.info(f"{Emojis.SUCCESS} Website bridge started.")
         except Exception as e:
             logger.error(f"{Emojis.ERROR} Website bridge failed to start: {e}")
@@ -130,6 +134,9 @@ class RobloxKeysBot(commands.Bot):
         if self.website_bridge is not None:
             await self.website_bridge.stop()
             self.website_bridge = None
+        await transcript_jobs.stop()
+        await transcript_capture.flush()
+        await http_client.close()
         await super().close()
 
 bot = RobloxKeysBot()
@@ -3,7 +3,6 @@ from discord import app_commands, ui
 from discord.ext import commands
 import asyncio
 import re
-import aiohttp
 from typing import Optional, Literal
 from ..utils.base_cog import BaseCog
 from ..utils.embeds import EmbedUtils
@@ -20,13 +19,18 @@ from ..utils.v2_builders import (
     send_v2_message
 )
 from ..services.database import Ticket, GuildConfig
-from ..services.transcript_service import generate_transcript
+from ..services.transcript_capture import transcript_capture
+from ..services.transcript_jobs import transcript_jobs
+from ..services.http_client import http_client
 from tortoise.transactions import in_transaction
 from ..utils.logger import logger
 
 SERVER_LOGO = "https://media.discordapp.net/attachments/1461045644813668534/1461046354204954868/71ad111fcd062061bd30cde4b0230285.png?ex=696920f3&is=6967cf73&hm=23d85a81aad0f8541bef4818e9fd6bec179cd1caf99c47b0d61366664df48f99&=&format=webp&quality=lossless"
 SERVER_BANNER = "https://media.discordapp.net/attachments/1461045644813668534/1461046165796552774/ChatGPT_Image_Jan_14_2026_11_38_25_AM.png?ex=696920c6&is=6967cf46&hm=c5411333a91339cf355a1f64d723e131b81e676aec7a1038ab07b0f038070c38&=&format=webp&quality=lossless&width=1249&height=499"
 
+# Keeps the delayed channel deletions of closed tickets referenced until they finish.
+_closing_tasks: set[asyncio.Task] = set()
+
 class TicketPanelSelect(discord.ui.Select):
     def __init__(self, emoji_map: Optional[dict[str, discord.Emoji]] = None):
         def _emoji(name: str, fallback: str):
@@ -308,7 +312,7 @@ class TicketControlView(discord.ui.LayoutView):
 
     async def _close_callback(self, interaction: discord.Interaction):
         await interaction.response.defer()
-        await Tickets.close_ticket(interaction.channel, interaction.user)
+        await Tickets.close_ticket(interaction.channel, interaction.user, interaction)
 
     async def _claim_callback(self, interaction: discord.Interaction):
         await Tickets.claim_ticket(interaction)
@@ -382,6 +386,59 @@ class Tickets(BaseCog):
             # Note: TicketControlView is dynamic and created per-ticket, not persistent
             self.bot.persistent_views_added = True
 
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # Pick the open tickets' transcript journals back up and fill in what was posted while offline.
+        open_channel_ids = await Ticket.filter(status="OPEN").values_list("channel_id", flat=True)
+        await transcript_capture.resume(int(channel_id) for channel_id in open_channel_ids)
+        for channel_id in list(transcript_capture.tracked):
+            channel = self.bot.get_channel(channel_id)
+            if channel is None:
+                continue
+            try:
+                await transcript_capture.catch_up(channel)
+            except Exception as e:
+                logger.warning(f"Transcript catch-up failed for {channel_id}: {e}")
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        if message.channel.id not in transcript_capture.tracked:
+            return
+        try:
+            transcript_capture.record(message)
+        except Exception as e:
+            logger.error(f"Failed to capture message {message.id}: {e}")
+
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        if payload.channel_id not in transcript_capture.tracked:
+            return
+        try:
+            message = getattr(payload, "message", None)
+            if message is None:
+                channel = self.bot.get_channel(payload.channel_id)
+                if channel is None:
+                    return
+                message = await channel.fetch_message(payload.message_id)
+            transcript_capture.record(message)
+        except Exception as e:
+            logger.error(f"Failed to capture edit of message {payload.message_id}: {e}")
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        transcript_capture.record_deleted(payload.channel_id, [payload.message_id])
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        transcript_capture.record_deleted(payload.channel_id, payload.message_ids)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        if channel.id in transcript_capture.tracked:
+            await transcript_capture.discard(channel.id)
+        # Also covers ticket channels deleted by hand, or while the bot was restarting mid-close.
+        await Ticket.filter(channel_id=str(channel.id), status="OPEN").update(status="CLOSED")
+
     @staticmethod
     def _get_guild_emoji(guild: discord.Guild, name: str) -> Optional[discord.Emoji]:
         for emoji in guild.emojis:
@@ -421,14 +478,14 @@ class Tickets(BaseCog):
                     continue
 
             try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(url) as resp:
-                        if resp.status != 200:
-                            if setup_log is not None:
-                                setup_log.append(f"⚠️ Failed to download emoji `{name}` (HTTP {resp.status})")
-                            emoji_map[name] = None
-                            continue
-                        image_data = await resp.read()
+                session = http_client.session()
+                async with session.get(url) as resp:
+                    if resp.status != 200:
+                        if setup_log is not None:
+                            setup_log.append(f"⚠️ Failed to download emoji `{name}` (HTTP {resp.status})")
+                        emoji_map[name] = None
+                        continue
+                    image_data = await resp.read()
 
                 emoji = await guild.create_custom_emoji(name=name, image=image_data)
                 emoji_map[name] = emoji
@@ -863,19 +920,19 @@ class Tickets(BaseCog):
         await interaction.response.defer(ephemeral=True)
         
         try:
-            transcript_data = await generate_transcript(interaction.channel, limit=limit)
-            transcript_html = transcript_data["html"]
-            
-            import io
-            f = discord.File(
-                io.BytesIO(transcript_html.encode('utf-8')),
-                filename=f"transcript-{interaction.channel.name}.html"
-            )
-            
-            await interaction.followup.send(
-                content=f"📝 Transcript for {interaction.channel.mention}",
-                file=f
-            )
+            ticket = None if limit is not None else await Ticket.filter(channel_id=str(interaction.channel.id)).first()
+            if ticket:
+                transcript = await transcript_jobs.ticket_transcript(interaction.channel, ticket)
+            else:
+                transcript = await transcript_jobs.render(interaction.channel, limit=limit)
+            try:
+                f = transcript.to_discord_file(f"transcript-{interaction.channel.name}.html")
+                await interaction.followup.send(
+                    content=f"📝 Transcript for {interaction.channel.mention}",
+                    file=f
+                )
+            finally:
+                transcript.close()
         except Exception as e:
             await interaction.followup.send(f"❌ Failed to generate transcript: {e}", ephemeral=True)
 
@@ -982,6 +1039,7 @@ class Tickets(BaseCog):
                 details=details,
                 status="OPEN"
             )
+            transcript_capture.start(channel.id)
 
             # Send ping as plain text (NOT in embed)
             await channel.send(f"{user.mention}")
@@ -1004,23 +1062,79 @@ class Tickets(BaseCog):
 
 
     @staticmethod
-    async def close_ticket(channel: discord.TextChannel, closer: discord.Member):
-        ticket = await Ticket.filter(channel_id=str(channel.id)).first()
-        if ticket:
-            ticket.status = "CLOSED"
-            await ticket.save()
-        
-        # Generate transcript before closing
-        await channel.send(embed=EmbedUtils.info("📝 Generating Transcript", "Please wait while the transcript is being generated..."))
-        
+    async def close_ticket(
+        channel: discord.TextChannel, closer: discord.Member, interaction: Optional[discord.Interaction] = None
+    ):
+        # A second close while the first is still running would post the transcript twice.
+        if channel.id in transcript_jobs.closing:
+            if interaction is not None:
+                await interaction.followup.send(
+                    embed=EmbedUtils.info("Already Closing", "This ticket is already being closed."),
+                    ephemeral=True
+                )
+            return
+        transcript_jobs.closing.add(channel.id)
         try:
-            transcript_data = await generate_transcript(channel)
-            transcript_html = transcript_data["html"]
-            stats_msgs = transcript_data["total_messages"]
-            stats_participants = transcript_data["participants"]
+            # The ticket stays OPEN until its channel is gone, so a restart mid-close leaves it closable again.
+            ticket = await Ticket.filter(channel_id=str(channel.id)).first()
             
-            # Helper to create file object (for sending to log/dm immediately if needed)
-            import io
+            # Transcripts are generated by the transcript workers; this message shows their progress.
+            waiting = transcript_jobs.waiting
+            status_text = (
+                f"Queued behind {waiting} other ticket(s) closing right now..."
+                if waiting
+                else "Please wait while the transcript is being generated..."
+            )
+            status_message = await channel.send(embed=EmbedUtils.info("📝 Generating Transcript", status_text))
+        except Exception:
+            transcript_jobs.closing.discard(channel.id)
+            raise
+        transcript_jobs.submit_close(
+            channel.id, lambda: Tickets._run_close_job(channel, closer, ticket, status_message)
+        )
+
+    @staticmethod
+    async def _set_close_progress(status_message: discord.Message, text: str) -> None:
+        try:
+            await status_message.edit(embed=EmbedUtils.info("📝 Generating Transcript", text))
+        except discord.HTTPException:
+            pass
+
+    @staticmethod
+    async def _run_close_job(
+        channel: discord.TextChannel,
+        closer: discord.Member,
+        ticket: Optional[Ticket],
+        status_message: discord.Message,
+    ):
+        try:
+            await Tickets._save_close_transcript(channel, closer, ticket, status_message)
+            await channel.send(embed=EmbedUtils.warning("Closing", "Ticket closing in 5 seconds..."))
+        except BaseException:
+            # Left in ``closing`` the ticket could never be closed again.
+            transcript_jobs.closing.discard(channel.id)
+            raise
+        # The countdown runs outside the worker so the next ticket's transcript can start meanwhile.
+        task = asyncio.create_task(Tickets._delete_closed_channel(channel, ticket, 5))
+        _closing_tasks.add(task)
+        task.add_done_callback(_closing_tasks.discard)
+
+    @staticmethod
+    async def _save_close_transcript(
+        channel: discord.TextChannel,
+        closer: discord.Member,
+        ticket: Optional[Ticket],
+        status_message: discord.Message,
+    ):
+        await Tickets._set_close_progress(status_message, "Rendering the transcript...")
+        transcript = None
+        try:
+            if ticket:
+                transcript = await transcript_jobs.ticket_transcript(channel, ticket)
+            else:
+                transcript = await transcript_jobs.render(channel)
+            stats_msgs = transcript.total_messages
+            stats_participants = transcript.participants
             
             # Fetch config for log channel
             config = await GuildConfig.filter(id=str(channel.guild.id)).first()
@@ -1040,6 +1154,9 @@ class Tickets(BaseCog):
             # ------------------------------------------------------------------
             transcript_url = None
             if log_channel:
+                await Tickets._set_close_progress(
+                    status_message, f"Uploading the transcript ({transcript.total_messages} messages) to {log_channel.mention}..."
+                )
                 # We send to log channel first to get the URL
                 embed_log = discord.Embed(
                     title="Ticket Closed",
@@ -1049,10 +1166,7 @@ class Tickets(BaseCog):
                 embed_log.add_field(name="Opened By", value=f"<@{ticket.creator_id}>" if ticket else "Unknown", inline=True)
                 embed_log.add_field(name="Closed By", value=closer.mention, inline=True)
                 
-                f_log = discord.File(
-                     io.BytesIO(transcript_html.encode('utf-8')),
-                     filename=f"transcript-{channel.name}.html"
-                )
+                f_log = transcript.to_discord_file(f"transcript-{channel.name}.html")
                 
                 # Send to log channel
                 log_msg = await log_channel.send(embed=embed_log, file=f_log)
@@ -1073,6 +1187,7 @@ class Tickets(BaseCog):
             # SEND DM TO USER (V2 Components)
             # ------------------------------------------------------------------
             if ticket:
+                await Tickets._set_close_progress(status_message, "Sending the transcript to the ticket creator...")
                 try:
                     creator = await channel.guild.fetch_member(int(ticket.creator_id))
                     if creator:
@@ -1166,10 +1281,7 @@ class Tickets(BaseCog):
 
                         # Send transcript file separately and attach a download button.
                         try:
-                            f_dm = discord.File(
-                                 io.BytesIO(transcript_html.encode('utf-8')),
-                                 filename=f"transcript-{channel.name}.html"
-                            )
+                            f_dm = transcript.to_discord_file(f"transcript-{channel.name}.html")
                             transcript_msg = await creator.send(file=f_dm)
                             if transcript_msg.attachments:
                                 dm_url = transcript_msg.attachments[0].url
@@ -1214,10 +1326,24 @@ class Tickets(BaseCog):
         except Exception as e:
             await channel.send(embed=EmbedUtils.warning("Transcript Error", f"Failed: {e}"))
             logger.error(f"Transcript error: {e}")
-        
-        await channel.send(embed=EmbedUtils.warning("Closing", "Ticket closing in 5 seconds..."))
-        await asyncio.sleep(5)
-        await channel.delete()
+        else:
+            await Tickets._set_close_progress(status_message, "Transcript saved.")
+        finally:
+            if transcript is not None:
+                transcript.close()
+
+    @staticmethod
+    async def _delete_closed_channel(channel: discord.TextChannel, ticket: Optional[Ticket], delay: float):
+        try:
+            await asyncio.sleep(delay)
+            await channel.delete()
+            if ticket:
+                ticket.status = "CLOSED"
+                await ticket.save()
+        except Exception as e:
+            logger.error(f"Failed to delete closed ticket {channel.id}: {e}")
+        finally:
+            transcript_jobs.closing.discard(channel.id)
 
     @staticmethod
     async def claim_ticket(interaction: discord.Interaction):
@@ -1271,10 +1397,16 @@ class Tickets(BaseCog):
                 ephemeral=True
             )
         
+        if interaction.channel.id in transcript_jobs.closing:
+            return await interaction.response.send_message(
+                embed=EmbedUtils.info("Already Closing", "This ticket is already being closed."),
+                ephemeral=True
+            )
+        
         await interaction.response.send_message(
             embed=EmbedUtils.info("Closing", "Starting ticket close process...")
         )
-        await Tickets.close_ticket(interaction.channel, interaction.user)
+        await Tickets.close_ticket(interaction.channel, interaction.user, interaction)
 
     @app_commands.command(name="block", description="Block a user from speaking in this ticket")
     @app_commands.describe(user="The user to block in this ticket", reason="Reason for blocking")
@@ -1435,11 +1567,15 @@ class Tickets(BaseCog):
         await interaction.followup.send(embed=embed)
 
     @app_commands.command(name="transcript", description="Generate a transcript of the current ticket channel")
+    @app_commands.describe(ticket_number="Fetch the archived transcript of this ticket instead (works for closed tickets)")
     @app_commands.default_permissions(manage_channels=True)
-    async def transcript(self, interaction: discord.Interaction):
+    async def transcript(self, interaction: discord.Interaction, ticket_number: Optional[int] = None):
 
         await interaction.response.defer(ephemeral=True)
         
+        if ticket_number is not None:
+            return await self._send_archived_transcript(interaction, ticket_number)
+        
         # Check if this is a ticket channel
         ticket = await Ticket.filter(channel_id=str(interaction.channel.id)).first()
         if not ticket:
@@ -1449,18 +1585,12 @@ class Tickets(BaseCog):
             )
         
         try:
-            import io
-            
-            # Generate transcript
-            transcript_data = await generate_transcript(interaction.channel)
-            transcript_html = transcript_data["html"]
-            total_messages = transcript_data["total_messages"]
+            # Served from the archive when nothing changed since the last transcript
+            transcript = await transcript_jobs.ticket_transcript(interaction.channel, ticket)
+            total_messages = transcript.total_messages
             
             # Create file
-            transcript_file = discord.File(
-                io.BytesIO(transcript_html.encode('utf-8')),
-                filename=f"transcript-{interaction.channel.name}.html"
-            )
+            transcript_file = transcript.to_discord_file(f"transcript-{interaction.channel.name}.html")
             
             # Create summary embed
             summary_embed = discord.Embed(
@@ -1470,13 +1600,46 @@ class Tickets(BaseCog):
             )
             summary_embed.set_footer(text=f"Generated at {discord.utils.utcnow().strftime('%Y-%m-%d %H:%M:%S')} UTC")
             
-            await interaction.followup.send(embed=summary_embed, file=transcript_file, ephemeral=True)
+            try:
+                await interaction.followup.send(embed=summary_embed, file=transcript_file, ephemeral=True)
+            finally:
+                transcript.close()
             
         except Exception as e:
             await interaction.followup.send(
                 embed=EmbedUtils.error("Error", f"Failed to generate transcript: {str(e)[:200]}"),
                 ephemeral=True
             )
+
+    async def _send_archived_transcript(self, interaction: discord.Interaction, ticket_number: int):
+        try:
+            transcript = await transcript_jobs.archived(interaction.guild.id, ticket_number)
+        except Exception as e:
+            return await interaction.followup.send(
+                embed=EmbedUtils.error("Error", f"Failed to load transcript: {str(e)[:200]}"),
+                ephemeral=True
+            )
+        if transcript is None:
+            return await interaction.followup.send(
+                embed=EmbedUtils.error("Not Found", f"No archived transcript for ticket #{ticket_number:04d}."),
+                ephemeral=True
+            )
+        
+        summary_embed = discord.Embed(
+            title="📋 Ticket Transcript",
+            description=f"**Ticket ID:** {ticket_number}\n**Messages:** {transcript.total_messages}\n**Participants:** {len(transcript.participants)}",
+            color=Colors.SUCCESS
+        )
+        summary_embed.set_footer(text="Served from the transcript archive")
+        try:
+            await interaction.followup.send(
+                embed=summary_embed,
+                file=transcript.to_discord_file(f"transcript-{ticket_number:04d}.html"),
+                ephemeral=True
+            )
+        finally:
+            transcript.close()
+
     @app_commands.command(name="rename", description="Rename the ticket status")
     @app_commands.choices(status=[
         app_commands.Choice(name="⛔ Original", value="original"),
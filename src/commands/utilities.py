@@ -6,6 +6,7 @@ from typing import Optional
 from ..utils.base_cog import BaseCog
 from ..utils.embeds import EmbedUtils
 from ..utils.constants import Emojis, Colors
+from ..services.http_client import http_client
 import re
 import json
 
@@ -133,14 +134,13 @@ class Utilities(BaseCog):
         await interaction.response.defer(ephemeral=True)
         
         try:
-            import aiohttp
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as resp:
-                    if resp.status != 200:
-                        return await interaction.followup.send(
-                            embed=EmbedUtils.error("Error", "Could not download image.")
-                        )
-                    image_data = await resp.read()
+            session = http_client.session()
+            async with session.get(url) as resp:
+                if resp.status != 200:
+                    return await interaction.followup.send(
+                        embed=EmbedUtils.error("Error", "Could not download image.")
+                    )
+                image_data = await resp.read()
             
             emoji = await interaction.guild.create_custom_emoji(name=name, image=image_data)
             await interaction.followup.send(
@@ -83,6 +83,27 @@ class BlockedUser(Model):
     class Meta:
         table = "blocked_users"
 
+class ArchivedTranscript(Model):
+    """Index of archived ticket transcripts; the compressed HTML is stored on disk under its digest"""
+    id = fields.IntField(pk=True)
+    guild_id = fields.CharField(max_length=20)
+    channel_id = fields.CharField(max_length=20)
+    ticket_number = fields.IntField(default=0)
+    creator_id = fields.CharField(max_length=20, index=True)
+    digest = fields.CharField(max_length=64, index=True)  # sha256 of the HTML
+    size = fields.IntField(default=0)
+    stored_size = fields.IntField(default=0)
+    total_messages = fields.IntField(default=0)
+    participants = fields.JSONField(default=dict)
+    version = fields.BigIntField(null=True)  # capture journal size when archived
+    created_at = fields.DatetimeField(auto_now_add=True, index=True)
+    updated_at = fields.DatetimeField(auto_now=True)
+    
+    class Meta:
+        table = "transcript_archive"
+        unique_together = (("guild_id", "channel_id"),)
+        indexes = (("guild_id", "ticket_number"),)
+
 async def init_db():
     db_url = (
         os.getenv("DATABASE_URL")
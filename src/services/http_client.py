@@ -0,0 +1,53 @@
+import os
+from typing import Optional
+
+import aiohttp
+
+from ..utils.logger import logger
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name) or default)
+    except ValueError:
+        return default
+
+
+class HttpClient:
+    """One aiohttp session shared by the whole process so outbound calls reuse pooled keep-alive connections."""
+
+    def __init__(self):
+        self.limit = int(_env_float("HTTP_POOL_LIMIT", 100))
+        self.limit_per_host = int(_env_float("HTTP_POOL_LIMIT_PER_HOST", 20))
+        self.dns_cache_seconds = int(_env_float("HTTP_DNS_CACHE_SECONDS", 300))
+        self.keepalive_seconds = _env_float("HTTP_KEEPALIVE_SECONDS", 30.0)
+        self.timeout_seconds = _env_float("HTTP_TIMEOUT_SECONDS", 20.0)
+        self.connect_timeout_seconds = _env_float("HTTP_CONNECT_TIMEOUT_SECONDS", 5.0)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def session(self) -> aiohttp.ClientSession:
+        """Return the shared session, creating it on first use. Must be called from inside the event loop."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_cache_seconds,
+                keepalive_timeout=self.keepalive_seconds,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout_seconds, sock_connect=self.connect_timeout_seconds),
+            )
+            logger.info(
+                f"HTTP client pool ready (limit {self.limit}, {self.limit_per_host} per host, "
+                f"keep-alive {self.keepalive_seconds:g}s)"
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+http_client = HttpClient()
@@ -0,0 +1,84 @@
+import asyncio
+from typing import Any, Awaitable, Callable
+
+from ..utils.logger import logger
+from .metrics import Counter, Gauge
+
+Job = Callable[[], Awaitable[Any]]
+
+
+class JobQueue:
+    """Runs background jobs on a fixed pool of worker tasks.
+
+    Jobs are deduplicated by key: submitting a key that is still queued or running returns the
+    future of the existing job. Durability is the caller's job - a job must be safe to submit
+    again after a restart, because anything still queued in memory is lost on shutdown.
+
+    Queue depth goes to ``depth_gauge`` and finished jobs to ``jobs_counter`` (labelled by kind and outcome).
+    """
+
+    def __init__(self, name: str, depth_gauge: Gauge, jobs_counter: Counter, workers: int = 4):
+        self.workers = max(1, workers)
+        self.name = name
+        self._depth_gauge = depth_gauge
+        self._jobs_counter = jobs_counter
+        self._queue: asyncio.Queue[tuple[str, str, Job, asyncio.Future]] = asyncio.Queue()
+        self._jobs: dict[str, asyncio.Future] = {}
+        self._tasks: list[asyncio.Task] = []
+
+    def submit(self, key: str, job: Job, kind: str = "job") -> asyncio.Future:
+        existing = self._jobs.get(key)
+        if existing is not None:
+            return existing
+        self._ensure_workers()
+        future = asyncio.get_running_loop().create_future()
+        self._jobs[key] = future
+        self._queue.put_nowait((key, kind, job, future))
+        self._depth_gauge.set(self._queue.qsize())
+        return future
+
+    def pending(self, key: str) -> bool:
+        return key in self._jobs
+
+    @property
+    def waiting(self) -> int:
+        """Jobs queued that no worker has picked up yet."""
+        return self._queue.qsize()
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        if self._queue.qsize():
+            logger.warning(f"{self.name} queue stopped with {self._queue.qsize()} job(s) still queued")
+
+    def _ensure_workers(self) -> None:
+        self._tasks = [task for task in self._tasks if not task.done()]
+        while len(self._tasks) < self.workers:
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    async def _worker(self) -> None:
+        while True:
+            key, kind, job, future = await self._queue.get()
+            self._depth_gauge.set(self._queue.qsize())
+            try:
+                result = await job()
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                raise
+            except Exception as exc:
+                logger.exception(f"{self.name} job {key} failed: {exc}")
+                self._jobs_counter.inc(kind=kind, outcome="error")
+                if not future.done():
+                    future.set_exception(exc)
+                    # Nobody may be waiting on this future; mark the exception as retrieved.
+                    future.exception()
+            else:
+                self._jobs_counter.inc(kind=kind, outcome="ok")
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                self._jobs.pop(key, None)
+                self._queue.task_done()
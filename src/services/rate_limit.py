@@ -0,0 +1,53 @@
+import time
+from typing import Optional
+
+from ..utils.logger import logger
+
+
+class TokenBucketLimiter:
+    """Token buckets per client key: ``burst`` requests at once, refilled at ``rate`` per second."""
+
+    def __init__(self, rate: float, burst: float, max_clients: int = 10000):
+        self.rate = max(rate, 1e-6)
+        self.burst = max(burst, 1.0)
+        self.max_clients = max_clients
+        # key -> (tokens left, monotonic time of the last update)
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    def acquire(self, key: str, cost: float = 1.0) -> float:
+        """Take ``cost`` tokens for ``key``; returns 0 when allowed, otherwise seconds until it would be."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < cost:
+            self._buckets[key] = (tokens, now)
+            return (cost - tokens) / self.rate
+        if key not in self._buckets and len(self._buckets) >= self.max_clients:
+            self._prune(now)
+        self._buckets[key] = (tokens - cost, now)
+        return 0.0
+
+    def _prune(self, now: float) -> None:
+        # A bucket that has refilled completely is the same as no bucket at all.
+        refill_seconds = self.burst / self.rate
+        self._buckets = {
+            key: (tokens, updated) for key, (tokens, updated) in self._buckets.items() if now - updated < refill_seconds
+        }
+
+
+def parse_rate_limits(value: str, defaults: dict[str, tuple[float, float]]) -> Optional[dict[str, tuple[float, float]]]:
+    """Parse ``"catalog=10/30,chat=0.2/3"`` (requests per second / burst) over ``defaults``; "off" disables limiting."""
+    value = value.strip()
+    if value.lower() in {"off", "0", "false", "none"}:
+        return None
+    limits = dict(defaults)
+    for part in value.split(","):
+        if not part.strip():
+            continue
+        name, _, spec = part.partition("=")
+        rate, _, burst = spec.partition("/")
+        try:
+            limits[name.strip().lower()] = (float(rate), float(burst or rate))
+        except ValueError:
+            logger.warning(f"Ignoring invalid rate limit {part.strip()!r}; expected name=rate/burst")
+    return limits
@@ -7,6 +7,7 @@ import aiohttp
 from dotenv import load_dotenv
 
 from ..utils.logger import logger
+from .http_client import http_client
 
 
 class StoreApiService:
@@ -79,43 +80,43 @@ class StoreApiService:
         timeout = aiohttp.ClientTimeout(total=self.timeout_seconds)
 
         try:
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                kwargs: Dict[str, Any] = {"headers": headers}
-                if method.upper() == "GET" and data:
-                    kwargs["params"] = data
-                elif data is not None:
-                    kwargs["json"] = data
-
-                retries = max(0, self.max_retries)
-                for attempt in range(retries + 1):
-                    async with session.request(method.upper(), url, **kwargs) as response:
-                        body = await response.text()
-
-                        if response.status in (429, 502, 503, 504) and attempt < retries:
-                            retry_after = self._to_float(response.headers.get("Retry-After"), default=0.5)
-                            await asyncio.sleep(min(max(retry_after, 0.2), 5.0))
-                            continue
-
-                        if response.status < 200 or response.status >= 300:
-                            logger.error(f"Store API error {response.status} at {url}: {body[:300]}")
-                            return None
-
-                        content_type = response.headers.get("Content-Type", "").lower()
-                        if "application/json" in content_type:
-                            try:
-                                return await response.json()
-                            except Exception:
-                                pass
-
-                        if not body:
-                            return {}
-
+            session = http_client.session()
+            kwargs: Dict[str, Any] = {"headers": headers, "timeout": timeout}
+            if method.upper() == "GET" and data:
+                kwargs["params"] = data
+            elif data is not None:
+                kwargs["json"] = data
+
+            retries = max(0, self.max_retries)
+            for attempt in range(retries + 1):
+                async with session.request(method.upper(), url, **kwargs) as response:
+                    body = await response.text()
+
+                    if response.status in (429, 502, 503, 504) and attempt < retries:
+                        retry_after = self._to_float(response.headers.get("Retry-After"), default=0.5)
+                        await asyncio.sleep(min(max(retry_after, 0.2), 5.0))
+                        continue
+
+                    if response.status < 200 or response.status >= 300:
+                        logger.error(f"Store API error {response.status} at {url}: {body[:300]}")
+                        return None
+
+                    content_type = response.headers.get("Content-Type", "").lower()
+                    if "application/json" in content_type:
                         try:
-                            return json.loads(body)
-                        except json.JSONDecodeError:
-                            return body
+                            return await response.json()
+                        except Exception:
+                            pass
+
+                    if not body:
+                        return {}
 
-                return None
+                    try:
+                        return json.loads(body)
+                    except json.JSONDecodeError:
+                        return body
+
+            return None
         except Exception as exc:
             logger.error(f"Store API request failed ({method} {url}): {exc}")
             return None
@@ -0,0 +1,9 @@
+from .job_queue import JobQueue
+from .metrics import fulfilment_jobs_total, fulfilment_queue_depth
+
+
+class FulfilmentQueue(JobQueue):
+    """Runs fulfilment jobs (key delivery, order logs) on a fixed pool of worker tasks."""
+
+    def __init__(self, workers: int = 4):
+        super().__init__("Fulfilment", fulfilment_queue_depth, fulfilment_jobs_total, workers=workers)
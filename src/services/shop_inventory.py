@@ -0,0 +1,229 @@
+import json
+import os
+from collections import deque
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from ..utils.logger import logger
+
+
+# (product id, tier id or "" for product-level keys)
+HolderKey = tuple[str, str]
+
+
+class InventoryQueue:
+    """FIFO of deliverable keys for one product/tier, plus keys held back for pending checkouts."""
+
+    __slots__ = ("available", "reserved", "reserved_count", "delivered_count")
+
+    def __init__(self, items: Iterable[str] = ()):
+        self.available: deque[str] = deque(items)
+        self.reserved: dict[str, list[str]] = {}
+        self.reserved_count = 0
+        self.delivered_count = 0
+
+    @property
+    def stock(self) -> int:
+        return len(self.available)
+
+    def push(self, items: Iterable[str]) -> None:
+        self.available.extend(items)
+
+    def take(self, count: int) -> Optional[list[str]]:
+        if count > len(self.available):
+            return None
+        popleft = self.available.popleft
+        taken = [popleft() for _ in range(count)]
+        self.delivered_count += count
+        return taken
+
+    def drop_newest(self, count: int) -> list[str]:
+        count = min(max(0, count), len(self.available))
+        pop = self.available.pop
+        dropped = [pop() for _ in range(count)]
+        dropped.reverse()
+        return dropped
+
+    def keys(self) -> set[str]:
+        """Every key in stock or held for a checkout."""
+        keys = set(self.available)
+        for held in self.reserved.values():
+            keys.update(held)
+        return keys
+
+    def clear(self) -> list[str]:
+        items = list(self.available)
+        self.available.clear()
+        return items
+
+    def reserve(self, hold_id: str, count: int) -> Optional[list[str]]:
+        if hold_id in self.reserved:
+            return list(self.reserved[hold_id])
+        if count > len(self.available):
+            return None
+        popleft = self.available.popleft
+        held = [popleft() for _ in range(count)]
+        self.reserved[hold_id] = held
+        self.reserved_count += count
+        return held
+
+    def release(self, hold_id: str) -> list[str]:
+        held = self.reserved.pop(hold_id, None) or []
+        self.reserved_count -= len(held)
+        # Released keys go back to the front so they are delivered before newer stock.
+        self.available.extendleft(reversed(held))
+        return held
+
+    def deliver_reserved(self, hold_id: str) -> Optional[list[str]]:
+        held = self.reserved.pop(hold_id, None)
+        if held is None:
+            return None
+        self.reserved_count -= len(held)
+        self.delivered_count += len(held)
+        return held
+
+
+class InventoryStore:
+    """In-memory inventory queues persisted as a snapshot file plus an append-only journal of operations.
+
+    Every mutation is a small op dict (``add``/``take``/``drop``/``replace``/``remove``, plus
+    ``reserve``/``release``/``deliver`` for checkout holds) that is applied to the queues and appended
+    to the journal, so delivering N keys writes O(N) bytes regardless of how much stock is on hand.
+    The journal is folded into a fresh snapshot every ``compact_every`` operations.
+    """
+
+    def __init__(self, snapshot_file: Path, journal_file: Path, compact_every: int = 500):
+        self.snapshot_file = snapshot_file
+        self.journal_file = journal_file
+        self.compact_every = max(1, compact_every)
+        self.queues: dict[HolderKey, InventoryQueue] = {}
+        self._seq = 0
+        self._ops_since_snapshot = 0
+
+    def get(self, product_id: str, tier_id: str) -> Optional[InventoryQueue]:
+        return self.queues.get((product_id, tier_id))
+
+    def queue(self, product_id: str, tier_id: str) -> InventoryQueue:
+        key = (product_id, tier_id)
+        queue = self.queues.get(key)
+        if queue is None:
+            queue = InventoryQueue()
+            self.queues[key] = queue
+        return queue
+
+    def stock(self, product_id: str, tier_id: str) -> int:
+        queue = self.queues.get((product_id, tier_id))
+        return queue.stock if queue is not None else 0
+
+    def reserved(self, product_id: str, tier_id: str) -> int:
+        queue = self.queues.get((product_id, tier_id))
+        return queue.reserved_count if queue is not None else 0
+
+    def holds(self, hold_id: str) -> list[HolderKey]:
+        return [key for key, queue in self.queues.items() if hold_id in queue.reserved]
+
+    def load(self) -> bool:
+        """Load the snapshot and replay the journal. Returns False when no snapshot exists yet."""
+        self.queues.clear()
+        self._seq = 0
+        self._ops_since_snapshot = 0
+        if not self.snapshot_file.exists():
+            return False
+
+        snapshot = json.loads(self.snapshot_file.read_text(encoding="utf-8"))
+        self._seq = int(snapshot.get("seq", 0))
+        for holder in snapshot.get("holders", []):
+            queue = self.queue(str(holder.get("productId", "")), str(holder.get("tierId", "")))
+            queue.push(str(item) for item in holder.get("available", []))
+            for hold_id, held in dict(holder.get("reserved", {})).items():
+                queue.reserved[str(hold_id)] = [str(item) for item in held]
+                queue.reserved_count += len(held)
+            queue.delivered_count = int(holder.get("delivered", 0))
+
+        if self.journal_file.exists():
+            with self.journal_file.open("r", encoding="utf-8") as handle:
+                for line in handle:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        op = json.loads(line)
+                    except ValueError:
+                        # A torn final line from a crash mid-append; everything before it is intact.
+                        logger.warning(f"Ignoring unreadable inventory journal line in {self.journal_file}")
+                        continue
+                    seq = int(op.get("seq", 0))
+                    if seq <= self._seq:
+                        continue
+                    self._apply(op)
+                    self._seq = seq
+                    self._ops_since_snapshot += 1
+        return True
+
+    def commit(self, ops: list[dict[str, Any]]) -> list[Any]:
+        """Apply ``ops`` in order and append them to the journal. Callers validate beforehand."""
+        results: list[Any] = []
+        lines: list[str] = []
+        for op in ops:
+            self._seq += 1
+            op = dict(op, seq=self._seq)
+            results.append(self._apply(op))
+            lines.append(json.dumps(op, ensure_ascii=False, separators=(",", ":")))
+        if lines:
+            with self.journal_file.open("a", encoding="utf-8") as handle:
+                handle.write("\n".join(lines) + "\n")
+                handle.flush()
+                os.fsync(handle.fileno())
+            self._ops_since_snapshot += len(lines)
+            if self._ops_since_snapshot >= self.compact_every:
+                self.compact()
+        return results
+
+    def compact(self) -> None:
+        holders = [
+            {
+                "productId": product_id,
+                "tierId": tier_id,
+                "available": list(queue.available),
+                "reserved": queue.reserved,
+                "delivered": queue.delivered_count,
+            }
+            for (product_id, tier_id), queue in self.queues.items()
+        ]
+        payload = json.dumps({"version": 1, "seq": self._seq, "holders": holders}, ensure_ascii=False, separators=(",", ":"))
+        temp_file = self.snapshot_file.with_suffix(self.snapshot_file.suffix + ".tmp")
+        with temp_file.open("w", encoding="utf-8") as handle:
+            handle.write(payload)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temp_file, self.snapshot_file)
+        # The snapshot records its seq, so a crash before this truncate only leaves ops that replay skips.
+        self.journal_file.write_text("", encoding="utf-8")
+        self._ops_since_snapshot = 0
+
+    def _apply(self, op: dict[str, Any]) -> Any:
+        kind = op.get("op")
+        product_id = str(op.get("p", ""))
+        tier_id = str(op.get("t", ""))
+        if kind == "add":
+            self.queue(product_id, tier_id).push(str(item) for item in op.get("items", []))
+            return self.stock(product_id, tier_id)
+        if kind == "replace":
+            queue = self.queue(product_id, tier_id)
+            queue.clear()
+            queue.push(str(item) for item in op.get("items", []))
+            return queue.stock
+        if kind == "take":
+            return self.queue(product_id, tier_id).take(int(op.get("n", 0))) or []
+        if kind == "drop":
+            return self.queue(product_id, tier_id).drop_newest(int(op.get("n", 0)))
+        if kind == "reserve":
+            return self.queue(product_id, tier_id).reserve(str(op.get("hold", "")), int(op.get("n", 0))) or []
+        if kind == "release":
+            return self.queue(product_id, tier_id).release(str(op.get("hold", "")))
+        if kind == "deliver":
+            return self.queue(product_id, tier_id).deliver_reserved(str(op.get("hold", ""))) or []
+        if kind == "remove":
+            queue = self.queues.pop((product_id, tier_id), None)
+            return queue.clear() if queue is not None else []
+        raise ValueError(f"unknown inventory op: {kind!r}")
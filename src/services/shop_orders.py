@@ -0,0 +1,204 @@
+import json
+import os
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from ..utils.logger import logger
+
+
+class OrderLog:
+    """Orders stored as append-only JSONL segment files.
+
+    Each process appends to a fresh segment, and a segment is sealed once it holds ``segment_size``
+    orders, so a sale writes one line no matter how many orders exist. Restarts leave short sealed
+    segments behind; ``compact`` merges them back into full-size ones.
+
+    An in-memory index maps each order id to its segment and byte offset, with a secondary index by
+    user id, so lookups read one line instead of scanning every segment.
+    """
+
+    def __init__(self, directory: Path, segment_size: int = 5000, compact_segments: int = 8):
+        self.directory = directory
+        self.segment_size = max(1, segment_size)
+        self.compact_segments = max(2, compact_segments)
+        self._index: dict[str, tuple[Path, int]] = {}
+        self._by_user: dict[str, list[str]] = {}
+        self._active: Optional[Path] = None
+        self._active_count = 0
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, order_id: str) -> bool:
+        return order_id in self._index
+
+    def open(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._active = None
+        self._active_count = 0
+        segments = self._segments()
+        valid_bytes = self._rebuild_index()
+        if segments and valid_bytes < segments[-1].stat().st_size:
+            # Torn tail from a crash mid-append: drop it so the segment stays parseable.
+            logger.warning(f"Truncating unreadable tail of order segment {segments[-1].name}")
+            with segments[-1].open("r+b") as handle:
+                handle.truncate(valid_bytes)
+
+        short_segments = [segment for segment in self._segments() if _line_count(segment) < self.segment_size]
+        if len(short_segments) >= self.compact_segments:
+            self.compact()
+
+    def append(self, order: dict[str, Any]) -> None:
+        if self._active is None or self._active_count >= self.segment_size:
+            self._active = self._next_segment()
+            self._active_count = 0
+        line = (json.dumps(order, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._active.open("ab") as handle:
+            offset = handle.tell()
+            handle.write(line)
+            handle.flush()
+            os.fsync(handle.fileno())
+        self._active_count += 1
+        self._index_order(order, self._active, offset)
+
+    def get(self, order_id: str) -> Optional[dict[str, Any]]:
+        location = self._index.get(order_id)
+        if location is None:
+            return None
+        segment, offset = location
+        with segment.open("rb") as handle:
+            handle.seek(offset)
+            return _parse_line(handle.readline())
+
+    def for_user(self, user_id: str, limit: Optional[int] = None) -> list[dict[str, Any]]:
+        """Orders placed by ``user_id``, newest first."""
+        order_ids = self._by_user.get(user_id, [])
+        selected = order_ids[::-1] if limit is None else order_ids[: -limit - 1 : -1]
+        return [order for order in map(self.get, selected) if order is not None]
+
+    def append_many(self, orders: list[dict[str, Any]]) -> None:
+        for order in orders:
+            order_id = str(order.get("id") or "").strip()
+            if order_id and order_id not in self._index:
+                self.append(order)
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        for segment in self._segments():
+            with segment.open("rb") as handle:
+                offset = 0
+                for raw in handle:
+                    order = _parse_line(raw)
+                    # Only the indexed copy counts; a duplicate id left by an interrupted compaction is skipped.
+                    if order is not None and self._index.get(str(order.get("id") or "").strip()) == (segment, offset):
+                        yield order
+                    offset += len(raw)
+
+    def compact(self) -> None:
+        """Rewrite all sealed segments into full-size ones, dropping duplicate order ids."""
+        segments = [segment for segment in self._segments() if segment != self._active]
+        if len(segments) < 2:
+            return
+        # New segments are numbered after every existing one, so readers never see an order twice
+        # and a crash part-way through leaves only duplicates that the next compaction drops.
+        next_number = _segment_number(self._segments()[-1]) + 1
+        written: list[Path] = []
+        seen: set[str] = set()
+        batch: list[str] = []
+
+        def flush_batch() -> None:
+            nonlocal next_number
+            target = self.directory / _segment_name(next_number)
+            temp = target.with_suffix(".tmp")
+            with temp.open("w", encoding="utf-8") as handle:
+                handle.writelines(batch)
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(temp, target)
+            written.append(target)
+            next_number += 1
+            batch.clear()
+
+        for segment in segments:
+            with segment.open("rb") as handle:
+                for raw in handle:
+                    order = _parse_line(raw)
+                    if order is None:
+                        continue
+                    order_id = str(order.get("id") or "").strip()
+                    if order_id in seen:
+                        continue
+                    seen.add(order_id)
+                    batch.append(raw.decode("utf-8").rstrip("\n") + "\n")
+                    if len(batch) >= self.segment_size:
+                        flush_batch()
+        if batch:
+            flush_batch()
+        for segment in segments:
+            segment.unlink()
+        if self._active is not None:
+            # Keep the active segment last in read order.
+            active = self.directory / _segment_name(next_number)
+            os.replace(self._active, active)
+            self._active = active
+        self._rebuild_index()
+        logger.info(f"Compacted {len(segments)} order segments into {len(written)}")
+
+    def _rebuild_index(self) -> int:
+        """Index every segment; returns how many bytes of the last segment parsed cleanly."""
+        self._index.clear()
+        self._by_user.clear()
+        valid_bytes = 0
+        for segment in self._segments():
+            valid_bytes = 0
+            with segment.open("rb") as handle:
+                offset = 0
+                for raw in handle:
+                    order = _parse_line(raw)
+                    if order is not None:
+                        self._index_order(order, segment, offset)
+                        valid_bytes = offset + len(raw)
+                    offset += len(raw)
+        return valid_bytes
+
+    def _index_order(self, order: dict[str, Any], segment: Path, offset: int) -> None:
+        order_id = str(order.get("id") or "").strip()
+        if order_id in self._index:
+            return
+        self._index[order_id] = (segment, offset)
+        self._by_user.setdefault(str(order.get("userId") or "guest"), []).append(order_id)
+
+    def _segments(self) -> list[Path]:
+        return sorted(self.directory.glob("orders-*.jsonl"), key=_segment_number)
+
+    def _next_segment(self) -> Path:
+        segments = self._segments()
+        number = _segment_number(segments[-1]) + 1 if segments else 1
+        path = self.directory / _segment_name(number)
+        path.touch()
+        return path
+
+
+def _segment_name(number: int) -> str:
+    return f"orders-{number:06d}.jsonl"
+
+
+def _segment_number(path: Path) -> int:
+    try:
+        return int(path.stem.split("-", 1)[1])
+    except (IndexError, ValueError):
+        return 0
+
+
+def _parse_line(raw: bytes) -> Optional[dict[str, Any]]:
+    if not raw.endswith(b"\n"):
+        return None
+    try:
+        order = json.loads(raw)
+    except ValueError:
+        return None
+    return order if isinstance(order, dict) else None
+
+
+def _line_count(path: Path) -> int:
+    with path.open("rb") as handle:
+        return sum(1 for _ in handle)
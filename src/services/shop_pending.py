@@ -0,0 +1,155 @@
+import heapq
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Optional
+
+from ..utils.logger import logger
+
+
+class PendingPaymentStore:
+    """Pending checkouts keyed by token, with per-entry expiry.
+
+    Entries live in memory; ``shop_pending_payments.json`` is the snapshot and every put/delete is
+    appended to a journal, so creating a checkout writes one line instead of every pending entry.
+    Expired entries are moved to an archive file by ``expire``.
+    """
+
+    def __init__(self, snapshot_file: Path, journal_file: Path, archive_file: Path, compact_every: int = 500):
+        self.snapshot_file = snapshot_file
+        self.journal_file = journal_file
+        self.archive_file = archive_file
+        self.compact_every = max(1, compact_every)
+        self.entries: dict[str, dict[str, Any]] = {}
+        self._expiry_heap: list[tuple[float, str]] = []
+        self._ops_since_snapshot = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, token: str) -> Optional[dict[str, Any]]:
+        return self.entries.get(token)
+
+    def load(self) -> None:
+        self.entries.clear()
+        self._expiry_heap.clear()
+        self._ops_since_snapshot = 0
+        try:
+            snapshot = json.loads(self.snapshot_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            snapshot = {}
+        if isinstance(snapshot, dict):
+            for token, entry in snapshot.items():
+                if isinstance(entry, dict):
+                    self.entries[str(token)] = entry
+
+        if self.journal_file.exists():
+            with self.journal_file.open("r", encoding="utf-8") as handle:
+                for line in handle:
+                    try:
+                        op = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._apply(op)
+                    self._ops_since_snapshot += 1
+        for token, entry in self.entries.items():
+            self._schedule(token, entry)
+
+    def put(self, token: str, entry: dict[str, Any]) -> None:
+        self._commit({"op": "put", "token": token, "entry": entry})
+        self._schedule(token, entry)
+
+    def expire(self, now: datetime, fallback_ttl: timedelta) -> list[str]:
+        """Archive every entry whose ``expiresAt`` (or ``createdAt + fallback_ttl``) is before ``now``; returns their tokens."""
+        cutoff = now.timestamp()
+        expired: dict[str, dict[str, Any]] = {}
+        while self._expiry_heap and self._expiry_heap[0][0] <= cutoff:
+            _, token = heapq.heappop(self._expiry_heap)
+            entry = self.entries.get(token)
+            if entry is None or token in expired:
+                continue
+            expires_at = _expires_at(entry, fallback_ttl)
+            if expires_at > cutoff:
+                # Entries without ``expiresAt`` were scheduled at creation time, and entries re-put with a later
+                # expiry leave stale items behind: wait until the real expiry comes round.
+                heapq.heappush(self._expiry_heap, (expires_at, token))
+                continue
+            expired[token] = entry
+        self._archive(expired, now)
+        return list(expired)
+
+    def archive(self, token: str, now: datetime) -> bool:
+        """Archive one entry straight away, e.g. once its checkout has completed or been cancelled."""
+        entry = self.entries.get(token)
+        if entry is None:
+            return False
+        # Its heap item is skipped as stale when it comes up.
+        self._archive({token: entry}, now)
+        return True
+
+    def _archive(self, entries: dict[str, dict[str, Any]], now: datetime) -> None:
+        if not entries:
+            return
+        archived_at = now.isoformat()
+        with self.archive_file.open("a", encoding="utf-8") as handle:
+            for token, entry in entries.items():
+                handle.write(_dumps({"token": token, "archivedAt": archived_at, "entry": entry}) + "\n")
+            handle.flush()
+            os.fsync(handle.fileno())
+        for token in entries:
+            self._commit({"op": "del", "token": token})
+
+    def compact(self) -> None:
+        temp_file = self.snapshot_file.with_suffix(self.snapshot_file.suffix + ".tmp")
+        with temp_file.open("w", encoding="utf-8") as handle:
+            handle.write(_dumps(self.entries))
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temp_file, self.snapshot_file)
+        self.journal_file.write_text("", encoding="utf-8")
+        self._ops_since_snapshot = 0
+
+    def _commit(self, op: dict[str, Any]) -> None:
+        self._apply(op)
+        with self.journal_file.open("a", encoding="utf-8") as handle:
+            handle.write(_dumps(op) + "\n")
+            handle.flush()
+            os.fsync(handle.fileno())
+        self._ops_since_snapshot += 1
+        if self._ops_since_snapshot >= self.compact_every:
+            self.compact()
+
+    def _apply(self, op: dict[str, Any]) -> None:
+        token = str(op.get("token", ""))
+        if op.get("op") == "put" and isinstance(op.get("entry"), dict):
+            self.entries[token] = op["entry"]
+        elif op.get("op") == "del":
+            self.entries.pop(token, None)
+
+    def _schedule(self, token: str, entry: dict[str, Any]) -> None:
+        # Entries without an expiry are scheduled at their creation time; expire() applies the fallback TTL.
+        heapq.heappush(self._expiry_heap, (_expires_at(entry, timedelta(0)), token))
+
+
+def _expires_at(entry: dict[str, Any], fallback_ttl: timedelta) -> float:
+    expires_at = _parse_time(entry.get("expiresAt"))
+    if expires_at is not None:
+        return expires_at.timestamp()
+    created_at = _parse_time(entry.get("createdAt")) or datetime.now(timezone.utc)
+    return (created_at + fallback_ttl).timestamp()
+
+
+def _parse_time(value: Any) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        logger.warning(f"Ignoring invalid pending payment timestamp: {value!r}")
+        return None
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+
+def _dumps(payload: Any) -> str:
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
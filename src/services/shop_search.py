@@ -0,0 +1,88 @@
+import bisect
+import re
+from typing import Any, Iterable, Optional
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Points a query word earns for a product, by the best field it appears in.
+FIELD_WEIGHTS = {"name": 3, "features": 2, "description": 1}
+
+
+def search_terms(text: str) -> list[str]:
+    """Lowercased words of ``text`` worth searching for (three characters or more), in order, deduplicated."""
+    return list(dict.fromkeys(word for word in _WORD.findall(str(text).lower()) if len(word) > 2))
+
+
+def _number(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class ProductSearchIndex:
+    """Inverted index from catalog words to the products containing them.
+
+    Built once per catalog snapshot; a query only touches the postings of its own words. Every suffix of
+    an indexed word is indexed too, so a query word matches any word containing it ("net" and "flix"
+    both find "netflix"), like the substring checks this replaces.
+    """
+
+    def __init__(self, products: Iterable[Any]):
+        self.products: list[dict[str, Any]] = [product for product in products if isinstance(product, dict)]
+        # word suffix -> {product position: best field weight}
+        self._postings: dict[str, dict[int, int]] = {}
+        for position, product in enumerate(self.products):
+            features = product.get("features")
+            fields = {
+                "name": product.get("name", ""),
+                "features": " ".join(str(feature) for feature in features) if isinstance(features, list) else "",
+                "description": product.get("description", ""),
+            }
+            for field, text in fields.items():
+                weight = FIELD_WEIGHTS[field]
+                for word in search_terms(text):
+                    # Query words have three characters or more, so shorter suffixes can never match.
+                    for start in range(len(word) - 2):
+                        postings = self._postings.setdefault(word[start:], {})
+                        if postings.get(position, 0) < weight:
+                            postings[position] = weight
+        self._words = sorted(self._postings)
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def _matches(self, term: str) -> dict[int, int]:
+        start = bisect.bisect_left(self._words, term)
+        end = bisect.bisect_left(self._words, term + "\x7f", lo=start)
+        if end - start == 1:
+            return self._postings[self._words[start]]
+        merged: dict[int, int] = {}
+        for word in self._words[start:end]:
+            for position, weight in self._postings[word].items():
+                if merged.get(position, 0) < weight:
+                    merged[position] = weight
+        return merged
+
+    def search(self, query: str, limit: Optional[int] = None, in_stock_only: bool = False) -> list[dict[str, Any]]:
+        """Products matching any word of ``query``, best first.
+
+        Ranked by summed field weights, then by stock (more first), then by price (cheaper first).
+        A query without searchable words matches nothing.
+        """
+        scores: dict[int, int] = {}
+        for term in search_terms(query):
+            for position, weight in self._matches(term).items():
+                scores[position] = scores.get(position, 0) + weight
+
+        ranked: list[tuple[int, float, float, int]] = []
+        for position, score in scores.items():
+            product = self.products[position]
+            stock = _number(product.get("stock"))
+            if in_stock_only and stock <= 0:
+                continue
+            ranked.append((-score, -stock, _number(product.get("price")), position))
+        ranked.sort()
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [self.products[position] for *_, position in ranked]
@@ -0,0 +1,1681 @@
+import asyncio
+import functools
+import json
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Optional
+
+import asyncpg
+
+from ..utils.logger import logger
+from .metrics import storage_call_duration_seconds, storage_call_errors_total, storage_calls_in_flight
+from .shop_inventory import InventoryStore
+from .shop_orders import OrderLog
+from .shop_pending import PendingPaymentStore
+
+
+ProductNormalizer = Callable[[dict[str, Any]], dict[str, Any]]
+
+# (credential key, product id, tier id or "", quantity)
+Allocation = tuple[str, str, str, int]
+
+# Receives the current pending entry and returns the entry to store, or None to leave it untouched.
+PendingUpdate = Callable[[dict[str, Any]], Optional[dict[str, Any]]]
+
+
+class KeyedLocks:
+    """asyncio locks created on demand per key and dropped again once nobody holds or waits on them."""
+
+    def __init__(self):
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._holders: dict[str, int] = {}
+
+    @asynccontextmanager
+    async def hold(self, *keys: str) -> AsyncIterator[None]:
+        # Always acquire in sorted order so two callers locking overlapping keys cannot deadlock.
+        ordered = sorted(set(keys))
+        acquired: list[str] = []
+        try:
+            for key in ordered:
+                self._holders[key] = self._holders.get(key, 0) + 1
+                lock = self._locks.setdefault(key, asyncio.Lock())
+                try:
+                    await lock.acquire()
+                except BaseException:
+                    self._release_holder(key)
+                    raise
+                acquired.append(key)
+            yield
+        finally:
+            for key in reversed(acquired):
+                self._locks[key].release()
+                self._release_holder(key)
+
+    def locked(self, key: str) -> bool:
+        lock = self._locks.get(key)
+        return lock is not None and lock.locked()
+
+    def _release_holder(self, key: str) -> None:
+        remaining = self._holders.get(key, 1) - 1
+        if remaining <= 0:
+            self._holders.pop(key, None)
+            self._locks.pop(key, None)
+        else:
+            self._holders[key] = remaining
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_id: str, tier_id: str = ""):
+        super().__init__(f"not enough deliverable stock for {product_id}" + (f" ({tier_id})" if tier_id else ""))
+        self.product_id = product_id
+        self.tier_id = tier_id
+
+
+def _timed(backend: str, operation: str, method: Callable[..., Any]) -> Callable[..., Any]:
+    @functools.wraps(method)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        storage_calls_in_flight.inc()
+        try:
+            return await method(*args, **kwargs)
+        except InsufficientStock:
+            raise
+        except Exception:
+            storage_call_errors_total.inc(backend=backend, operation=operation)
+            raise
+        finally:
+            storage_calls_in_flight.dec()
+            storage_call_duration_seconds.observe(time.perf_counter() - started, backend=backend, operation=operation)
+
+    return wrapper
+
+
+class ShopStorage(ABC):
+    backend_name = "base"
+    # True when paid orders are queued in the store for the bot process to log (see claim_order_events).
+    order_events = False
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        # Every backend implementation of the storage interface is timed for /metrics.
+        for name, member in list(vars(cls).items()):
+            if name.startswith("_") or name in {"init", "close"} or not asyncio.iscoroutinefunction(member):
+                continue
+            if name in vars(ShopStorage):
+                setattr(cls, name, _timed(cls.backend_name, name, member))
+
+    def __init__(self, normalize_product: ProductNormalizer):
+        self.normalize_product = normalize_product
+        # Bumped on every local catalog mutation so in-process caches can tell they are stale.
+        self.catalog_version = 0
+
+    async def init(self) -> None:
+        return None
+
+    async def fetch_catalog_marker(self) -> Any:
+        """Return a cheap token that changes whenever any process modifies the catalog."""
+        return None
+
+    async def close(self) -> None:
+        return None
+
+    @abstractmethod
+    async def load_products(self) -> list[dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_inventory(self, product_id: str, tier_id: str) -> Optional[list[str]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def save_product(self, product: dict[str, Any], replace_inventory: Optional[set[str]] = None) -> None:
+        """Upsert a product. Only holders in ``replace_inventory`` ("" or tier ids) take the given keys; None means all."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_product(self, product_id: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def add_inventory(self, product_id: str, tier_id: str, items: list[str]) -> Optional[int]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def remove_inventory(self, product_id: str, tier_id: str, count: int) -> Optional[int]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def import_inventory(self, product_id: str, tier_id: str, items: list[str]) -> Optional[tuple[int, int]]:
+        """Add the keys that are not already in stock or held for this product/tier; returns (added, stock).
+
+        Repeats within ``items`` are added once. Returns None if the product or tier does not exist.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def reserve_stock(self, hold_id: str, allocations: list[Allocation]) -> None:
+        """Hold keys for every allocation under ``hold_id``, or raise InsufficientStock and hold nothing.
+
+        Held keys stop counting as stock until they are delivered by ``commit_purchase`` or released.
+        Reserving an existing ``hold_id`` again is a no-op.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def release_stock(self, hold_id: str) -> int:
+        """Return every key held under ``hold_id`` to stock; returns how many were released."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def commit_purchase(
+        self,
+        order_record: dict[str, Any],
+        allocations: list[Allocation],
+        hold_id: Optional[str] = None,
+    ) -> dict[str, Any]:
+        """Deliver keys for every allocation and store the order, or raise InsufficientStock and change nothing.
+
+        Keys held under ``hold_id`` are delivered first; anything the hold does not cover is taken from
+        stock, and leftover held keys are released. If an order with the same id already exists it is
+        returned unchanged instead.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_order(self, order_id: str) -> Optional[dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def load_orders(self) -> list[dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def load_user_orders(self, user_id: str, limit: int = 50) -> list[dict[str, Any]]:
+        """Newest ``limit`` orders for ``user_id``."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_pending_payment(self, token: str) -> Optional[dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def save_pending_payment(self, token: str, entry: dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def update_pending_payment(self, token: str, update: PendingUpdate) -> Optional[dict[str, Any]]:
+        """Atomically apply ``update`` to a pending entry; returns the stored entry or None if the token is unknown."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def load_pending_payments(self) -> dict[str, Any]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def expire_pending_payments(self, fallback_ttl: timedelta) -> int:
+        """Archive entries past their ``expiresAt`` (``createdAt + fallback_ttl`` for older entries)."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def archive_pending_payment(self, token: str) -> bool:
+        """Archive a finished (completed or cancelled) entry now rather than at its expiry; False if it is unknown."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def count_records(self) -> dict[str, int]:
+        """Product, order and pending payment counts without loading the records themselves."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def claim_order_events(self, limit: int, lease: timedelta) -> list[tuple[int, dict[str, Any]]]:
+        """Claim up to ``limit`` unlogged orders as (event id, order); a claim not acked within ``lease`` is handed out again."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def ack_order_events(self, event_ids: list[int]) -> None:
+        raise NotImplementedError
+
+
+class JsonShopStorage(ShopStorage):
+    backend_name = "json"
+
+    def __init__(
+        self,
+        data_dir: Path,
+        normalize_product: ProductNormalizer,
+        inventory_compact_every: int = 500,
+        order_segment_size: int = 5000,
+    ):
+        super().__init__(normalize_product)
+        self.data_dir = data_dir
+        self.products_file = self.data_dir / "shop_products.json"
+        self.legacy_orders_file = self.data_dir / "shop_orders.json"
+        self.pending_payments_file = self.data_dir / "shop_pending_payments.json"
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        _ensure_json_file(self.products_file, [])
+        _ensure_json_file(self.pending_payments_file, {})
+        self.pending = PendingPaymentStore(
+            self.pending_payments_file,
+            self.data_dir / "shop_pending_payments.journal",
+            self.data_dir / "shop_pending_payments.archive.jsonl",
+            compact_every=inventory_compact_every,
+        )
+        self._pending_loaded = False
+        self.orders = OrderLog(self.data_dir / "orders", segment_size=order_segment_size)
+        self._orders_loaded = False
+        self.inventory = InventoryStore(
+            self.data_dir / "shop_inventory.json",
+            self.data_dir / "shop_inventory.journal",
+            compact_every=inventory_compact_every,
+        )
+        self._inventory_loaded = False
+        self._product_count: tuple[Any, int] = (None, 0)
+        self._locks = KeyedLocks()
+        # All file I/O and JSON work runs on this one thread, which also serializes access to the in-memory stores.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shop-json")
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(func, *args))
+
+    async def init(self) -> None:
+        await self._run(self._init_sync)
+
+    def _init_sync(self) -> None:
+        self._ensure_inventory()
+        self._ensure_orders()
+        self._ensure_pending()
+
+    async def close(self) -> None:
+        # Jobs run in submission order, so once this no-op finishes every earlier write has landed.
+        await self._run(lambda: None)
+        self._executor.shutdown(wait=False)
+
+    def _ensure_pending(self) -> None:
+        if not self._pending_loaded:
+            self._pending_loaded = True
+            self.pending.load()
+
+    def _ensure_orders(self) -> None:
+        if self._orders_loaded:
+            return
+        self._orders_loaded = True
+        self.orders.open()
+        if not self.legacy_orders_file.exists():
+            return
+
+        # Orders used to be one JSON array rewritten on every sale; import it once and keep it as a backup.
+        legacy = _read_json(self.legacy_orders_file, default=[])
+        self.orders.append_many([order for order in legacy if isinstance(order, dict)] if isinstance(legacy, list) else [])
+        self.legacy_orders_file.replace(self.legacy_orders_file.with_name("shop_orders.json.migrated"))
+        logger.info(f"Moved {len(self.orders)} orders from {self.legacy_orders_file.name} into the order log")
+
+    def _ensure_inventory(self) -> None:
+        if self._inventory_loaded:
+            return
+        self._inventory_loaded = True
+        if self.inventory.load():
+            return
+
+        # First start on this layout: move the keys embedded in the products file into the inventory store.
+        products = self._read_products()
+        for product in products:
+            product_id = str(product.get("id", "")).strip()
+            self.inventory.queue(product_id, "").push(_clean_items(product.get("inventory")))
+            for tier in _tier_dicts(product):
+                tier_id = str(tier.get("id", "")).strip()
+                self.inventory.queue(product_id, tier_id).push(_clean_items(tier.get("inventory")))
+        self.inventory.compact()
+        self._write_products(products)
+
+    async def fetch_catalog_marker(self) -> Any:
+        try:
+            return self.products_file.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _read_products(self) -> list[dict[str, Any]]:
+        data = _read_json(self.products_file, default=[])
+        if not isinstance(data, list):
+            return []
+        return [item for item in data if isinstance(item, dict)]
+
+    def _write_products(self, products: list[dict[str, Any]]) -> None:
+        _write_json(self.products_file, [_without_inventory(product) for product in products])
+        self.catalog_version += 1
+
+    def _commit_inventory(self, ops: list[dict[str, Any]]) -> list[Any]:
+        results = self.inventory.commit(ops)
+        self.catalog_version += 1
+        return results
+
+    async def load_products(self) -> list[dict[str, Any]]:
+        return await self._run(self._load_products_sync)
+
+    def _load_products_sync(self) -> list[dict[str, Any]]:
+        self._ensure_inventory()
+        products: list[dict[str, Any]] = []
+        for raw in self._read_products():
+            product = _without_inventory(raw)
+            product_id = str(product.get("id", "")).strip()
+            product["stock"] = self.inventory.stock(product_id, "")
+            product["reserved"] = self.inventory.reserved(product_id, "")
+            for tier in product["tiers"]:
+                tier_id = str(tier.get("id", "")).strip()
+                tier["stock"] = self.inventory.stock(product_id, tier_id)
+                tier["reserved"] = self.inventory.reserved(product_id, tier_id)
+            products.append(self.normalize_product(product))
+        return products
+
+    async def get_inventory(self, product_id: str, tier_id: str) -> Optional[list[str]]:
+        return await self._run(self._get_inventory_sync, product_id, tier_id)
+
+    def _get_inventory_sync(self, product_id: str, tier_id: str) -> Optional[list[str]]:
+        self._ensure_inventory()
+        if not _holder_exists(self._read_products(), product_id, tier_id):
+            return None
+        queue = self.inventory.get(product_id, tier_id)
+        return list(queue.available) if queue is not None else []
+
+    async def save_product(self, product: dict[str, Any], replace_inventory: Optional[set[str]] = None) -> None:
+        async with self._locks.hold("products"):
+            await self._run(self._save_product_sync, product, replace_inventory)
+
+    def _save_product_sync(self, product: dict[str, Any], replace_inventory: Optional[set[str]] = None) -> None:
+        self._ensure_inventory()
+        products = self._read_products()
+        product_id = str(product.get("id", "")).strip()
+        tier_ids = [str(tier.get("id", "")).strip() for tier in _tier_dicts(product)]
+
+        ops: list[dict[str, Any]] = []
+        position = next((idx for idx, item in enumerate(products) if str(item.get("id", "")).strip() == product_id), None)
+        if position is not None:
+            for tier in _tier_dicts(products[position]):
+                old_tier_id = str(tier.get("id", "")).strip()
+                if old_tier_id not in tier_ids:
+                    ops.append({"op": "remove", "p": product_id, "t": old_tier_id})
+        if replace_inventory is None or "" in replace_inventory:
+            ops.append({"op": "replace", "p": product_id, "t": "", "items": _clean_items(product.get("inventory"))})
+        for tier in _tier_dicts(product):
+            tier_id = str(tier.get("id", "")).strip()
+            if replace_inventory is None or tier_id in replace_inventory:
+                ops.append({"op": "replace", "p": product_id, "t": tier_id, "items": _clean_items(tier.get("inventory"))})
+        self._commit_inventory(ops)
+
+        if position is None:
+            products.append(product)
+        else:
+            products[position] = product
+        self._write_products(products)
+
+    async def delete_product(self, product_id: str) -> bool:
+        async with self._locks.hold("products"):
+            return await self._run(self._delete_product_sync, product_id)
+
+    def _delete_product_sync(self, product_id: str) -> bool:
+        self._ensure_inventory()
+        products = self._read_products()
+        removed = [product for product in products if str(product.get("id", "")).strip() == product_id]
+        if not removed:
+            return False
+        ops = [{"op": "remove", "p": product_id, "t": ""}]
+        for tier in _tier_dicts(removed[0]):
+            ops.append({"op": "remove", "p": product_id, "t": str(tier.get("id", "")).strip()})
+        self._commit_inventory(ops)
+        self._write_products([product for product in products if str(product.get("id", "")).strip() != product_id])
+        return True
+
+    async def add_inventory(self, product_id: str, tier_id: str, items: list[str]) -> Optional[int]:
+        async with self._locks.hold("products"):
+            return await self._run(self._add_inventory_sync, product_id, tier_id, items)
+
+    def _add_inventory_sync(self, product_id: str, tier_id: str, items: list[str]) -> Optional[int]:
+        self._ensure_inventory()
+        if not _holder_exists(self._read_products(), product_id, tier_id):
+            return None
+        return self._commit_inventory([{"op": "add", "p": product_id, "t": tier_id, "items": items}])[0]
+
+    async def remove_inventory(self, product_id: str, tier_id: str, count: int) -> Optional[int]:
+        async with self._locks.hold("products"):
+            return await self._run(self._remove_inventory_sync, product_id, tier_id, count)
+
+    async def import_inventory(self, product_id: str, tier_id: str, items: list[str]) -> Optional[tuple[int, int]]:
+        async with self._locks.hold("products"):
+            return await self._run(self._import_inventory_sync, product_id, tier_id, items)
+
+    def _import_inventory_sync(self, product_id: str, tier_id: str, items: list[str]) -> Optional[tuple[int, int]]:
+        self._ensure_inventory()
+        if not _holder_exists(self._read_products(), product_id, tier_id):
+            return None
+        queue = self.inventory.get(product_id, tier_id)
+        seen = queue.keys() if queue is not None else set()
+        fresh: list[str] = []
+        for item in items:
+            if item not in seen:
+                seen.add(item)
+                fresh.append(item)
+        if not fresh:
+            return 0, self.inventory.stock(product_id, tier_id)
+        return len(fresh), self._commit_inventory([{"op": "add", "p": product_id, "t": tier_id, "items": fresh}])[0]
+
+    def _remove_inventory_sync(self, product_id: str, tier_id: str, count: int) -> Optional[int]:
+        self._ensure_inventory()
+        if not _holder_exists(self._read_products(), product_id, tier_id):
+            return None
+        self._commit_inventory([{"op": "drop", "p": product_id, "t": tier_id, "n": max(0, count)}])
+        return self.inventory.stock(product_id, tier_id)
+
+    async def reserve_stock(self, hold_id: str, allocations: list[Allocation]) -> None:
+        async with self._locks.hold("products"):
+            await self._run(self._reserve_stock_sync, hold_id, allocations)
+
+    def _reserve_stock_sync(self, hold_id: str, allocations: list[Allocation]) -> None:
+        self._ensure_inventory()
+        if self.inventory.holds(hold_id):
+            return
+        products = self._read_products()
+        needed = _needed_by_holder(allocations)
+        for (product_id, tier_id), quantity in needed.items():
+            if not _holder_exists(products, product_id, tier_id) or self.inventory.stock(product_id, tier_id) < quantity:
+                raise InsufficientStock(product_id, tier_id)
+        self._commit_inventory(
+            [
+                {"op": "reserve", "p": product_id, "t": tier_id, "n": quantity, "hold": hold_id}
+                for (product_id, tier_id), quantity in needed.items()
+            ]
+        )
+
+    async def release_stock(self, hold_id: str) -> int:
+        async with self._locks.hold("products"):
+            return await self._run(self._release_stock_sync, [hold_id])
+
+    def _release_stock_sync(self, hold_ids: list[str]) -> int:
+        self._ensure_inventory()
+        ops = [
+            {"op": "release", "p": product_id, "t": tier_id, "hold": hold_id}
+            for hold_id in hold_ids
+            for product_id, tier_id in self.inventory.holds(hold_id)
+        ]
+        if not ops:
+            return 0
+        return sum(len(released) for released in self._commit_inventory(ops))
+
+    async def commit_purchase(
+        self,
+        order_record: dict[str, Any],
+        allocations: list[Allocation],
+        hold_id: Optional[str] = None,
+    ) -> dict[str, Any]:
+        async with self._locks.hold("orders", "products"):
+            return await self._run(self._commit_purchase_sync, order_record, allocations, hold_id)
+
+    def _commit_purchase_sync(
+        self,
+        order_record: dict[str, Any],
+        allocations: list[Allocation],
+        hold_id: Optional[str] = None,
+    ) -> dict[str, Any]:
+        self._ensure_inventory()
+        self._ensure_orders()
+        order_id = str(order_record.get("id") or "").strip()
+        existing_order = self.orders.get(order_id)
+        if existing_order is not None:
+            return existing_order
+
+        products = self._read_products()
+        needed = _needed_by_holder(allocations)
+        ops: list[dict[str, Any]] = []
+        for (product_id, tier_id), quantity in needed.items():
+            queue = self.inventory.get(product_id, tier_id)
+            held = queue.reserved.get(hold_id) if hold_id and queue is not None else None
+            if held is not None and len(held) == quantity:
+                ops.append({"op": "deliver", "p": product_id, "t": tier_id, "hold": hold_id, "order": order_id})
+                continue
+            # No usable hold (expired, released or a different size): put any held keys back and take from stock.
+            available = self.inventory.stock(product_id, tier_id) + len(held or [])
+            if not _holder_exists(products, product_id, tier_id) or available < quantity:
+                raise InsufficientStock(product_id, tier_id)
+            if held is not None:
+                ops.append({"op": "release", "p": product_id, "t": tier_id, "hold": hold_id})
+            ops.append({"op": "take", "p": product_id, "t": tier_id, "n": quantity, "order": order_id})
+        if hold_id:
+            for product_id, tier_id in self.inventory.holds(hold_id):
+                if (product_id, tier_id) not in needed:
+                    ops.append({"op": "release", "p": product_id, "t": tier_id, "hold": hold_id})
+
+        delivered: dict[tuple[str, str], list[str]] = {}
+        for op, keys in zip(ops, self._commit_inventory(ops)):
+            if op["op"] in {"deliver", "take"}:
+                delivered[(op["p"], op["t"])] = list(keys)
+        credentials: dict[str, str] = {}
+        for credential_key, product_id, tier_id, quantity in allocations:
+            keys = delivered[(product_id, tier_id)]
+            credentials[credential_key] = "\n".join(keys[:quantity])
+            del keys[:quantity]
+        order_record["credentials"] = credentials
+        self.orders.append(order_record)
+        return order_record
+
+    async def get_order(self, order_id: str) -> Optional[dict[str, Any]]:
+        return await self._run(self._get_order_sync, order_id)
+
+    def _get_order_sync(self, order_id: str) -> Optional[dict[str, Any]]:
+        self._ensure_orders()
+        return self.orders.get(order_id)
+
+    async def load_user_orders(self, user_id: str, limit: int = 50) -> list[dict[str, Any]]:
+        return await self._run(self._load_user_orders_sync, user_id, limit)
+
+    def _load_user_orders_sync(self, user_id: str, limit: int = 50) -> list[dict[str, Any]]:
+        self._ensure_orders()
+        return self.orders.for_user(user_id, limit=limit)
+
+    async def load_orders(self) -> list[dict[str, Any]]:
+        return await self._run(self._load_orders_sync)
+
+    def _load_orders_sync(self) -> list[dict[str, Any]]:
+        self._ensure_orders()
+        return list(self.orders)
+
+    async def get_pending_payment(self, token: str) -> Optional[dict[str, Any]]:
+        return await self._run(self._get_pending_payment_sync, token)
+
+    def _get_pending_payment_sync(self, token: str) -> Optional[dict[str, Any]]:
+        self._ensure_pending()
+        return self.pending.get(token)
+
+    async def save_pending_payment(self, token: str, entry: dict[str, Any]) -> None:
+        async with self._locks.hold("pending_payments"):
+            await self._run(self._save_pending_payment_sync, token, entry)
+
+    def _save_pending_payment_sync(self, token: str, entry: dict[str, Any]) -> None:
+        self._ensure_pending()
+        self.pending.put(token, entry)
+
+    async def update_pending_payment(self, token: str, update: PendingUpdate) -> Optional[dict[str, Any]]:
+        async with self._locks.hold("pending_payments"):
+            return await self._run(self._update_pending_payment_sync, token, update)
+
+    def _update_pending_payment_sync(self, token: str, update: PendingUpdate) -> Optional[dict[str, Any]]:
+        self._ensure_pending()
+        entry = self.pending.get(token)
+        if entry is None:
+            return None
+        updated = update(dict(entry))
+        if updated is None:
+            return entry
+        self.pending.put(token, updated)
+        return updated
+
+    async def load_pending_payments(self) -> dict[str, Any]:
+        return await self._run(self._load_pending_payments_sync)
+
+    def _load_pending_payments_sync(self) -> dict[str, Any]:
+        self._ensure_pending()
+        return dict(self.pending.entries)
+
+    async def expire_pending_payments(self, fallback_ttl: timedelta) -> int:
+        async with self._locks.hold("pending_payments", "products"):
+            return await self._run(self._expire_pending_payments_sync, fallback_ttl)
+
+    def _expire_pending_payments_sync(self, fallback_ttl: timedelta) -> int:
+        self._ensure_pending()
+        expired = self.pending.expire(datetime.now(timezone.utc), fallback_ttl)
+        if expired:
+            self._release_stock_sync(expired)
+        return len(expired)
+
+    async def archive_pending_payment(self, token: str) -> bool:
+        async with self._locks.hold("pending_payments"):
+            return await self._run(self._archive_pending_payment_sync, token)
+
+    def _archive_pending_payment_sync(self, token: str) -> bool:
+        self._ensure_pending()
+        return self.pending.archive(token, datetime.now(timezone.utc))
+
+    async def count_records(self) -> dict[str, int]:
+        return await self._run(self._count_records_sync)
+
+    def _count_records_sync(self) -> dict[str, int]:
+        self._ensure_orders()
+        self._ensure_pending()
+        try:
+            marker = self.products_file.stat().st_mtime_ns
+        except OSError:
+            marker = None
+        # The products file is only re-read when it changed since the last count.
+        if marker is None or self._product_count[0] != marker:
+            self._product_count = (marker, len(self._read_products()))
+        return {"products": self._product_count[1], "orders": len(self.orders), "pendingPayments": len(self.pending)}
+
+    # No order event queue: in JSON mode the process that stores an order also logs it (order_events is False).
+    async def claim_order_events(self, limit: int, lease: timedelta) -> list[tuple[int, dict[str, Any]]]:
+        return []
+
+    async def ack_order_events(self, event_ids: list[int]) -> None:
+        return None
+
+
+class PostgresShopStorage(ShopStorage):
+    backend_name = "supabase"
+    order_events = True
+
+    def __init__(
+        self,
+        pool: asyncpg.Pool,
+        normalize_product: ProductNormalizer,
+        kv_table: str = "shop_kv",
+        table_prefix: str = "shop_",
+        legacy_data_dir: Optional[Path] = None,
+        listen_dsn: Optional[str] = None,
+    ):
+        super().__init__(normalize_product)
+        self.pool = pool
+        self.kv_table = kv_table
+        self.products_table = f"{table_prefix}products"
+        self.tiers_table = f"{table_prefix}product_tiers"
+        self.inventory_table = f"{table_prefix}inventory_items"
+        self.counts_table = f"{table_prefix}inventory_counts"
+        self.orders_table = f"{table_prefix}orders"
+        self.pending_table = f"{table_prefix}pending_payments"
+        self.pending_archive_table = f"{table_prefix}pending_payments_archive"
+        self.order_events_table = f"{table_prefix}order_events"
+        self.legacy_data_dir = legacy_data_dir
+        # Other API processes sharing these tables announce catalog changes and new orders on these channels.
+        self.listen_dsn = listen_dsn
+        self.catalog_channel = f"{table_prefix}catalog"
+        self.order_events_channel = f"{table_prefix}order_events"
+        self.order_events_ready = asyncio.Event()
+        self._instance_id = uuid.uuid4().hex
+        self._listener: Optional[asyncio.Task] = None
+
+    async def init(self) -> None:
+        async with self.pool.acquire() as conn:
+            await conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {self.kv_table} (
+                    key TEXT PRIMARY KEY,
+                    value_json TEXT NOT NULL,
+                    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+                );
+                CREATE TABLE IF NOT EXISTS {self.products_table} (
+                    id TEXT PRIMARY KEY,
+                    position INTEGER NOT NULL DEFAULT 0,
+                    name TEXT NOT NULL DEFAULT '',
+                    price DOUBLE PRECISION NOT NULL DEFAULT 0,
+                    visibility TEXT NOT NULL DEFAULT 'public',
+                    data_json TEXT NOT NULL,
+                    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+                );
+                CREATE TABLE IF NOT EXISTS {self.tiers_table} (
+                    product_id TEXT NOT NULL REFERENCES {self.products_table} (id) ON DELETE CASCADE,
+                    id TEXT NOT NULL,
+                    position INTEGER NOT NULL DEFAULT 0,
+                    name TEXT NOT NULL DEFAULT '',
+                    price DOUBLE PRECISION NOT NULL DEFAULT 0,
+                    data_json TEXT NOT NULL,
+                    PRIMARY KEY (product_id, id)
+                );
+                CREATE TABLE IF NOT EXISTS {self.inventory_table} (
+                    id BIGSERIAL PRIMARY KEY,
+                    product_id TEXT NOT NULL,
+                    tier_id TEXT NOT NULL DEFAULT '',
+                    item TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'available',
+                    order_id TEXT,
+                    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                    delivered_at TIMESTAMPTZ
+                );
+                CREATE INDEX IF NOT EXISTS {self.inventory_table}_available_idx
+                    ON {self.inventory_table} (product_id, tier_id, id) WHERE status = 'available';
+                ALTER TABLE {self.inventory_table} ADD COLUMN IF NOT EXISTS hold_id TEXT;
+                CREATE INDEX IF NOT EXISTS {self.inventory_table}_hold_idx
+                    ON {self.inventory_table} (hold_id) WHERE status = 'reserved';
+                CREATE INDEX IF NOT EXISTS {self.inventory_table}_item_idx
+                    ON {self.inventory_table} (product_id, tier_id, item) WHERE status IN ('available', 'reserved');
+                CREATE TABLE IF NOT EXISTS {self.counts_table} (
+                    product_id TEXT NOT NULL,
+                    tier_id TEXT NOT NULL DEFAULT '',
+                    available INTEGER NOT NULL DEFAULT 0,
+                    reserved INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (product_id, tier_id)
+                );
+                CREATE TABLE IF NOT EXISTS {self.orders_table} (
+                    id TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL DEFAULT 'guest',
+                    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                    payment_method TEXT NOT NULL DEFAULT '',
+                    total DOUBLE PRECISION NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL DEFAULT 'completed',
+                    data_json TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS {self.orders_table}_user_idx ON {self.orders_table} (user_id, created_at DESC);
+                CREATE INDEX IF NOT EXISTS {self.orders_table}_created_idx ON {self.orders_table} (created_at);
+                CREATE TABLE IF NOT EXISTS {self.pending_table} (
+                    token TEXT PRIMARY KEY,
+                    payment_method TEXT NOT NULL DEFAULT '',
+                    gateway TEXT NOT NULL DEFAULT '',
+                    completed BOOLEAN NOT NULL DEFAULT FALSE,
+                    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                    data_json TEXT NOT NULL
+                );
+                ALTER TABLE {self.pending_table} ADD COLUMN IF NOT EXISTS expires_at TIMESTAMPTZ;
+                CREATE INDEX IF NOT EXISTS {self.pending_table}_expires_idx ON {self.pending_table} (expires_at);
+                CREATE TABLE IF NOT EXISTS {self.pending_archive_table} (
+                    token TEXT PRIMARY KEY,
+                    payment_method TEXT NOT NULL DEFAULT '',
+                    gateway TEXT NOT NULL DEFAULT '',
+                    completed BOOLEAN NOT NULL DEFAULT FALSE,
+                    created_at TIMESTAMPTZ NOT NULL,
+                    expires_at TIMESTAMPTZ,
+                    archived_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                    data_json TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS {self.order_events_table} (
+                    id BIGSERIAL PRIMARY KEY,
+                    order_id TEXT NOT NULL,
+                    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                    claimed_at TIMESTAMPTZ
+                );
+                """
+            )
+            await self._migrate_legacy(conn)
+            await self._backfill_inventory_counts(conn)
+        if self.listen_dsn and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                conn = await asyncpg.connect(self.listen_dsn)
+            except Exception as exc:
+                logger.warning(f"Shop storage LISTEN connection failed, retrying: {exc}")
+                await asyncio.sleep(5)
+                continue
+            try:
+                await conn.add_listener(self.catalog_channel, self._on_catalog_notify)
+                await conn.add_listener(self.order_events_channel, self._on_order_event_notify)
+                # Anything announced while this connection was down was missed; assume it all changed.
+                self.catalog_version += 1
+                self.order_events_ready.set()
+                while True:
+                    await asyncio.sleep(30)
+                    # A dead connection only shows up when it is used, so ping it.
+                    await conn.execute("SELECT 1")
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning(f"Shop storage LISTEN connection lost, reconnecting: {exc}")
+                await asyncio.sleep(1)
+            finally:
+                if not conn.is_closed():
+                    await conn.close()
+
+    def _on_catalog_notify(self, conn: Any, pid: int, channel: str, payload: str) -> None:
+        if payload != self._instance_id:
+            self.catalog_version += 1
+
+    def _on_order_event_notify(self, conn: Any, pid: int, channel: str, payload: str) -> None:
+        self.order_events_ready.set()
+
+    async def _migrate_legacy(self, conn: asyncpg.Connection) -> None:
+        async with conn.transaction():
+            # Serialize concurrent startups so only one process copies the legacy data.
+            await conn.execute("SELECT pg_advisory_xact_lock(hashtext($1))", f"{self.kv_table}:relational_migration")
+            marker = await conn.fetchval(f"SELECT value_json FROM {self.kv_table} WHERE key = $1", "relational_schema")
+            if marker is not None:
+                return
+
+            products = await self._legacy_value(conn, "products", "shop_products.json", [])
+            orders = await self._legacy_value(conn, "orders", "shop_orders.json", [])
+            pending = await self._legacy_value(conn, "pending_payments", "shop_pending_payments.json", {})
+
+            for position, raw_product in enumerate(products if isinstance(products, list) else []):
+                if not isinstance(raw_product, dict):
+                    continue
+                product = self.normalize_product(raw_product)
+                if product.get("id"):
+                    await self._write_product(conn, product, position=position)
+
+            for order in orders if isinstance(orders, list) else []:
+                if isinstance(order, dict) and str(order.get("id") or "").strip():
+                    await self._insert_order(conn, order)
+
+            for token, entry in (pending if isinstance(pending, dict) else {}).items():
+                if isinstance(entry, dict):
+                    await self._upsert_pending(conn, str(token), entry)
+
+            await conn.execute(
+                f"""
+                INSERT INTO {self.kv_table} (key, value_json, updated_at)
+                VALUES ($1, $2, NOW())
+                ON CONFLICT (key) DO UPDATE SET value_json = EXCLUDED.value_json, updated_at = NOW()
+                """,
+                "relational_schema",
+                json.dumps({"version": 1, "migratedAt": datetime.now(timezone.utc).isoformat()}),
+            )
+            logger.info(
+                f"Migrated legacy shop data into relational tables "
+                f"({len(products) if isinstance(products, list) else 0} products, "
+                f"{len(orders) if isinstance(orders, list) else 0} orders, "
+                f"{len(pending) if isinstance(pending, dict) else 0} pending payments)."
+            )
+
+    async def _backfill_inventory_counts(self, conn: asyncpg.Connection) -> None:
+        async with conn.transaction():
+            await conn.execute("SELECT pg_advisory_xact_lock(hashtext($1))", f"{self.kv_table}:inventory_counts")
+            marker = await conn.fetchval(f"SELECT value_json FROM {self.kv_table} WHERE key = $1", "inventory_counts")
+            if marker is not None:
+                return
+            await conn.execute(f"DELETE FROM {self.counts_table}")
+            await conn.execute(
+                f"""
+                INSERT INTO {self.counts_table} (product_id, tier_id, available, reserved)
+                SELECT product_id, tier_id, COUNT(*) FILTER (WHERE status = 'available'), COUNT(*) FILTER (WHERE status = 'reserved')
+                FROM {self.inventory_table}
+                WHERE status IN ('available', 'reserved')
+                GROUP BY product_id, tier_id
+                """
+            )
+            await conn.execute(
+                f"""
+                INSERT INTO {self.kv_table} (key, value_json, updated_at)
+                VALUES ($1, $2, NOW())
+                ON CONFLICT (key) DO UPDATE SET value_json = EXCLUDED.value_json, updated_at = NOW()
+                """,
+                "inventory_counts",
+                json.dumps({"version": 1, "backfilledAt": datetime.now(timezone.utc).isoformat()}),
+            )
+
+    async def fetch_catalog_marker(self) -> Any:
+        return await self.pool.fetchval(f"SELECT updated_at FROM {self.kv_table} WHERE key = $1", "catalog_version")
+
+    async def _mark_catalog_changed(self) -> None:
+        self.catalog_version += 1
+        await self.pool.execute(
+            f"""
+            WITH touched AS (
+                INSERT INTO {self.kv_table} (key, value_json, updated_at)
+                VALUES ($1, '{{}}', NOW())
+                ON CONFLICT (key) DO UPDATE SET updated_at = NOW()
+                RETURNING 1
+            )
+            SELECT pg_notify($2, $3) FROM touched
+            """,
+            "catalog_version",
+            self.catalog_channel,
+            self._instance_id,
+        )
+
+    async def _legacy_value(self, conn: asyncpg.Connection, key: str, filename: str, default: Any) -> Any:
+        raw = await conn.fetchval(f"SELECT value_json FROM {self.kv_table} WHERE key = $1", key)
+        if raw is not None:
+            try:
+                return json.loads(str(raw))
+            except Exception:
+                logger.warning(f"Legacy {self.kv_table} row '{key}' is not valid JSON; skipping it.")
+        if self.legacy_data_dir is not None:
+            return _read_json(self.legacy_data_dir / filename, default=default)
+        return default
+
+    async def load_products(self) -> list[dict[str, Any]]:
+        async with self.pool.acquire() as conn:
+            product_rows = await conn.fetch(f"SELECT id, data_json FROM {self.products_table} ORDER BY position, id")
+            tier_rows = await conn.fetch(
+                f"SELECT product_id, id, data_json FROM {self.tiers_table} ORDER BY product_id, position, id"
+            )
+            count_rows = await conn.fetch(f"SELECT product_id, tier_id, available, reserved FROM {self.counts_table}")
+
+        stock = {(row["product_id"], row["tier_id"]): row["available"] for row in count_rows}
+        reserved = {(row["product_id"], row["tier_id"]): row["reserved"] for row in count_rows}
+
+        tiers: dict[str, list[dict[str, Any]]] = {}
+        for row in tier_rows:
+            tier = _loads_dict(row["data_json"])
+            tier["id"] = row["id"]
+            tier["stock"] = stock.get((row["product_id"], row["id"]), 0)
+            tier["reserved"] = reserved.get((row["product_id"], row["id"]), 0)
+            tiers.setdefault(row["product_id"], []).append(tier)
+
+        products: list[dict[str, Any]] = []
+        for row in product_rows:
+            product = _loads_dict(row["data_json"])
+            product["id"] = row["id"]
+            product["tiers"] = tiers.get(row["id"], [])
+            product["stock"] = stock.get((row["id"], ""), 0)
+            product["reserved"] = reserved.get((row["id"], ""), 0)
+            products.append(self.normalize_product(product))
+        return products
+
+    async def get_inventory(self, product_id: str, tier_id: str) -> Optional[list[str]]:
+        async with self.pool.acquire() as conn:
+            if tier_id:
+                exists = await conn.fetchval(
+                    f"SELECT 1 FROM {self.tiers_table} WHERE product_id = $1 AND id = $2", product_id, tier_id
+                )
+            else:
+                exists = await conn.fetchval(f"SELECT 1 FROM {self.products_table} WHERE id = $1", product_id)
+            if exists is None:
+                return None
+            rows = await conn.fetch(
+                f"SELECT item FROM {self.inventory_table} WHERE product_id = $1 AND tier_id = $2 AND status = 'available' ORDER BY id",
+                product_id,
+                tier_id,
+            )
+        return [row["item"] for row in rows]
+
+    async def save_product(self, product: dict[str, Any], replace_inventory: Optional[set[str]] = None) -> None:
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    f"SELECT 1 FROM {self.products_table} WHERE id = $1 FOR UPDATE",
+                    str(product.get("id", "")).strip(),
+                )
+                await self._write_product(conn, product, replace_inventory=replace_inventory)
+        await self._mark_catalog_changed()
+
+    async def _write_product(
+        self,
+        conn: asyncpg.Connection,
+        product: dict[str, Any],
+        position: Optional[int] = None,
+        replace_inventory: Optional[set[str]] = None,
+    ) -> None:
+        product_id = str(product.get("id", "")).strip()
+        data = {key: value for key, value in product.items() if key not in {"id", "inventory", "tiers", "stock", "reserved"}}
+        if position is None:
+            position = await conn.fetchval(
+                f"SELECT COALESCE((SELECT position FROM {self.products_table} WHERE id = $1),"
+                f" (SELECT COALESCE(MAX(position) + 1, 0) FROM {self.products_table}))",
+                product_id,
+            )
+        await conn.execute(
+            f"""
+            INSERT INTO {self.products_table} (id, position, name, price, visibility, data_json, updated_at)
+            VALUES ($1, $2, $3, $4, $5, $6, NOW())
+            ON CONFLICT (id) DO UPDATE SET
+                name = EXCLUDED.name,
+                price = EXCLUDED.price,
+                visibility = EXCLUDED.visibility,
+                data_json = EXCLUDED.data_json,
+                updated_at = NOW()
+            """,
+            product_id,
+            position,
+            str(product.get("name", "")),
+            float(product.get("price") or 0.0),
+            str(product.get("visibility", "public")),
+            json.dumps(data, ensure_ascii=False),
+        )
+
+        tiers = [tier for tier in product.get("tiers", []) if isinstance(tier, dict) and tier.get("id")]
+        tier_ids = [str(tier["id"]) for tier in tiers]
+        removed_tiers = await conn.fetch(
+            f"DELETE FROM {self.tiers_table} WHERE product_id = $1 AND NOT (id = ANY($2::text[])) RETURNING id",
+            product_id,
+            tier_ids,
+        )
+        for row in removed_tiers:
+            await self._sync_inventory(conn, product_id, row["id"], [])
+
+        for tier_position, tier in enumerate(tiers):
+            tier_data = {key: value for key, value in tier.items() if key not in {"id", "inventory", "stock", "reserved"}}
+            await conn.execute(
+                f"""
+                INSERT INTO {self.tiers_table} (product_id, id, position, name, price, data_json)
+                VALUES ($1, $2, $3, $4, $5, $6)
+                ON CONFLICT (product_id, id) DO UPDATE SET
+                    position = EXCLUDED.position,
+                    name = EXCLUDED.name,
+                    price = EXCLUDED.price,
+                    data_json = EXCLUDED.data_json
+                """,
+                product_id,
+                str(tier["id"]),
+                tier_position,
+                str(tier.get("name", "")),
+                float(tier.get("price") or 0.0),
+                json.dumps(tier_data, ensure_ascii=False),
+            )
+            if replace_inventory is None or str(tier["id"]) in replace_inventory:
+                await self._sync_inventory(conn, product_id, str(tier["id"]), list(tier.get("inventory", [])))
+
+        if replace_inventory is None or "" in replace_inventory:
+            await self._sync_inventory(conn, product_id, "", list(product.get("inventory", [])))
+
+    async def _sync_inventory(self, conn: asyncpg.Connection, product_id: str, tier_id: str, items: list[str]) -> None:
+        current = await conn.fetch(
+            f"SELECT item FROM {self.inventory_table} WHERE product_id = $1 AND tier_id = $2 AND status = 'available' ORDER BY id",
+            product_id,
+            tier_id,
+        )
+        if [row["item"] for row in current] == items:
+            return
+        await self._set_count(conn, product_id, tier_id, len(items))
+        await conn.execute(
+            f"DELETE FROM {self.inventory_table} WHERE product_id = $1 AND tier_id = $2 AND status = 'available'",
+            product_id,
+            tier_id,
+        )
+        if items:
+            await conn.executemany(
+                f"INSERT INTO {self.inventory_table} (product_id, tier_id, item) VALUES ($1, $2, $3)",
+                [(product_id, tier_id, item) for item in items],
+            )
+
+    async def _set_count(self, conn: asyncpg.Connection, product_id: str, tier_id: str, available: int) -> None:
+        await conn.execute(
+            f"""
+            INSERT INTO {self.counts_table} (product_id, tier_id, available)
+            VALUES ($1, $2, $3)
+            ON CONFLICT (product_id, tier_id) DO UPDATE SET available = EXCLUDED.available
+            """,
+            product_id,
+            tier_id,
+            available,
+        )
+
+    async def _adjust_count(self, conn: asyncpg.Connection, product_id: str, tier_id: str, delta: int) -> int:
+        return await conn.fetchval(
+            f"""
+            INSERT INTO {self.counts_table} (product_id, tier_id, available)
+            VALUES ($1, $2, GREATEST($3, 0))
+            ON CONFLICT (product_id, tier_id) DO UPDATE SET available = GREATEST({self.counts_table}.available + $3, 0)
+            RETURNING available
+            """,
+            product_id,
+            tier_id,
+            delta,
+        )
+
+    async def delete_product(self, product_id: str) -> bool:
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                deleted = await conn.fetchval(
+                    f"DELETE FROM {self.products_table} WHERE id = $1 RETURNING id",
+                    product_id,
+                )
+                if deleted is None:
+                    return False
+                await conn.execute(
+                    f"DELETE FROM {self.inventory_table} WHERE product_id = $1 AND status = 'available'",
+                    product_id,
+                )
+                await conn.execute(f"DELETE FROM {self.counts_table} WHERE product_id = $1", product_id)
+        await self._mark_catalog_changed()
+        return True
+
+    async def _lock_holder(self, conn: asyncpg.Connection, product_id: str, tier_id: str) -> bool:
+        # Row lock on the product (and tier) serializes admin stock edits against each other and
+        # against save_product; purchases only lock the individual inventory rows they take.
+        if await conn.fetchval(f"SELECT 1 FROM {self.products_table} WHERE id = $1 FOR UPDATE", product_id) is None:
+            return False
+        if tier_id:
+            query = f"SELECT 1 FROM {self.tiers_table} WHERE product_id = $1 AND id = $2 FOR UPDATE"
+            return await conn.fetchval(query, product_id, tier_id) is not None
+        return True
+
+    async def add_inventory(self, product_id: str, tier_id: str, items: list[str]) -> Optional[int]:
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                if not await self._lock_holder(conn, product_id, tier_id):
+                    return None
+                await conn.executemany(
+                    f"INSERT INTO {self.inventory_table} (product_id, tier_id, item) VALUES ($1, $2, $3)",
+                    [(product_id, tier_id, item) for item in items],
+                )
+                await self._touch_product(conn, product_id)
+                stock = await self._adjust_count(conn, product_id, tier_id, len(items))
+        await self._mark_catalog_changed()
+        return stock
+
+    async def import_inventory(self, product_id: str, tier_id: str, items: list[str]) -> Optional[tuple[int, int]]:
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                if not await self._lock_holder(conn, product_id, tier_id):
+                    return None
+                # Inserted in upload order (first occurrence of each key) so FIFO delivery follows the file.
+                added = await conn.fetchval(
+                    f"""
+                    WITH incoming AS (
+                        SELECT DISTINCT ON (item) item, ord
+                        FROM unnest($3::text[]) WITH ORDINALITY AS upload (item, ord)
+                        ORDER BY item, ord
+                    ), inserted AS (
+                        INSERT INTO {self.inventory_table} (product_id, tier_id, item)
+                        SELECT $1, $2, incoming.item FROM incoming
+                        WHERE NOT EXISTS (
+                            SELECT 1 FROM {self.inventory_table} AS inv
+                            WHERE inv.product_id = $1 AND inv.tier_id = $2 AND inv.item = incoming.item
+                                AND inv.status IN ('available', 'reserved')
+                        )
+                        ORDER BY incoming.ord
+                        RETURNING 1
+                    )
+                    SELECT COUNT(*) FROM inserted
+                    """,
+                    product_id,
+                    tier_id,
+                    items,
+                )
+                if not added:
+                    stock = await conn.fetchval(
+                        f"SELECT available FROM {self.counts_table} WHERE product_id = $1 AND tier_id = $2",
+                        product_id,
+                        tier_id,
+                    )
+                    return 0, stock or 0
+                await self._touch_product(conn, product_id)
+                stock = await self._adjust_count(conn, product_id, tier_id, added)
+        await self._mark_catalog_changed()
+        return added, stock
+
+    async def remove_inventory(self, product_id: str, tier_id: str, count: int) -> Optional[int]:
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                if not await self._lock_holder(conn, product_id, tier_id):
+                    return None
+                removed = await conn.execute(
+                    f"""
+                    DELETE FROM {self.inventory_table} WHERE id IN (
+                        SELECT id FROM {self.inventory_table}
+                        WHERE product_id = $1 AND tier_id = $2 AND status = 'available'
+                        ORDER BY id DESC LIMIT $3
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    """,
+                    product_id,
+                    tier_id,
+                    max(0, count),
+                )
+                await self._touch_product(conn, product_id)
+                stock = await self._adjust_count(conn, product_id, tier_id, -int(removed.split()[-1]))
+        await self._mark_catalog_changed()
+        return stock
+
+    async def _touch_product(self, conn: asyncpg.Connection, product_id: str) -> None:
+        await conn.execute(f"UPDATE {self.products_table} SET updated_at = NOW() WHERE id = $1", product_id)
+
+    async def reserve_stock(self, hold_id: str, allocations: list[Allocation]) -> None:
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                already_held = await conn.fetchval(
+                    f"SELECT 1 FROM {self.inventory_table} WHERE status = 'reserved' AND hold_id = $1 LIMIT 1", hold_id
+                )
+                if already_held:
+                    return
+                for (product_id, tier_id), quantity in _needed_by_holder(allocations).items():
+                    # Same admission check as a purchase: the counter row fails fast when the tier is sold out.
+                    remaining = await conn.fetchval(
+                        f"""
+                        UPDATE {self.counts_table} SET available = available - $3, reserved = reserved + $3
+                        WHERE product_id = $1 AND tier_id = $2 AND available >= $3
+                        RETURNING available
+                        """,
+                        product_id,
+                        tier_id,
+                        quantity,
+                    )
+                    if remaining is None:
+                        raise InsufficientStock(product_id, tier_id)
+                    held = await conn.fetch(
+                        f"""
+                        WITH picked AS (
+                            SELECT id FROM {self.inventory_table}
+                            WHERE product_id = $1 AND tier_id = $2 AND status = 'available'
+                            ORDER BY id LIMIT $3
+                            FOR UPDATE SKIP LOCKED
+                        )
+                        UPDATE {self.inventory_table} AS inv
+                        SET status = 'reserved', hold_id = $4
+                        FROM picked WHERE inv.id = picked.id
+                        RETURNING inv.id
+                        """,
+                        product_id,
+                        tier_id,
+                        quantity,
+                        hold_id,
+                    )
+                    if len(held) < quantity:
+                        raise InsufficientStock(product_id, tier_id)
+                    await self._touch_product(conn, product_id)
+        await self._mark_catalog_changed()
+
+    async def release_stock(self, hold_id: str) -> int:
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                released = await self._release_holds(conn, [hold_id])
+        if released:
+            await self._mark_catalog_changed()
+        return released
+
+    async def _release_holds(self, conn: asyncpg.Connection, hold_ids: list[str]) -> int:
+        rows = await conn.fetch(
+            f"""
+            WITH released AS (
+                UPDATE {self.inventory_table} SET status = 'available', hold_id = NULL
+                WHERE status = 'reserved' AND hold_id = ANY($1::text[])
+                RETURNING product_id, tier_id
+            )
+            SELECT product_id, tier_id, COUNT(*)::int AS released FROM released GROUP BY product_id, tier_id
+            """,
+            hold_ids,
+        )
+        for row in rows:
+            await conn.execute(
+                f"""
+                UPDATE {self.counts_table}
+                SET available = available + $3, reserved = GREATEST(reserved - $3, 0)
+                WHERE product_id = $1 AND tier_id = $2
+                """,
+                row["product_id"],
+                row["tier_id"],
+                row["released"],
+            )
+            await self._touch_product(conn, row["product_id"])
+        return sum(row["released"] for row in rows)
+
+    async def commit_purchase(
+        self,
+        order_record: dict[str, Any],
+        allocations: list[Allocation],
+        hold_id: Optional[str] = None,
+    ) -> dict[str, Any]:
+        order_id = str(order_record.get("id") or "").strip()
+        async with self.pool.acquire() as conn:
+            try:
+                async with conn.transaction():
+                    # API workers in other processes may fulfil the same payment; the second one waits
+                    # here and then finds the order instead of taking keys and losing the insert.
+                    await conn.execute("SELECT pg_advisory_xact_lock(hashtext($1))", f"{self.orders_table}:{order_id}")
+                    existing = await conn.fetchval(f"SELECT data_json FROM {self.orders_table} WHERE id = $1", order_id)
+                    if existing is not None:
+                        return _loads_dict(existing)
+
+                    credentials: dict[str, str] = {}
+                    for credential_key, product_id, tier_id, quantity in allocations:
+                        rows = await self._deliver_held(conn, hold_id, product_id, tier_id, quantity, order_id) if hold_id else []
+                        if len(rows) < quantity:
+                            rows += await self._take_available(conn, product_id, tier_id, quantity - len(rows), order_id)
+                        credentials[credential_key] = "\n".join(row["item"] for row in sorted(rows, key=lambda row: row["id"]))
+                        await self._touch_product(conn, product_id)
+                    if hold_id:
+                        await self._release_holds(conn, [hold_id])
+
+                    order_record["credentials"] = credentials
+                    if not await self._insert_order(conn, order_record):
+                        raise _PurchaseAborted()
+                    # Queued with the order so the log survives a crash; the notify fires on commit.
+                    await conn.execute(
+                        f"""
+                        WITH event AS (
+                            INSERT INTO {self.order_events_table} (order_id) VALUES ($1) RETURNING id
+                        )
+                        SELECT pg_notify($2, id::text) FROM event
+                        """,
+                        order_id,
+                        self.order_events_channel,
+                    )
+            except (_PurchaseAborted, InsufficientStock):
+                # A concurrent request may have stored this same order id in the meantime.
+                existing = await conn.fetchval(f"SELECT data_json FROM {self.orders_table} WHERE id = $1", order_id)
+                if existing is not None:
+                    return _loads_dict(existing)
+                raise
+        await self._mark_catalog_changed()
+        return order_record
+
+    async def _deliver_held(
+        self,
+        conn: asyncpg.Connection,
+        hold_id: str,
+        product_id: str,
+        tier_id: str,
+        quantity: int,
+        order_id: str,
+    ) -> list[asyncpg.Record]:
+        rows = await conn.fetch(
+            f"""
+            WITH picked AS (
+                SELECT id FROM {self.inventory_table}
+                WHERE product_id = $1 AND tier_id = $2 AND status = 'reserved' AND hold_id = $5
+                ORDER BY id LIMIT $3
+                FOR UPDATE
+            )
+            UPDATE {self.inventory_table} AS inv
+            SET status = 'delivered', order_id = $4, delivered_at = NOW(), hold_id = NULL
+            FROM picked WHERE inv.id = picked.id
+            RETURNING inv.id, inv.item
+            """,
+            product_id,
+            tier_id,
+            quantity,
+            order_id,
+            hold_id,
+        )
+        if rows:
+            await conn.execute(
+                f"UPDATE {self.counts_table} SET reserved = GREATEST(reserved - $3, 0) WHERE product_id = $1 AND tier_id = $2",
+                product_id,
+                tier_id,
+                len(rows),
+            )
+        return list(rows)
+
+    async def _take_available(
+        self,
+        conn: asyncpg.Connection,
+        product_id: str,
+        tier_id: str,
+        quantity: int,
+        order_id: str,
+    ) -> list[asyncpg.Record]:
+        # The counter row is the admission check: a sold-out tier fails here without touching
+        # the item rows, and the row lock orders concurrent buyers of the same tier.
+        remaining = await conn.fetchval(
+            f"""
+            UPDATE {self.counts_table} SET available = available - $3
+            WHERE product_id = $1 AND tier_id = $2 AND available >= $3
+            RETURNING available
+            """,
+            product_id,
+            tier_id,
+            quantity,
+        )
+        if remaining is None:
+            raise InsufficientStock(product_id, tier_id)
+        rows = await conn.fetch(
+            f"""
+            WITH picked AS (
+                SELECT id FROM {self.inventory_table}
+                WHERE product_id = $1 AND tier_id = $2 AND status = 'available'
+                ORDER BY id LIMIT $3
+                FOR UPDATE SKIP LOCKED
+            )
+            UPDATE {self.inventory_table} AS inv
+            SET status = 'delivered', order_id = $4, delivered_at = NOW()
+            FROM picked WHERE inv.id = picked.id
+            RETURNING inv.id, inv.item
+            """,
+            product_id,
+            tier_id,
+            quantity,
+            order_id,
+        )
+        if len(rows) < quantity:
+            raise InsufficientStock(product_id, tier_id)
+        return list(rows)
+
+    async def _insert_order(self, conn: asyncpg.Connection, order: dict[str, Any]) -> bool:
+        inserted = await conn.fetchval(
+            f"""
+            INSERT INTO {self.orders_table} (id, user_id, created_at, payment_method, total, status, data_json)
+            VALUES ($1, $2, $3, $4, $5, $6, $7)
+            ON CONFLICT (id) DO NOTHING
+            RETURNING id
+            """,
+            str(order.get("id") or "").strip(),
+            str(order.get("userId") or "guest"),
+            _parse_timestamp(order.get("createdAt")),
+            str(order.get("paymentMethod") or ""),
+            _to_float(order.get("total")),
+            str(order.get("status") or "completed"),
+            json.dumps(order, ensure_ascii=False),
+        )
+        return inserted is not None
+
+    async def get_order(self, order_id: str) -> Optional[dict[str, Any]]:
+        raw = await self.pool.fetchval(f"SELECT data_json FROM {self.orders_table} WHERE id = $1", order_id)
+        return _loads_dict(raw) if raw is not None else None
+
+    async def load_orders(self) -> list[dict[str, Any]]:
+        rows = await self.pool.fetch(f"SELECT data_json FROM {self.orders_table} ORDER BY created_at, id")
+        return [_loads_dict(row["data_json"]) for row in rows]
+
+    async def load_user_orders(self, user_id: str, limit: int = 50) -> list[dict[str, Any]]:
+        rows = await self.pool.fetch(
+            f"SELECT data_json FROM {self.orders_table} WHERE user_id = $1 ORDER BY created_at DESC, id DESC LIMIT $2",
+            user_id,
+            limit,
+        )
+        return [_loads_dict(row["data_json"]) for row in rows]
+
+    async def get_pending_payment(self, token: str) -> Optional[dict[str, Any]]:
+        raw = await self.pool.fetchval(f"SELECT data_json FROM {self.pending_table} WHERE token = $1", token)
+        return _loads_dict(raw) if raw is not None else None
+
+    async def save_pending_payment(self, token: str, entry: dict[str, Any]) -> None:
+        async with self.pool.acquire() as conn:
+            await self._upsert_pending(conn, token, entry)
+
+    async def _upsert_pending(self, conn: asyncpg.Connection, token: str, entry: dict[str, Any]) -> None:
+        await conn.execute(
+            f"""
+            INSERT INTO {self.pending_table}
+                (token, payment_method, gateway, completed, created_at, updated_at, expires_at, data_json)
+            VALUES ($1, $2, $3, $4, $5, NOW(), $6, $7)
+            ON CONFLICT (token) DO UPDATE SET
+                payment_method = EXCLUDED.payment_method,
+                gateway = EXCLUDED.gateway,
+                completed = EXCLUDED.completed,
+                updated_at = NOW(),
+                expires_at = EXCLUDED.expires_at,
+                data_json = EXCLUDED.data_json
+            """,
+            token,
+            str(entry.get("paymentMethod") or ""),
+            str(entry.get("gateway") or ""),
+            bool(entry.get("completed", False)),
+            _parse_timestamp(entry.get("createdAt")),
+            _parse_timestamp(entry["expiresAt"]) if entry.get("expiresAt") else None,
+            json.dumps(entry, ensure_ascii=False),
+        )
+
+    async def update_pending_payment(self, token: str, update: PendingUpdate) -> Optional[dict[str, Any]]:
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                raw = await conn.fetchval(f"SELECT data_json FROM {self.pending_table} WHERE token = $1 FOR UPDATE", token)
+                if raw is None:
+                    return None
+                entry = _loads_dict(raw)
+                updated = update(dict(entry))
+                if updated is None:
+                    return entry
+                await self._upsert_pending(conn, token, updated)
+                return updated
+
+    async def load_pending_payments(self) -> dict[str, Any]:
+        rows = await self.pool.fetch(f"SELECT token, data_json FROM {self.pending_table} ORDER BY created_at")
+        return {row["token"]: _loads_dict(row["data_json"]) for row in rows}
+
+    async def expire_pending_payments(self, fallback_ttl: timedelta) -> int:
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                # Every API worker runs the sweeper; one sweep at a time is plenty.
+                if not await conn.fetchval("SELECT pg_try_advisory_xact_lock(hashtext($1))", f"{self.pending_table}:sweep"):
+                    return 0
+                # SKIP LOCKED leaves entries that a confirmation is updating right now for the next sweep.
+                rows = await conn.fetch(
+                    f"""
+                    WITH expired AS (
+                        DELETE FROM {self.pending_table} WHERE token IN (
+                            SELECT token FROM {self.pending_table}
+                            WHERE COALESCE(expires_at, created_at + $1::interval) < NOW()
+                            FOR UPDATE SKIP LOCKED
+                        )
+                        RETURNING token, payment_method, gateway, completed, created_at, expires_at, data_json
+                    ), archived AS (
+                        INSERT INTO {self.pending_archive_table}
+                            (token, payment_method, gateway, completed, created_at, expires_at, data_json)
+                        SELECT token, payment_method, gateway, completed, created_at, expires_at, data_json FROM expired
+                        ON CONFLICT (token) DO NOTHING
+                    )
+                    SELECT token FROM expired
+                    """,
+                    fallback_ttl,
+                )
+                released = await self._release_holds(conn, [row["token"] for row in rows]) if rows else 0
+        if released:
+            await self._mark_catalog_changed()
+        return len(rows)
+
+    async def archive_pending_payment(self, token: str) -> bool:
+        archived = await self.pool.fetchval(
+            f"""
+            WITH moved AS (
+                DELETE FROM {self.pending_table} WHERE token = $1
+                RETURNING token, payment_method, gateway, completed, created_at, expires_at, data_json
+            ), archived AS (
+                INSERT INTO {self.pending_archive_table}
+                    (token, payment_method, gateway, completed, created_at, expires_at, data_json)
+                SELECT token, payment_method, gateway, completed, created_at, expires_at, data_json FROM moved
+                ON CONFLICT (token) DO NOTHING
+            )
+            SELECT COUNT(*) FROM moved
+            """,
+            token,
+        )
+        return bool(archived)
+
+    async def count_records(self) -> dict[str, int]:
+        row = await self.pool.fetchrow(
+            f"""
+            SELECT
+                (SELECT COUNT(*) FROM {self.products_table}) AS products,
+                (SELECT COUNT(*) FROM {self.orders_table}) AS orders,
+                (SELECT COUNT(*) FROM {self.pending_table}) AS pending_payments
+            """
+        )
+        return {"products": row["products"], "orders": row["orders"], "pendingPayments": row["pending_payments"]}
+
+    async def claim_order_events(self, limit: int, lease: timedelta) -> list[tuple[int, dict[str, Any]]]:
+        rows = await self.pool.fetch(
+            f"""
+            WITH claimed AS (
+                UPDATE {self.order_events_table} SET claimed_at = NOW()
+                WHERE id IN (
+                    SELECT id FROM {self.order_events_table}
+                    WHERE claimed_at IS NULL OR claimed_at < NOW() - $2::interval
+                    ORDER BY id LIMIT $1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, order_id
+            )
+            SELECT claimed.id, orders.data_json
+            FROM claimed LEFT JOIN {self.orders_table} AS orders ON orders.id = claimed.order_id
+            ORDER BY claimed.id
+            """,
+            limit,
+            lease,
+        )
+        return [(row["id"], _loads_dict(row["data_json"]) if row["data_json"] is not None else {}) for row in rows]
+
+    async def ack_order_events(self, event_ids: list[int]) -> None:
+        if event_ids:
+            await self.pool.execute(f"DELETE FROM {self.order_events_table} WHERE id = ANY($1::bigint[])", event_ids)
+
+
+class _PurchaseAborted(Exception):
+    pass
+
+
+def _tier_dicts(product: dict[str, Any]) -> list[dict[str, Any]]:
+    tiers = product.get("tiers", [])
+    if not isinstance(tiers, list):
+        return []
+    return [tier for tier in tiers if isinstance(tier, dict)]
+
+
+def _needed_by_holder(allocations: list[Allocation]) -> dict[tuple[str, str], int]:
+    needed: dict[tuple[str, str], int] = {}
+    for _, product_id, tier_id, quantity in allocations:
+        needed[(product_id, tier_id)] = needed.get((product_id, tier_id), 0) + quantity
+    return needed
+
+
+def _holder_exists(products: list[dict[str, Any]], product_id: str, tier_id: str) -> bool:
+    for product in products:
+        if str(product.get("id", "")).strip() != product_id:
+            continue
+        if not tier_id:
+            return True
+        return any(str(tier.get("id", "")).strip() == tier_id for tier in _tier_dicts(product))
+    return False
+
+
+def _without_inventory(product: dict[str, Any]) -> dict[str, Any]:
+    stripped = {key: value for key, value in product.items() if key not in {"inventory", "stock", "reserved"}}
+    stripped["tiers"] = [
+        {key: value for key, value in tier.items() if key not in {"inventory", "stock", "reserved"}}
+        for tier in _tier_dicts(product)
+    ]
+    return stripped
+
+
+def _clean_items(items: Any) -> list[str]:
+    if not isinstance(items, list):
+        return []
+    return [str(item).strip() for item in items if str(item).strip()]
+
+
+def _ensure_json_file(path: Path, default: Any) -> None:
+    if path.exists():
+        return
+    _write_json(path, default)
+
+
+def _read_json(path: Path, default: Any) -> Any:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return default
+
+
+def _write_json(path: Path, payload: Any) -> None:
+    # Write a sibling temp file, fsync it and rename over the target so a crash never leaves a half-written file.
+    temp_path = path.with_suffix(path.suffix + ".tmp")
+    with temp_path.open("w", encoding="utf-8") as handle:
+        handle.write(json.dumps(payload, ensure_ascii=False, separators=(",", ":")))
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(temp_path, path)
+
+
+def _loads_dict(raw: Any) -> dict[str, Any]:
+    try:
+        value = json.loads(str(raw or ""))
+    except Exception:
+        return {}
+    return value if isinstance(value, dict) else {}
+
+
+def _parse_timestamp(value: Any) -> datetime:
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except (TypeError, ValueError):
+        return datetime.now(timezone.utc)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
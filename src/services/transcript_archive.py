@@ -0,0 +1,135 @@
+import asyncio
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Callable, Optional, TypeVar
+
+import discord
+
+from ..utils.logger import logger
+from .database import ArchivedTranscript, Ticket
+from .transcript_service import TRANSCRIPT_SPOOL_BYTES, RenderedTranscript
+
+_CHUNK_BYTES = 1024 * 1024
+
+T = TypeVar("T")
+
+
+class TranscriptArchive:
+    """Gzipped, content-addressed store of rendered ticket transcripts.
+
+    A transcript is stored once under the sha256 of its HTML, so re-archiving an unchanged ticket writes
+    nothing new. ``ArchivedTranscript`` rows map guild, ticket number and creator to the digest; a ticket
+    has one row, updated whenever its transcript is archived again.
+    """
+
+    def __init__(self, directory: Path, enabled: bool = True, level: int = 6):
+        self.directory = directory
+        self.enabled = enabled
+        self.level = level
+
+    def _path(self, digest: str) -> Path:
+        return self.directory / digest[:2] / f"{digest}.html.gz"
+
+    def write(self, transcript: RenderedTranscript) -> tuple[str, int]:
+        """Compress a transcript into the archive; returns its digest and its size on disk."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        transcript.file.seek(0)
+        # Hashed while compressing so the HTML is read once; the file is named after the digest afterwards.
+        with tempfile.NamedTemporaryFile(dir=self.directory, suffix=".tmp", delete=False) as raw:
+            try:
+                with gzip.GzipFile(filename="", mode="wb", fileobj=raw, compresslevel=self.level, mtime=0) as compressed:
+                    while chunk := transcript.file.read(_CHUNK_BYTES):
+                        digest.update(chunk)
+                        compressed.write(chunk)
+            except BaseException:
+                raw.close()
+                os.unlink(raw.name)
+                raise
+        path = self._path(digest.hexdigest())
+        if path.exists():
+            os.unlink(raw.name)
+        else:
+            path.parent.mkdir(exist_ok=True)
+            os.replace(raw.name, path)
+        return digest.hexdigest(), path.stat().st_size
+
+    def read(self, record: ArchivedTranscript) -> Optional[RenderedTranscript]:
+        """Decompress an archived transcript, or None when its file is gone."""
+        file = tempfile.SpooledTemporaryFile(max_size=TRANSCRIPT_SPOOL_BYTES)
+        try:
+            with gzip.open(self._path(record.digest), "rb") as compressed:
+                shutil.copyfileobj(compressed, file, _CHUNK_BYTES)
+        except FileNotFoundError:
+            file.close()
+            return None
+        except BaseException:
+            file.close()
+            raise
+        participants = {int(user_id): count for user_id, count in (record.participants or {}).items()}
+        return RenderedTranscript(file, record.total_messages, participants, file.tell())
+
+    @staticmethod
+    async def _run(executor: Optional[Executor], func: Callable[..., T], *args) -> T:
+        if executor is None:
+            return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+    async def find(self, guild_id: int, ticket_number: int) -> Optional[ArchivedTranscript]:
+        return await ArchivedTranscript.filter(guild_id=str(guild_id), ticket_number=ticket_number).order_by("-updated_at").first()
+
+    async def find_channel(self, guild_id: int, channel_id: int) -> Optional[ArchivedTranscript]:
+        return await ArchivedTranscript.filter(guild_id=str(guild_id), channel_id=str(channel_id)).first()
+
+    async def save(
+        self,
+        channel: discord.TextChannel,
+        ticket: Ticket,
+        transcript: RenderedTranscript,
+        version: Optional[int] = None,
+        executor: Optional[Executor] = None,
+    ) -> Optional[ArchivedTranscript]:
+        if not self.enabled:
+            return None
+        digest, stored_size = await self._run(executor, self.write, transcript)
+        record = await self.find_channel(channel.guild.id, channel.id)
+        previous = record.digest if record else None
+        values = {
+            "ticket_number": ticket.ticket_number,
+            "creator_id": ticket.creator_id,
+            "digest": digest,
+            "size": transcript.size,
+            "stored_size": stored_size,
+            "total_messages": transcript.total_messages,
+            "participants": {str(user_id): count for user_id, count in transcript.participants.items()},
+            "version": version,
+        }
+        if record is None:
+            record = await ArchivedTranscript.create(guild_id=str(channel.guild.id), channel_id=str(channel.id), **values)
+        else:
+            await record.update_from_dict(values).save()
+        if previous and previous != digest:
+            await self._release(previous)
+        return record
+
+    async def load(self, record: ArchivedTranscript, executor: Optional[Executor] = None) -> Optional[RenderedTranscript]:
+        transcript = await self._run(executor, self.read, record)
+        if transcript is None:
+            logger.warning(f"Archived transcript {record.digest} for ticket {record.ticket_number} is missing")
+        return transcript
+
+    async def _release(self, digest: str) -> None:
+        """Delete a transcript file once no ticket points at it any more."""
+        if not await ArchivedTranscript.filter(digest=digest).exists():
+            self._path(digest).unlink(missing_ok=True)
+
+
+transcript_archive = TranscriptArchive(
+    Path(os.getenv("TRANSCRIPT_DATA_DIR", "data/transcripts")) / "archive",
+    enabled=(os.getenv("TRANSCRIPT_ARCHIVE") or "on").strip().lower() not in {"off", "0", "false", "no"},
+)
@@ -0,0 +1,237 @@
+import asyncio
+import json
+import os
+from concurrent.futures import Executor
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Optional
+
+import discord
+
+from ..utils.logger import logger
+from .transcript_service import (
+    MessageFragment,
+    RenderedTranscript,
+    TranscriptRenderer,
+    generate_transcript,
+    render_message_fragment,
+)
+
+
+class TranscriptCapture:
+    """Renders the messages of open ticket channels as they are posted, edited and deleted.
+
+    Each tracked channel has an append-only journal of rendered fragments in which a later record for a
+    message id replaces the earlier ones, so closing a ticket stitches the journal together instead of
+    paging through the channel history. A record is a one-line JSON header followed by the raw HTML of
+    both forms of the message, whose byte lengths the header gives. Only channels tracked from creation
+    have a journal; transcripts of any other channel are still generated from history.
+    """
+
+    def __init__(self, directory: Path, enabled: bool = True):
+        self.directory = directory
+        self.enabled = enabled
+        self.tracked: set[int] = set()
+        # Newest message id journalled per channel: where catching up after downtime starts.
+        self._last_ids: dict[int, int] = {}
+        # Records waiting to be appended, per channel. Gateway events only add to these; the file writes run
+        # on a worker thread, one batch at a time, so a burst of messages becomes a few appends.
+        self._pending: dict[int, list[bytes]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def _path(self, channel_id: int) -> Path:
+        return self.directory / f"{channel_id}.jsonl"
+
+    def _append(self, channel_id: int, records: list[tuple[dict, bytes]]) -> None:
+        data = b"".join(
+            json.dumps(header, separators=(",", ":")).encode("utf-8") + b"\n" + payload for header, payload in records
+        )
+        self._pending.setdefault(channel_id, []).append(data)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._write({channel_id: self._pending.pop(channel_id)})
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self.flush())
+
+    def _write(self, batch: dict[int, list[bytes]]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for channel_id, chunks in batch.items():
+            with open(self._path(channel_id), "ab") as handle:
+                handle.write(b"".join(chunks))
+
+    async def flush(self) -> None:
+        """Write out every buffered record; once this returns the journals hold everything recorded before the call."""
+        async with self._flush_lock:
+            while self._pending:
+                batch, self._pending = self._pending, {}
+                try:
+                    await asyncio.to_thread(self._write, batch)
+                except OSError as e:
+                    logger.error(f"Failed to write transcript journals for {sorted(batch)}: {e}")
+
+    def start(self, channel_id: int) -> None:
+        """Start journalling a ticket channel that was just created, before anything is posted in it."""
+        if not self.enabled:
+            return
+        self.tracked.add(channel_id)
+        # An empty write creates the journal, which is what marks the channel as tracked after a restart.
+        self._append(channel_id, [])
+
+    def _scan(self, open_ids: set[int]) -> list[int]:
+        kept: list[int] = []
+        for path in self.directory.glob("*.jsonl"):
+            try:
+                channel_id = int(path.stem)
+            except ValueError:
+                continue
+            if channel_id in open_ids:
+                kept.append(channel_id)
+            else:
+                path.unlink(missing_ok=True)
+        return kept
+
+    async def resume(self, open_channel_ids: Iterable[int]) -> None:
+        """Track the journals of tickets that are still open after a restart; drop the others."""
+        if not self.enabled or not self.directory.exists():
+            return
+        self.tracked.update(await asyncio.to_thread(self._scan, set(open_channel_ids)))
+
+    async def discard(self, channel_id: int) -> None:
+        self.tracked.discard(channel_id)
+        self._last_ids.pop(channel_id, None)
+        # Under the flush lock, so a batch being written cannot recreate the file afterwards.
+        async with self._flush_lock:
+            self._pending.pop(channel_id, None)
+            await asyncio.to_thread(self._path(channel_id).unlink, missing_ok=True)
+
+    def record(self, message: discord.Message) -> None:
+        channel_id = message.channel.id
+        if channel_id not in self.tracked:
+            return
+        fragment = render_message_fragment(message)
+        html = fragment.html.encode("utf-8")
+        continuation = fragment.continuation_html.encode("utf-8") if fragment.continuation_html is not None else b""
+        header = {
+            "id": fragment.message_id,
+            "author": fragment.author_id,
+            "member": isinstance(message.author, discord.Member),
+            "at": fragment.created_at.isoformat(),
+            "system": fragment.system,
+            "html": len(html),
+            "cont": len(continuation) if fragment.continuation_html is not None else None,
+        }
+        self._append(channel_id, [(header, html + continuation)])
+        if fragment.message_id > self._last_ids.get(channel_id, 0):
+            self._last_ids[channel_id] = fragment.message_id
+
+    def record_deleted(self, channel_id: int, message_ids: Iterable[int]) -> None:
+        if channel_id not in self.tracked:
+            return
+        self._append(channel_id, [({"id": message_id, "deleted": True}, b"") for message_id in message_ids])
+
+    def _latest_records(self, channel_id: int) -> dict[int, tuple[dict, int]]:
+        """Message id -> (header, payload offset) of its latest record, leaving out deleted messages."""
+        records: dict[int, tuple[dict, int]] = {}
+        path = self._path(channel_id)
+        size = path.stat().st_size
+        with open(path, "rb") as handle:
+            while True:
+                line = handle.readline()
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    header = json.loads(line.decode("utf-8"))
+                except ValueError:
+                    break
+                offset = handle.tell()
+                payload_size = header.get("html", 0) + (header.get("cont") or 0)
+                # A record cut short by a crash ends the journal; catching up records the message again.
+                if offset + payload_size > size:
+                    break
+                if header.get("deleted"):
+                    records.pop(header["id"], None)
+                else:
+                    records[header["id"]] = (header, offset)
+                handle.seek(offset + payload_size)
+        return records
+
+    async def catch_up(self, channel: discord.TextChannel) -> None:
+        """Journal the messages posted while the bot was not listening (edits and deletes in that window are missed)."""
+        if channel.id not in self.tracked:
+            return
+        last_id = self._last_ids.get(channel.id)
+        if last_id is None:
+            await self.flush()
+            records = await asyncio.to_thread(self._latest_records, channel.id)
+            last_id = max(records, default=0)
+        after = discord.Object(id=last_id) if last_id else None
+        async for message in channel.history(limit=None, after=after, oldest_first=True):
+            self.record(message)
+        await self.flush()
+
+    async def safe_catch_up(self, channel: discord.TextChannel) -> bool:
+        try:
+            await self.catch_up(channel)
+        except Exception as e:
+            logger.warning(f"Could not catch up transcript capture for {channel.id}: {e}")
+            return False
+        return True
+
+    def version(self, channel_id: int) -> Optional[int]:
+        """Changes whenever the channel's journal does (it only grows), or None when the channel has no journal."""
+        if channel_id not in self.tracked:
+            return None
+        try:
+            size = self._path(channel_id).stat().st_size
+        except FileNotFoundError:
+            if channel_id not in self._pending:
+                return None
+            size = 0
+        return size + sum(len(chunk) for chunk in self._pending.get(channel_id, ()))
+
+    def stitch(self, channel: discord.TextChannel) -> RenderedTranscript:
+        renderer = TranscriptRenderer(channel.guild)
+        records = self._latest_records(channel.id)
+        with open(self._path(channel.id), "rb") as handle:
+            for message_id in sorted(records):
+                header, offset = records[message_id]
+                handle.seek(offset)
+                html = handle.read(header["html"]).decode("utf-8")
+                continuation = handle.read(header["cont"]).decode("utf-8") if header["cont"] is not None else None
+                member = channel.guild.get_member(header["author"]) if header["member"] else None
+                fragment = MessageFragment(
+                    message_id=message_id,
+                    author_id=header["author"],
+                    created_at=datetime.fromisoformat(header["at"]),
+                    system=header["system"],
+                    html=html,
+                    continuation_html=continuation,
+                )
+                renderer.add_fragment(fragment, member)
+        return renderer.finish(channel)
+
+    async def render(
+        self,
+        channel: discord.TextChannel,
+        limit: Optional[int] = None,
+        executor: Optional[Executor] = None,
+        catch_up: bool = True,
+    ) -> RenderedTranscript:
+        """Transcript of a channel: stitched from its journal when it has one, otherwise from history."""
+        if limit is not None or channel.id not in self.tracked:
+            return await generate_transcript(channel, limit=limit, executor=executor)
+        if catch_up:
+            await self.safe_catch_up(channel)
+        await self.flush()
+        if executor is None:
+            return self.stitch(channel)
+        return await asyncio.get_running_loop().run_in_executor(executor, self.stitch, channel)
+
+
+transcript_capture = TranscriptCapture(
+    Path(os.getenv("TRANSCRIPT_DATA_DIR", "data/transcripts")) / "live",
+    enabled=(os.getenv("TRANSCRIPT_CAPTURE") or "on").strip().lower() not in {"off", "0", "false", "no"},
+)
@@ -0,0 +1,94 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Optional
+
+import discord
+
+from ..utils.logger import logger
+from .database import Ticket
+from .job_queue import JobQueue
+from .metrics import transcript_jobs_total, transcript_queue_depth
+from .transcript_archive import transcript_archive
+from .transcript_capture import transcript_capture
+from .transcript_service import RenderedTranscript
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name) or default))
+    except ValueError:
+        return default
+
+
+class TranscriptJobs:
+    """Closes tickets in the background so one slow transcript does not hold up the others.
+
+    Close jobs (render, upload, DM, delete) run on a small pool of worker tasks, one job per channel.
+    Rendering runs on its own threads: discord.py message objects cannot be sent to another
+    process, but a thread keeps the formatting work off the event loop.
+    """
+
+    def __init__(self, workers: int = 4, render_threads: int = 2):
+        self.queue = JobQueue("Transcript", transcript_queue_depth, transcript_jobs_total, workers=workers)
+        self.render_threads = render_threads
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Channels with a close job queued or running, or waiting to be deleted after one.
+        self.closing: set[int] = set()
+
+    @property
+    def waiting(self) -> int:
+        return self.queue.waiting
+
+    def _render_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.render_threads, thread_name_prefix="transcript-render")
+        return self._executor
+
+    def submit_close(self, channel_id: int, job: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        self.closing.add(channel_id)
+        return self.queue.submit(f"close:{channel_id}", job, kind="close")
+
+    async def render(self, channel: discord.TextChannel, limit: Optional[int] = None) -> RenderedTranscript:
+        return await transcript_capture.render(channel, limit=limit, executor=self._render_executor())
+
+    async def ticket_transcript(self, channel: discord.TextChannel, ticket: Ticket) -> RenderedTranscript:
+        """Transcript of a ticket channel, archived as it is rendered.
+
+        Served straight from the archive when the channel's capture journal has not changed since.
+        """
+        executor = self._render_executor()
+        version = None
+        if channel.id in transcript_capture.tracked and await transcript_capture.safe_catch_up(channel):
+            version = transcript_capture.version(channel.id)
+        if version is not None and transcript_archive.enabled:
+            record = await transcript_archive.find_channel(channel.guild.id, channel.id)
+            if record is not None and record.version == version:
+                transcript = await transcript_archive.load(record, executor)
+                if transcript is not None:
+                    return transcript
+        transcript = await transcript_capture.render(channel, executor=executor, catch_up=False)
+        try:
+            await transcript_archive.save(channel, ticket, transcript, version=version, executor=executor)
+        except Exception as e:
+            logger.error(f"Failed to archive transcript for ticket {ticket.ticket_number}: {e}")
+        return transcript
+
+    async def archived(self, guild_id: int, ticket_number: int) -> Optional[RenderedTranscript]:
+        """Archived transcript of a ticket (open or closed), or None when it has never been archived."""
+        record = await transcript_archive.find(guild_id, ticket_number)
+        if record is None:
+            return None
+        return await transcript_archive.load(record, self._render_executor())
+
+    async def stop(self) -> None:
+        await self.queue.stop()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+transcript_jobs = TranscriptJobs(
+    workers=_env_int("TRANSCRIPT_WORKERS", 4),
+    render_threads=_env_int("TRANSCRIPT_RENDER_THREADS", 2),
+)
@@ -1,7 +1,12 @@
 import discord
 from discord.ext import commands
+import functools
 import os
 import re
+import shutil
+import tempfile
+from concurrent.futures import Executor
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from typing import List, Dict, Optional, Tuple, Union
 import aiohttp
@@ -43,59 +48,118 @@ def format_timestamp_footer(dt: datetime) -> str:
     return dt.strftime("%d %B %Y at %H:%M:%S")
 
 
-def parse_markdown_basic(text: str) -> str:
-    """Convert basic Discord markdown to HTML."""
-    if not text:
-        return ""
-    
-    text = escape_html(text)
-    
-    # Bold: **text**
-    text = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', text)
-    # Italic: *text* or _text_
-    text = re.sub(r'\*(.+?)\*', r'<em>\1</em>', text)
-    text = re.sub(r'_(.+?)_', r'<em>\1</em>', text)
-    # Underline: __text__
-    text = re.sub(r'__(.+?)__', r'<u>\1</u>', text)
-    # Strikethrough: ~~text~~
-    text = re.sub(r'~~(.+?)~~', r'<s>\1</s>', text)
-    # Inline code: `code`
-    text = re.sub(r'`([^`]+)`', r'<span class="pre pre--inline">\1</span>', text)
-    # Code blocks: ```code```
-    text = re.sub(r'```(\w+)?\n?(.*?)```', r'<div class="pre pre--multiline">\2</div>', text, flags=re.DOTALL)
-    # Links: [text](url)
-    text = re.sub(r'\[([^\]]+)\]\(([^)]+)\)', r'<a href="\2">\1</a>', text)
-    # Line breaks
-    text = text.replace('\n', '<br>')
-    
-    return text
+# One alternation over every Discord markdown construct; at a given position the first branch that
+# matches wins, so the longer delimiters are listed before their prefixes. Italics are the exception:
+# they only match at "**" when they open with a bold run ("***a** b*"), so they are tried before bold.
+# Bold and italics may each hold a complete run of the other ("**a *b***"); bold may end on the closing
+# "*" of its italics. The branches are written so that each character can only be consumed one way,
+# which keeps unclosed delimiters from backtracking exponentially.
+_MARKDOWN_TOKEN = re.compile(
+    r"```(?:(?P<lang>[A-Za-z0-9_+-]+)\n)?\n?(?P<block>.*?)```"
+    r"|``(?P<code2>.+?)``"
+    r"|`(?P<code>[^`]+)`"
+    r"|\*\*\*(?P<bold_em>.+?)\*\*\*"
+    r"|\*(?!\s)(?P<em>(?:\*\*.+?\*\*|[^*])+?)(?<!\s)\*"
+    r"|\*\*(?P<bold>(?:[^*]|\*(?!\*))+?(?:(?<=[^\s*])\*)?)\*\*"
+    r"|__(?P<underline>.+?)__"
+    r"|(?<!\w)_(?P<em2>.+?)_(?!\w)"
+    r"|~~(?P<strike>.+?)~~"
+    r"|\[(?P<label>[^\]\n]+)\]\((?P<href>https?://[^\s)]+)\)"
+    r"|<@!?(?P<user>\d+)>"
+    r"|<@&(?P<role>\d+)>"
+    r"|<#(?P<channel>\d+)>"
+    r"|<t:(?P<unix>-?\d+)(?::(?P<style>[tTdDfFR]))?>"
+    r"|(?P<newline>\n)",
+    re.DOTALL,
+)
+
+# Wrapping tags for the constructs whose contents are themselves markdown.
+_MARKDOWN_WRAP = {
+    "bold_em": ("<strong><em>", "</em></strong>"),
+    "bold": ("<strong>", "</strong>"),
+    "underline": ("<u>", "</u>"),
+    "em": ("<em>", "</em>"),
+    "em2": ("<em>", "</em>"),
+    "strike": ("<s>", "</s>"),
+}
+
+# strftime formats for Discord's <t:unix:style> timestamps; relative ("R") falls back to the full date.
+_TIMESTAMP_STYLES = {
+    "t": "%H:%M",
+    "T": "%H:%M:%S",
+    "d": "%d/%m/%Y",
+    "D": "%d %B %Y",
+    "f": "%d %B %Y %H:%M",
+    "F": "%A, %d %B %Y %H:%M",
+    "R": "%d %B %Y %H:%M",
+}
+
+# Longer texts are rarely repeated verbatim and would make the cache hold large strings.
+_MARKDOWN_CACHE_MAX_CHARS = 2000
+
+
+def _render_code(code: str) -> str:
+    return escape_html(code).replace("\n", "<br>")
+
+
+def _render_timestamp(unix: str, style: Optional[str], raw: str) -> str:
+    try:
+        moment = datetime.fromtimestamp(int(unix), tz=timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        return escape_html(raw)
+    shown = moment.strftime(_TIMESTAMP_STYLES[style or "f"])
+    return f'<span class="unix-timestamp" data-timestamp="{format_timestamp_long(moment)}">{shown}</span>'
+
+
+def _render_markdown(text: str) -> str:
+    parts: List[str] = []
+    position = 0
+    for match in _MARKDOWN_TOKEN.finditer(text):
+        if match.start() > position:
+            parts.append(escape_html(text[position:match.start()]))
+        position = match.end()
+
+        kind = match.lastgroup
+        if kind in _MARKDOWN_WRAP:
+            opening, closing = _MARKDOWN_WRAP[kind]
+            parts.append(f"{opening}{_render_markdown(match.group(kind))}{closing}")
+        elif kind == "newline":
+            parts.append("<br>")
+        elif kind in ("code", "code2"):
+            parts.append(f'<span class="pre pre--inline">{_render_code(match.group(kind))}</span>')
+        elif kind == "block":
+            language = match.group("lang")
+            css_class = f"pre pre--multiline language-{language}" if language else "pre pre--multiline"
+            code = match.group("block")
+            if code.endswith("\n"):
+                code = code[:-1]
+            parts.append(f'<div class="{css_class}">{_render_code(code)}</div>')
+        elif kind == "href":
+            parts.append(f'<a href="{escape_html(match.group("href"))}">{_render_markdown(match.group("label"))}</a>')
+        elif kind == "user":
+            parts.append(f'<span class="mention" title="{match.group("user")}">@User</span>')
+        elif kind == "role":
+            parts.append(f'<span class="mention" title="{match.group("role")}">@Role</span>')
+        elif kind == "channel":
+            parts.append(f'<span class="mention" title="{match.group("channel")}">#channel</span>')
+        elif kind in ("unix", "style"):
+            parts.append(_render_timestamp(match.group("unix"), match.group("style"), match.group(0)))
+    parts.append(escape_html(text[position:]))
+    return "".join(parts)
+
+
+@functools.lru_cache(maxsize=4096)
+def _render_markdown_cached(text: str) -> str:
+    return _render_markdown(text)
 
 
-def format_mention(text: str) -> str:
-    """Format Discord mentions in text."""
+def parse_markdown_basic(text: str) -> str:
+    """Convert Discord markdown (formatting, code, links, mentions, timestamps) to HTML in one pass."""
     if not text:
         return ""
-    
-    # User mentions: <@123456789>
-    text = re.sub(
-        r'<@!?(\d+)>',
-        r'<span class="mention" title="\1">@User</span>',
-        text
-    )
-    # Role mentions: <@&123456789>
-    text = re.sub(
-        r'<@&(\d+)>',
-        r'<span class="mention" title="\1">@Role</span>',
-        text
-    )
-    # Channel mentions: <#123456789>
-    text = re.sub(
-        r'<#(\d+)>',
-        r'<span class="mention" title="\1">#channel</span>',
-        text
-    )
-    
-    return text
+    if len(text) > _MARKDOWN_CACHE_MAX_CHARS:
+        return _render_markdown(text)
+    return _render_markdown_cached(text)
 
 
 def get_avatar_url(user: Union[discord.User, discord.Member]) -> str:
@@ -294,11 +358,12 @@ def format_reactions_html(reactions: List[discord.Reaction]) -> str:
     return '\n'.join(html_parts)
 
 
-def format_message_html(message: discord.Message, is_continuation: bool = False) -> str:
-    """Format a single message as HTML."""
-    # Special handling for system messages
-    if message.type != discord.MessageType.default and message.type != discord.MessageType.reply:
-         return f'''
+def _is_system_message(message: discord.Message) -> bool:
+    return message.type != discord.MessageType.default and message.type != discord.MessageType.reply
+
+
+def _format_system_message_html(message: discord.Message) -> str:
+    return f'''
             <div class="chatlog__message-group">
                 <div class="chatlog__message">
                      <div class="chatlog__message-aside"><div class="chatlog__pin-avatar-container"><img class="chatlog__pin-avatar" src="https://cdn.discordapp.com/embed/avatars/0.png" alt="System"></div></div>
@@ -311,27 +376,13 @@ def format_message_html(message: discord.Message, is_continuation: bool = False)
             </div>
          '''
 
-    author = message.author
-    avatar_url = get_avatar_url(author)
-    author_color = f"#{author.color.value:06x}" if author.color and author.color.value else "#ffffff"
-    
-    # Bot tag
-    bot_tag = ""
-    if author.bot:
-        bot_tag = '''
-        <span class="chatlog__bot-tag">
-            <svg class="chatlog__bot-tag-verified" height="16" viewBox="0 0 16 15.2">
-                <path d="M7.4,11.17,4,8.62,5,7.26l2,1.53L10.64,4l1.36,1Z" fill="#ffffff"></path>
-            </svg>
-            <span>APP</span>
-        </span>
-        '''
-    
+
+def _format_message_content_html(message: discord.Message) -> str:
+    """Everything inside a message's content block; shared by its group-head and continuation forms."""
     # Message content
     content_html = ""
     if message.content:
         content = parse_markdown_basic(message.content)
-        content = format_mention(content)
         content_html = f'<span class="chatlog__markdown-preserve">{content}</span>'
     
     # Edited indicator
@@ -368,22 +419,19 @@ def format_message_html(message: discord.Message, is_continuation: bool = False)
     reactions_html = ""
     if message.reactions:
         reactions_html = format_reactions_html(message.reactions)
-    
-    # Reference (reply)
-    reference_html = ""
-    if message.reference and message.reference.message_id:
-        reference_html = f'''
-        <div class="chatlog__followup">
-            <div class="chatlog__followup-symbol"></div>
-            <span class="chatlog__reference-link" onclick="scrollToMessage(event, '{message.reference.message_id}')">
-                Replying to a message
-            </span>
-        </div>
-        '''
-    
-    if is_continuation:
-        # Continuation message (same author, within timeframe)
-        return f'''
+
+    return f'''{content_html}
+                        {edited}
+                        {stickers_html}
+                        {embeds_html}
+                        {attachments_html}
+                        {components_html}
+                        {reactions_html}'''
+
+
+def _format_continuation_html(message: discord.Message, content: str) -> str:
+    # Continuation message (same author, within timeframe)
+    return f'''
         <div id="chatlog__message-container-{message.id}" class="chatlog__message-container" data-message-id="{message.id}">
             <div class="chatlog__message">
                 <div class="chatlog__message-aside">
@@ -391,21 +439,45 @@ def format_message_html(message: discord.Message, is_continuation: bool = False)
                 </div>
                 <div class="chatlog__message-primary">
                     <div class="chatlog__content chatlog__markdown" data-message-id="{message.id}" id="message-{message.id}">
-                        {content_html}
-                        {edited}
-                        {stickers_html}
-                        {embeds_html}
-                        {attachments_html}
-                        {components_html}
-                        {reactions_html}
+                        {content}
                     </div>
                 </div>
             </div>
         </div>
         '''
-    else:
-        # New message group
-        return f'''
+
+
+def _format_group_head_html(message: discord.Message, content: str) -> str:
+    author = message.author
+    avatar_url = get_avatar_url(author)
+    author_color = f"#{author.color.value:06x}" if author.color and author.color.value else "#ffffff"
+    
+    # Bot tag
+    bot_tag = ""
+    if author.bot:
+        bot_tag = '''
+        <span class="chatlog__bot-tag">
+            <svg class="chatlog__bot-tag-verified" height="16" viewBox="0 0 16 15.2">
+                <path d="M7.4,11.17,4,8.62,5,7.26l2,1.53L10.64,4l1.36,1Z" fill="#ffffff"></path>
+            </svg>
+            <span>APP</span>
+        </span>
+        '''
+
+    # Reference (reply)
+    reference_html = ""
+    if message.reference and message.reference.message_id:
+        reference_html = f'''
+        <div class="chatlog__followup">
+            <div class="chatlog__followup-symbol"></div>
+            <span class="chatlog__reference-link" onclick="scrollToMessage(event, '{message.reference.message_id}')">
+                Replying to a message
+            </span>
+        </div>
+        '''
+
+    # New message group
+    return f'''
         <div id="chatlog__message-container-{message.id}" class="chatlog__message-container" data-message-id="{message.id}">
             <div class="chatlog__message">
                 <div class="chatlog__message-aside">
@@ -419,13 +491,7 @@ def format_message_html(message: discord.Message, is_continuation: bool = False)
                     </div>
                     {reference_html}
                     <div class="chatlog__content chatlog__markdown" data-message-id="{message.id}" id="message-{message.id}">
-                        {content_html}
-                        {edited}
-                        {stickers_html}
-                        {embeds_html}
-                        {attachments_html}
-                        {components_html}
-                        {reactions_html}
+                        {content}
                     </div>
                 </div>
             </div>
@@ -433,6 +499,51 @@ def format_message_html(message: discord.Message, is_continuation: bool = False)
         '''
 
 
+def format_message_html(message: discord.Message, is_continuation: bool = False) -> str:
+    """Format a single message as HTML."""
+    if _is_system_message(message):
+        return _format_system_message_html(message)
+    content = _format_message_content_html(message)
+    if is_continuation:
+        return _format_continuation_html(message, content)
+    return _format_group_head_html(message, content)
+
+
+@dataclass
+class MessageFragment:
+    """A message rendered ahead of time in both forms, so its grouping can be decided when stitching."""
+
+    message_id: int
+    author_id: int
+    created_at: datetime
+    system: bool
+    html: str
+    # Same message without the avatar/name header; None for system messages, which never continue a group.
+    continuation_html: Optional[str]
+
+
+def render_message_fragment(message: discord.Message) -> MessageFragment:
+    system = _is_system_message(message)
+    try:
+        if system:
+            html, continuation_html = _format_system_message_html(message), None
+        else:
+            content = _format_message_content_html(message)
+            html = _format_group_head_html(message, content)
+            continuation_html = _format_continuation_html(message, content)
+    except Exception as e:
+        logger.error(f"Error formatting message {message.id}: {e}")
+        html = continuation_html = f'<div class="chatlog__message-error">Error formatting message {message.id}</div>'
+    return MessageFragment(
+        message_id=message.id,
+        author_id=message.author.id,
+        created_at=message.created_at,
+        system=system,
+        html=html,
+        continuation_html=continuation_html,
+    )
+
+
 def generate_user_popout_html(user: discord.Member, message_count: int, guild: discord.Guild) -> str:
     """Generate user popout HTML."""
     avatar_url = get_avatar_url(user)
@@ -486,106 +597,195 @@ def generate_user_popout_html(user: discord.Member, message_count: int, guild: d
     '''
 
 
-async def generate_transcript(channel: discord.TextChannel, limit: int = None) -> Dict[str, object]:
+# The template is split once around its two bulk sections; only the small pieces around them
+# carry the remaining {placeholders}.
+_TEMPLATE_HEAD, _TEMPLATE_REST = HTML_TEMPLATE.split("{messages}", 1)
+_TEMPLATE_MIDDLE, _TEMPLATE_TAIL = _TEMPLATE_REST.split("{user_popouts}", 1)
+_TEMPLATE_FIELD = re.compile(
+    r"\{(channel_name|channel_id|guild_name|guild_id|guild_icon|message_count|participant_count|generated_at|created_at)\}"
+)
+
+# Rendered transcripts stay in memory up to this size and spill to a temporary file beyond it.
+TRANSCRIPT_SPOOL_BYTES = 4 * 1024 * 1024
+
+# Messages per channel.history request.
+HISTORY_PAGE_SIZE = 100
+
+# Discord groups consecutive messages from one author sent within 7 minutes.
+GROUPING_SECONDS = 420
+
+
+def _fill_template(part: str, fields: Dict[str, str]) -> str:
+    return _TEMPLATE_FIELD.sub(lambda match: fields[match.group(1)], part)
+
+
+@dataclass
+class RenderedTranscript:
+    """A rendered HTML transcript held in a spooled file, plus the stats gathered while rendering."""
+
+    file: tempfile.SpooledTemporaryFile
+    total_messages: int
+    participants: Dict[int, int]
+    size: int
+
+    def to_discord_file(self, filename: str) -> discord.File:
+        # discord.File rewinds to the position it was created at, so one transcript can be sent many times.
+        self.file.seek(0)
+        return discord.File(self.file, filename=filename)
+
+    def read_html(self) -> str:
+        self.file.seek(0)
+        return self.file.read().decode("utf-8")
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class TranscriptRenderer:
+    """Renders messages into a transcript as they arrive, oldest first.
+
+    Message HTML goes straight to a spooled buffer and only per-participant stats are kept, so memory
+    does not grow with the length of the channel.
+    """
+
+    def __init__(self, guild: discord.Guild):
+        self.guild = guild
+        self.total_messages = 0
+        self.participants: Dict[int, int] = {}
+        # Members only: they are the ones that get a profile popout.
+        self._members: Dict[int, discord.Member] = {}
+        self._body = tempfile.SpooledTemporaryFile(max_size=TRANSCRIPT_SPOOL_BYTES)
+        self._last_author_id: Optional[int] = None
+        self._last_message_time: Optional[datetime] = None
+        self._group_open = False
+
+    def _write(self, html: str) -> None:
+        self._body.write(html.encode("utf-8"))
+
+    def _count(self, author_id: int, member: Optional[discord.Member]) -> None:
+        self.total_messages += 1
+        self.participants[author_id] = self.participants.get(author_id, 0) + 1
+        if member is not None:
+            self._members[author_id] = member
+
+    def _start_message(self, author_id: int, created_at: datetime, system: bool) -> bool:
+        """Open or close message groups ahead of a message; returns whether it continues the open group."""
+        # System messages break grouping
+        if system:
+            if self._group_open:
+                self._write('</div>')
+                self._group_open = False
+            self._last_author_id = None
+            return False
+
+        is_continuation = (
+            self._last_author_id == author_id
+            and self._last_message_time is not None
+            and (created_at - self._last_message_time).total_seconds() < GROUPING_SECONDS
+        )
+        if not is_continuation:
+            if self._group_open:
+                self._write('</div>')
+            self._write('<div class="chatlog__message-group">')
+            self._group_open = True
+        self._last_author_id = author_id
+        self._last_message_time = created_at
+        return is_continuation
+
+    def add(self, message: discord.Message) -> None:
+        author = message.author
+        self._count(author.id, author if isinstance(author, discord.Member) else None)
+        system = _is_system_message(message)
+        is_continuation = self._start_message(author.id, message.created_at, system)
+        if system:
+            self._write(format_message_html(message, is_continuation=False))
+            return
+        try:
+            self._write(format_message_html(message, is_continuation))
+        except Exception as e:
+            logger.error(f"Error formatting message {message.id}: {e}")
+            self._write(f'<div class="chatlog__message-error">Error formatting message {message.id}</div>')
+
+    def add_many(self, messages: List[discord.Message]) -> None:
+        for message in messages:
+            self.add(message)
+
+    def add_fragment(self, fragment: MessageFragment, member: Optional[discord.Member] = None) -> None:
+        """Add a message rendered earlier by render_message_fragment."""
+        self._count(fragment.author_id, member)
+        if self._start_message(fragment.author_id, fragment.created_at, fragment.system) and fragment.continuation_html:
+            self._write(fragment.continuation_html)
+        else:
+            self._write(fragment.html)
+
+    def finish(self, channel: discord.TextChannel) -> RenderedTranscript:
+        if self._group_open:
+            self._write('</div>')
+            self._group_open = False
+
+        fields = {
+            "channel_name": escape_html(channel.name),
+            "channel_id": str(channel.id),
+            "guild_name": escape_html(self.guild.name),
+            "guild_id": str(self.guild.id),
+            "guild_icon": get_guild_icon_url(self.guild),
+            "message_count": str(self.total_messages),
+            "participant_count": str(len(self.participants)),
+            "generated_at": format_timestamp_footer(datetime.now(timezone.utc)),
+            "created_at": channel.created_at.strftime("%b %d, %Y (%H:%M:%S)") if channel.created_at else "Unknown",
+        }
+
+        # The head needs the final counts, so it is written ahead of the buffered messages here.
+        output = tempfile.SpooledTemporaryFile(max_size=TRANSCRIPT_SPOOL_BYTES)
+        output.write(_fill_template(_TEMPLATE_HEAD, fields).encode("utf-8"))
+        self._body.seek(0)
+        shutil.copyfileobj(self._body, output)
+        self._body.close()
+        output.write(_fill_template(_TEMPLATE_MIDDLE, fields).encode("utf-8"))
+        for user_id, member in self._members.items():
+            output.write(generate_user_popout_html(member, self.participants.get(user_id, 0), self.guild).encode("utf-8"))
+        output.write(_TEMPLATE_TAIL.encode("utf-8"))
+        size = output.tell()
+        output.seek(0)
+        return RenderedTranscript(
+            file=output,
+            total_messages=self.total_messages,
+            participants=self.participants,
+            size=size,
+        )
+
+
+async def generate_transcript(
+    channel: discord.TextChannel, limit: int = None, executor: Optional[Executor] = None
+) -> RenderedTranscript:
     """
     Generate an HTML transcript for a Discord channel.
-    
+
     Args:
         channel: The Discord text channel to generate transcript for
         limit: Maximum number of messages to fetch (None = all)
-    
+        executor: Render each history page on this executor instead of the event loop
+
     Returns:
-        dict: A dictionary containing 'html', 'total_messages', and 'participants'.
+        RenderedTranscript: the HTML in a spooled file, with message and participant counts.
     """
-    guild = channel.guild
-    guild_icon = get_guild_icon_url(guild)
-    
-    # Fetch messages
-    messages: List[discord.Message] = []
+    renderer = TranscriptRenderer(channel.guild)
+    loop = asyncio.get_running_loop()
+    page: List[discord.Message] = []
     try:
         async for message in channel.history(limit=limit, oldest_first=True):
-            messages.append(message)
+            if executor is None:
+                renderer.add(message)
+                continue
+            page.append(message)
+            if len(page) >= HISTORY_PAGE_SIZE:
+                await loop.run_in_executor(executor, renderer.add_many, page)
+                page = []
     except Exception as e:
         logger.error(f"Failed to fetch messages for transcript: {e}")
         # Proceed with what we have
-    
-    # Count messages per user
-    user_message_counts: Dict[int, int] = {}
-    unique_users: Dict[int, Union[discord.Member, discord.User]] = {}
-    
-    for msg in messages:
-        user_message_counts[msg.author.id] = user_message_counts.get(msg.author.id, 0) + 1
-        # Only store if not already stored or if the stored one is a User and this one is a Member (Member has more info)
-        if msg.author.id not in unique_users or isinstance(msg.author, discord.Member):
-            unique_users[msg.author.id] = msg.author
-    
-    # Generate message HTML with grouping
-    messages_html = ""
-    last_author_id = None
-    last_message_time = None
-    message_group_open = False
-    
-    for msg in messages:
-        # Handle system messages (break grouping)
-        if msg.type != discord.MessageType.default and msg.type != discord.MessageType.reply:
-            if message_group_open:
-                messages_html += '</div>'
-                message_group_open = False
-            messages_html += format_message_html(msg, is_continuation=False)
-            last_author_id = None # Reset author tracking
-            continue
-
-        # Check if this is a continuation (same author, within timeframe)
-        is_continuation = False
-        if last_author_id == msg.author.id and last_message_time:
-            time_diff = (msg.created_at - last_message_time).total_seconds()
-            is_continuation = time_diff < 420  # 7 minutes (Discord's grouping time)
-        
-        if not is_continuation:
-            if message_group_open:
-                messages_html += '</div>'  # Close previous group
-            messages_html += '<div class="chatlog__message-group">'
-            message_group_open = True
-        
-        try:
-            messages_html += format_message_html(msg, is_continuation)
-        except Exception as e:
-            logger.error(f"Error formatting message {msg.id}: {e}")
-            messages_html += f'<div class="chatlog__message-error">Error formatting message {msg.id}</div>'
-        
-        last_author_id = msg.author.id
-        last_message_time = msg.created_at
-    
-    if message_group_open:
-        messages_html += '</div>'  # Close last group
-    
-    # Generate user popouts
-    user_popouts_html = ""
-    for user_id, user in unique_users.items():
-        if isinstance(user, discord.Member):
-             user_popouts_html += generate_user_popout_html(user, user_message_counts.get(user_id, 0), guild)
-    
-    # Generate summary values
-    channel_created = channel.created_at.strftime("%b %d, %Y (%H:%M:%S)") if channel.created_at else "Unknown"
-    now = datetime.now(timezone.utc)
-    
-    # Fill variables in template (using .replace since it's safer than format() with so many braces in CSS/JS)
-    final_html = HTML_TEMPLATE.replace("{channel_name}", escape_html(channel.name))
-    final_html = final_html.replace("{channel_id}", str(channel.id))
-    final_html = final_html.replace("{guild_name}", escape_html(guild.name))
-    final_html = final_html.replace("{guild_id}", str(guild.id))
-    final_html = final_html.replace("{guild_icon}", guild_icon)
-    final_html = final_html.replace("{message_count}", str(len(messages)))
-    final_html = final_html.replace("{participant_count}", str(len(unique_users)))
-    final_html = final_html.replace("{generated_at}", format_timestamp_footer(now))
-    final_html = final_html.replace("{created_at}", channel_created)
-    
-    # Insert dynamic content
-    final_html = final_html.replace("{messages}", messages_html)
-    final_html = final_html.replace("{user_popouts}", user_popouts_html)
-    
-    return {
-        "html": final_html,
-        "total_messages": len(messages),
-        "participants": user_message_counts
-    }
+    if executor is None:
+        return renderer.finish(channel)
+    if page:
+        await loop.run_in_executor(executor, renderer.add_many, page)
+    return await loop.run_in_executor(executor, renderer.finish, channel)
@@ -1,24 +1,100 @@
+import asyncio
+import codecs
+import csv
+import gzip
+import hashlib
 import hmac
+import json
+import math
 import os
 import re
 import fnmatch
-import json
+import functools
 import secrets
+import time
+from dataclasses import dataclass
 from pathlib import Path
-from datetime import datetime, timezone
-from typing import Any, Optional
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
 from urllib.parse import urlencode, urlparse, urlunparse, parse_qsl
 
 import asyncpg
 import discord
-from aiohttp import ClientSession, web
+from aiohttp import web
 
 from ..utils.logger import logger
+from .http_client import http_client
+from .metrics import (
+    http_request_duration_seconds,
+    http_requests_in_flight,
+    http_requests_rejected_total,
+    http_requests_total,
+    metrics,
+    payment_gateway_duration_seconds,
+    storage_calls_in_flight,
+)
+from .rate_limit import TokenBucketLimiter, parse_rate_limits
+from .shop_fulfilment import FulfilmentQueue
+from .shop_search import ProductSearchIndex
+from .shop_storage import (
+    Allocation,
+    InsufficientStock,
+    JsonShopStorage,
+    KeyedLocks,
+    PostgresShopStorage,
+    ShopStorage,
+)
+
+try:
+    import brotli
+except ImportError:  # Optional: without it the catalog is only offered gzip-encoded.
+    brotli = None
+
+
+# Requests per second and burst per client for each route budget (see _route_budget).
+_DEFAULT_RATE_LIMITS = {
+    "catalog": (10.0, 30.0),
+    "status": (2.0, 20.0),
+    "checkout": (1.0, 10.0),
+    "chat": (0.2, 3.0),
+    "default": (20.0, 60.0),
+}
+# Budgets that stay open while storage is saturated, so buyers mid-checkout are served first.
+_PRIORITY_BUDGETS = {"checkout", "status"}
+# Probes and gateway webhooks are never throttled; webhooks carry their own signatures.
+_UNTHROTTLED_PATHS = {
+    "/api/bot/health",
+    "/shop/health",
+    "/shop/live",
+    "/shop/ready",
+    "/shop/webhooks/stripe",
+    "/shop/webhooks/oxapay",
+}
+
+
+@dataclass(frozen=True)
+class _RenderedJson:
+    etag: str
+    identity: bytes
+    gzip: bytes
+    br: Optional[bytes]
 
 
 class WebsiteBridgeServer:
-    def __init__(self, bot: discord.Client):
+    def __init__(
+        self,
+        bot: discord.Client,
+        reuse_port: bool = False,
+        send_order_logs: bool = True,
+        resume_fulfilment: bool = True,
+    ):
         self.bot = bot
+        # reuse_port lets several API worker processes accept on the same port (see run_api_only.py).
+        self.reuse_port = reuse_port
+        # Processes without a Discord connection leave order logs in the shared store for the bot to send.
+        self.send_order_logs = send_order_logs
+        # With several API workers only one picks up the fulfilments queued before a restart.
+        self.resume_fulfilment = resume_fulfilment
         self.host = os.getenv("BOT_API_HOST", "0.0.0.0")
         port_value = os.getenv("BOT_API_PORT") or os.getenv("PORT") or "8080"
         self.port = int(port_value)
@@ -43,12 +119,13 @@ class WebsiteBridgeServer:
         self.use_supabase_storage = self.shop_storage_backend == "supabase" or (
             self.shop_storage_backend == "auto" and bool(self.db_url)
         )
+        self.shop_table_prefix = (os.getenv("SHOP_TABLE_PREFIX") or "shop_").strip()
+        if not re.match(r"^[A-Za-z_][A-Za-z0-9_]*$", self.shop_table_prefix):
+            self.shop_table_prefix = "shop_"
         self.pg_pool: Optional[asyncpg.Pool] = None
         self.data_dir = Path(os.getenv("SHOP_DATA_DIR", "data"))
-        self.products_file = self.data_dir / "shop_products.json"
-        self.orders_file = self.data_dir / "shop_orders.json"
-        self.pending_payments_file = self.data_dir / "shop_pending_payments.json"
         self.stripe_secret_key = (os.getenv("STRIPE_SECRET_KEY") or "").strip()
+        self.stripe_api_url = (os.getenv("STRIPE_API_URL") or "https://api.stripe.com").strip().rstrip("/")
         self.stripe_currency = (os.getenv("STRIPE_CURRENCY") or "usd").strip().lower() or "usd"
         self.paypal_checkout_url = (os.getenv("PAYPAL_CHECKOUT_URL") or "").strip()
         self.crypto_checkout_url = (os.getenv("CRYPTO_CHECKOUT_URL") or "").strip()
@@ -57,15 +134,59 @@ class WebsiteBridgeServer:
         self.oxapay_currency = (os.getenv("OXAPAY_CURRENCY") or "USD").strip().upper() or "USD"
         self.oxapay_lifetime_minutes = self._to_int(os.getenv("OXAPAY_LIFETIME_MINUTES"), default=60) or 60
         self.oxapay_min_amount = self._to_float(os.getenv("OXAPAY_MIN_AMOUNT"), default=0.10) or 0.10
-        self.data_dir.mkdir(parents=True, exist_ok=True)
-        self._ensure_json_file(self.products_file, [])
-        self._ensure_json_file(self.orders_file, [])
-        self._ensure_json_file(self.pending_payments_file, {})
+        self.stripe_webhook_secret = (os.getenv("STRIPE_WEBHOOK_SECRET") or "").strip()
+        self.stripe_webhook_tolerance_seconds = self._to_int(os.getenv("STRIPE_WEBHOOK_TOLERANCE_SECONDS"), default=300) or 300
+        # Public URL of this API, used to give OxaPay a callback address for each invoice.
+        self.webhook_base_url = (os.getenv("SHOP_WEBHOOK_BASE_URL") or "").strip().rstrip("/")
+        # Stripe only accepts checkout session lifetimes between 30 minutes and 24 hours.
+        self.stripe_session_lifetime_minutes = min(
+            max(self._to_int(os.getenv("STRIPE_SESSION_LIFETIME_MINUTES"), default=60) or 60, 30), 1440
+        )
+        self.pending_payment_grace_minutes = max(0, self._to_int(os.getenv("SHOP_PENDING_GRACE_MINUTES"), default=30) or 0)
+        self.pending_sweep_seconds = max(1.0, self._to_float(os.getenv("SHOP_PENDING_SWEEP_SECONDS"), default=60.0) or 60.0)
+        self._pending_sweeper: Optional[asyncio.Task] = None
+        self.storage: ShopStorage = JsonShopStorage(
+            self.data_dir,
+            self._normalize_product,
+            inventory_compact_every=self._to_int(os.getenv("SHOP_INVENTORY_COMPACT_EVERY"), default=500) or 500,
+            order_segment_size=self._to_int(os.getenv("SHOP_ORDER_SEGMENT_SIZE"), default=5000) or 5000,
+        )
+        self._payment_locks = KeyedLocks()
+        self.catalog_refresh_seconds = max(0.0, self._to_float(os.getenv("SHOP_CATALOG_REFRESH_SECONDS"), default=2.0) or 0.0)
+        self._catalog: Optional[list[dict[str, Any]]] = None
+        self._catalog_version = -1
+        self._catalog_marker: Any = None
+        self._catalog_checked_at = 0.0
+        self._catalog_lock = asyncio.Lock()
+        self.catalog_cache_seconds = max(0, self._to_int(os.getenv("SHOP_CATALOG_CACHE_SECONDS"), default=10) or 0)
+        self._catalog_rendered: Optional[_RenderedJson] = None
+        self._catalog_rendered_source: Optional[list[dict[str, Any]]] = None
+        self._search_index: Optional[ProductSearchIndex] = None
+        self._search_index_source: Optional[list[dict[str, Any]]] = None
+        self.health_cache_seconds = max(0.0, self._to_float(os.getenv("SHOP_HEALTH_CACHE_SECONDS"), default=5.0) or 0.0)
+        self._record_counts: Optional[dict[str, int]] = None
+        self._record_counts_at = 0.0
+        self._record_counts_lock = asyncio.Lock()
+        self.fulfilment = FulfilmentQueue(workers=self._to_int(os.getenv("SHOP_FULFILMENT_WORKERS"), default=16) or 16)
+        self.fulfilment_wait_seconds = max(0.0, self._to_float(os.getenv("SHOP_FULFILMENT_WAIT_SECONDS"), default=8.0) or 0.0)
+        self.import_batch_size = max(1, self._to_int(os.getenv("SHOP_IMPORT_BATCH_SIZE"), default=5000) or 5000)
+        rate_limits = parse_rate_limits(os.getenv("SHOP_RATE_LIMITS") or "", _DEFAULT_RATE_LIMITS)
+        self._rate_limiters = {name: TokenBucketLimiter(rate, burst) for name, (rate, burst) in (rate_limits or {}).items()}
+        # Behind cloudflared every request comes from localhost; set this to CF-Connecting-IP there.
+        self.client_ip_header = (os.getenv("BOT_API_CLIENT_IP_HEADER") or "").strip()
+        self.max_in_flight = max(0, self._to_int(os.getenv("SHOP_MAX_IN_FLIGHT"), default=256) or 0)
+        self.storage_max_in_flight = max(0, self._to_int(os.getenv("SHOP_STORAGE_MAX_IN_FLIGHT"), default=64) or 0)
+        self._admitted = 0
+        self.order_event_poll_seconds = max(1.0, self._to_float(os.getenv("SHOP_ORDER_EVENT_POLL_SECONDS"), default=30.0) or 30.0)
+        self._order_event_consumer: Optional[asyncio.Task] = None
+        self._started = False
 
         self.app = web.Application(
             middlewares=[
+                self._metrics_middleware,
                 self._error_middleware,
                 self._cors_middleware,
+                self._admission_middleware,
                 self._auth_middleware,
             ]
         )
@@ -74,20 +195,50 @@ class WebsiteBridgeServer:
         self.app.router.add_post("/api/bot/chat", self.chat)
         self.app.router.add_post("/api/bot/order", self.order)
         self.app.router.add_get("/shop/health", self.shop_health)
+        self.app.router.add_get("/shop/live", self.shop_live)
+        self.app.router.add_get("/shop/ready", self.shop_ready)
+        self.app.router.add_get("/metrics", self.metrics)
         self.app.router.add_get("/shop/products", self.shop_products)
+        self.app.router.add_get("/shop/search", self.shop_search)
         self.app.router.add_get("/shop/invoices/{invoice_id}", self.shop_get_invoice)
+        self.app.router.add_get("/shop/users/{user_id}/orders", self.shop_get_user_orders)
         self.app.router.add_get("/shop/payment-methods", self.shop_payment_methods)
         self.app.router.add_post("/shop/products", self.shop_upsert_product)
         self.app.router.add_delete("/shop/products/{product_id}", self.shop_delete_product)
         self.app.router.add_get("/shop/inventory/{product_id}", self.shop_get_inventory)
         self.app.router.add_post("/shop/inventory/add", self.shop_add_inventory)
+        self.app.router.add_post("/shop/inventory/import", self.shop_import_inventory)
         self.app.router.add_post("/shop/stock", self.shop_update_stock)
         self.app.router.add_post("/shop/payments/create", self.shop_create_payment)
         self.app.router.add_post("/shop/payments/confirm", self.shop_confirm_payment)
+        self.app.router.add_post("/shop/payments/cancel", self.shop_cancel_payment)
+        self.app.router.add_get("/shop/payments/{token}/status", self.shop_get_payment_status)
+        self.app.router.add_post("/shop/webhooks/stripe", self.shop_stripe_webhook)
+        self.app.router.add_post("/shop/webhooks/oxapay", self.shop_oxapay_webhook)
         self.app.router.add_post("/shop/buy", self.shop_buy)
 
         self.runner: Optional[web.AppRunner] = None
 
+    @web.middleware
+    async def _metrics_middleware(self, request: web.Request, handler):
+        resource = request.match_info.route.resource
+        # Label by route template, not raw path, so ids in the URL don't explode the series count.
+        route = resource.canonical if resource is not None else "unmatched"
+        status = 500
+        started = time.perf_counter()
+        http_requests_in_flight.inc()
+        try:
+            response = await handler(request)
+            status = response.status
+            return response
+        except web.HTTPException as exc:
+            status = exc.status
+            raise
+        finally:
+            http_requests_in_flight.dec()
+            http_request_duration_seconds.observe(time.perf_counter() - started, method=request.method, route=route)
+            http_requests_total.inc(method=request.method, route=route, status=str(status))
+
     @web.middleware
     async def _error_middleware(self, request: web.Request, handler):
         try:
@@ -107,15 +258,83 @@ class WebsiteBridgeServer:
         self._apply_cors_headers(request, response)
         return response
 
+    @web.middleware
+    async def _admission_middleware(self, request: web.Request, handler):
+        if request.method == "OPTIONS" or request.path in _UNTHROTTLED_PATHS:
+            return await handler(request)
+
+        resource = request.match_info.route.resource
+        route = resource.canonical if resource is not None else "unmatched"
+        budget = self._route_budget(request.method, route)
+        limiter = self._rate_limiters.get(budget) or self._rate_limiters.get("default")
+        if limiter is not None:
+            retry_after = limiter.acquire(self._client_key(request))
+            if retry_after:
+                return self._reject(route, "rate_limited", 429, retry_after)
+        if self.max_in_flight and self._admitted >= self.max_in_flight:
+            return self._reject(route, "overloaded", 503, 1.0)
+        if (
+            budget not in _PRIORITY_BUDGETS
+            and self.storage_max_in_flight
+            and storage_calls_in_flight.value() >= self.storage_max_in_flight
+        ):
+            return self._reject(route, "storage_saturated", 503, 1.0)
+
+        self._admitted += 1
+        try:
+            return await handler(request)
+        finally:
+            self._admitted -= 1
+
+    @staticmethod
+    def _route_budget(method: str, route: str) -> str:
+        if method == "GET" and route in {"/shop/products", "/shop/search", "/shop/payment-methods"}:
+            return "catalog"
+        if route == "/shop/payments/{token}/status":
+            return "status"
+        if method == "POST" and route in {
+            "/shop/payments/create",
+            "/shop/payments/confirm",
+            "/shop/payments/cancel",
+            "/shop/buy",
+            "/api/bot/order",
+        }:
+            return "checkout"
+        if route == "/api/bot/chat":
+            return "chat"
+        return "default"
+
+    def _client_key(self, request: web.Request) -> str:
+        # The storefront bundle ships the API key to every browser, so clients are told apart by address.
+        if self.client_ip_header:
+            forwarded = request.headers.get(self.client_ip_header, "").split(",")[0].strip()
+            if forwarded:
+                return forwarded
+        return request.remote or "unknown"
+
+    @staticmethod
+    def _reject(route: str, reason: str, status: int, retry_after: float) -> web.Response:
+        http_requests_rejected_total.inc(route=route, reason=reason)
+        message = "too many requests, slow down" if status == 429 else "server is busy, try again shortly"
+        return web.json_response(
+            {"ok": False, "message": message},
+            status=status,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
     @web.middleware
     async def _auth_middleware(self, request: web.Request, handler):
         if request.method == "OPTIONS":
             return await handler(request)
 
-        if request.path in {"/api/bot/health", "/shop/health"}:
+        if request.path in {"/api/bot/health", "/shop/health", "/shop/live", "/shop/ready"}:
             return await handler(request)
 
-        if request.method == "GET" and request.path in {"/shop/products", "/shop/payment-methods"}:
+        if request.method == "GET" and request.path in {"/shop/products", "/shop/search", "/shop/payment-methods"}:
+            return await handler(request)
+
+        # Gateway webhooks are authenticated by their own signatures.
+        if request.method == "POST" and request.path in {"/shop/webhooks/stripe", "/shop/webhooks/oxapay"}:
             return await handler(request)
 
         if not self.api_key:
@@ -149,7 +368,8 @@ class WebsiteBridgeServer:
             response.headers["Access-Control-Allow-Origin"] = "*"
         elif origin and self._is_origin_allowed(origin):
             response.headers["Access-Control-Allow-Origin"] = origin
-            response.headers["Vary"] = "Origin"
+            vary = response.headers.get("Vary")
+            response.headers["Vary"] = f"{vary}, Origin" if vary else "Origin"
         else:
             response.headers["Access-Control-Allow-Origin"] = self.allowed_origins[0]
 
@@ -166,36 +386,95 @@ class WebsiteBridgeServer:
                 return True
         return False
 
-    async def start(self) -> None:
-        if self.runner is not None:
+    async def start(self, serve_http: bool = True) -> None:
+        """Open shop storage and serve the API; with ``serve_http=False`` only send order logs queued by API workers."""
+        if self._started:
             return
+        self._started = True
 
         if self.use_supabase_storage:
             try:
                 await self._init_supabase_storage()
             except Exception as exc:
-                logger.error(f"Supabase shop storage init failed, falling back to JSON files: {exc}")
                 self.use_supabase_storage = False
+                if self.pg_pool is not None:
+                    await self.pg_pool.close()
+                    self.pg_pool = None
+                if self.reuse_port:
+                    self._started = False
+                    raise RuntimeError(f"Supabase shop storage init failed: {exc}") from exc
+                logger.error(f"Supabase shop storage init failed, falling back to JSON files: {exc}")
+        if self.reuse_port and not self.use_supabase_storage:
+            # The JSON store is single-process: workers sharing the port would overwrite each other's stock and orders.
+            self._started = False
+            raise RuntimeError("API workers sharing a port need SHOP_STORAGE_BACKEND=supabase")
+        if not serve_http and not self.storage.order_events:
+            # The API workers own the JSON data dir; this process must not open it as well.
+            logger.warning("External API mode needs SHOP_STORAGE_BACKEND=supabase to receive order logs from the API workers.")
+            return
+        if not self.use_supabase_storage:
+            await self.storage.init()
+        if self.send_order_logs and self.storage.order_events:
+            self._order_event_consumer = asyncio.create_task(self._consume_order_events())
+        if not serve_http:
+            logger.info("Website bridge is sending order logs only; the HTTP API runs in separate worker processes.")
+            return
+        if self.resume_fulfilment:
+            await self._resume_fulfilment()
 
         self.runner = web.AppRunner(self.app)
         await self.runner.setup()
-        site = web.TCPSite(self.runner, self.host, self.port)
+        site = web.TCPSite(self.runner, self.host, self.port, reuse_port=self.reuse_port or None)
         await site.start()
+        self._pending_sweeper = asyncio.create_task(self._sweep_pending_payments())
 
-        storage_mode = "supabase" if self.use_supabase_storage else "json"
-        logger.info(f"Website bridge listening on {self.host}:{self.port} (shop storage: {storage_mode})")
+        logger.info(f"Website bridge listening on {self.host}:{self.port} (shop storage: {self.storage.backend_name})")
 
     async def stop(self) -> None:
-        if self.runner is None:
+        if not self._started:
             return
+        self._started = False
 
-        await self.runner.cleanup()
-        self.runner = None
+        for task in (self._pending_sweeper, self._order_event_consumer):
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._pending_sweeper = None
+        self._order_event_consumer = None
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+        await self.fulfilment.stop()
+        await self.storage.close()
         if self.pg_pool is not None:
             await self.pg_pool.close()
             self.pg_pool = None
         logger.info("Website bridge stopped.")
 
+    async def _sweep_pending_payments(self) -> None:
+        # Entries written before expiresAt existed fall back to the longest checkout lifetime.
+        fallback_ttl = timedelta(
+            minutes=max(self.oxapay_lifetime_minutes, self.stripe_session_lifetime_minutes) + self.pending_payment_grace_minutes
+        )
+        while True:
+            await asyncio.sleep(self.pending_sweep_seconds)
+            try:
+                archived = await self.storage.expire_pending_payments(fallback_ttl)
+            except Exception as exc:
+                logger.error(f"Pending payment sweep failed: {exc}")
+                continue
+            if archived:
+                logger.info(f"Archived {archived} expired pending payment(s).")
+
+    def _pending_expiry(self, lifetime_minutes: int) -> str:
+        # The grace period lets a customer who paid just before the gateway deadline still confirm.
+        expires_at = datetime.now(timezone.utc) + timedelta(minutes=lifetime_minutes + self.pending_payment_grace_minutes)
+        return expires_at.isoformat()
+
     async def health(self, request: web.Request):
         return web.json_response(
             {
@@ -207,38 +486,77 @@ class WebsiteBridgeServer:
             }
         )
 
+    async def metrics(self, request: web.Request):
+        return web.Response(body=metrics.render().encode("utf-8"), headers={"Content-Type": metrics.content_type})
+
     async def shop_health(self, request: web.Request):
-        products = await self._load_products()
-        orders = await self._load_orders()
-        pending = await self._load_pending_payments()
+        counts = await self._get_record_counts()
         return web.json_response(
             {
                 "ok": True,
-                "products": len(products),
-                "orders": len(orders),
-                "pendingPayments": len(pending),
+                **counts,
                 "stripeEnabled": bool(self.stripe_secret_key),
                 "oxapayEnabled": bool(self.oxapay_merchant_api_key),
-                "storageBackend": "supabase" if self.use_supabase_storage else "json",
+                "storageBackend": self.storage.backend_name,
                 "data_dir": str(self.data_dir),
             }
         )
 
+    async def shop_live(self, request: web.Request):
+        return web.json_response({"ok": True})
+
+    async def shop_ready(self, request: web.Request):
+        try:
+            counts = await self._get_record_counts()
+        except Exception as exc:
+            logger.warning(f"Readiness check failed: {exc}")
+            return web.json_response({"ok": False, "message": "storage unavailable"}, status=503)
+        return web.json_response({"ok": True, "storageBackend": self.storage.backend_name, **counts})
+
     async def shop_products(self, request: web.Request):
-        products = [self._public_product(product) for product in await self._load_products()]
-        return web.json_response({"ok": True, "products": products})
+        catalog = await self._get_catalog()
+        if self._catalog_rendered is None or self._catalog_rendered_source is not catalog:
+            products = [self._public_product(product) for product in catalog]
+            self._catalog_rendered = self._render_json({"ok": True, "products": products})
+            self._catalog_rendered_source = catalog
+        return self._rendered_response(
+            request,
+            self._catalog_rendered,
+            cache_control=f"public, max-age={self.catalog_cache_seconds}",
+        )
+
+    async def shop_search(self, request: web.Request):
+        query = str(request.query.get("q", "")).strip()
+        if not query:
+            return web.json_response({"ok": False, "message": "q is required"}, status=400)
+        limit = min(max(self._to_int(request.query.get("limit"), default=20) or 20, 1), 100)
+
+        index = await self._get_search_index()
+        products = [self._public_product(product) for product in index.search(query, limit=limit)]
+        return web.json_response(
+            {"ok": True, "query": query, "products": products},
+            headers={"Cache-Control": f"public, max-age={self.catalog_cache_seconds}"},
+        )
 
     async def shop_get_invoice(self, request: web.Request):
         invoice_id = str(request.match_info.get("invoice_id", "")).strip()
         if not invoice_id:
             return web.json_response({"ok": False, "message": "invoice id is required"}, status=400)
 
-        orders = await self._load_orders()
-        for order in orders:
-            if str(order.get("id", "")).strip() == invoice_id:
-                return web.json_response({"ok": True, "invoice": order, "data": order})
+        order = await self.storage.get_order(invoice_id)
+        if order is not None:
+            return web.json_response({"ok": True, "invoice": order, "data": order})
         return web.json_response({"ok": False, "message": "invoice not found"}, status=404)
 
+    async def shop_get_user_orders(self, request: web.Request):
+        user_id = str(request.match_info.get("user_id", "")).strip()
+        if not user_id:
+            return web.json_response({"ok": False, "message": "user id is required"}, status=400)
+        limit = min(max(self._to_int(request.query.get("limit"), default=50) or 50, 1), 500)
+
+        orders = await self.storage.load_user_orders(user_id, limit=limit)
+        return web.json_response({"ok": True, "userId": user_id, "orders": orders})
+
     async def shop_payment_methods(self, request: web.Request):
         crypto_automated = bool(self.oxapay_merchant_api_key)
         crypto_enabled = crypto_automated or bool(self.crypto_checkout_url)
@@ -264,59 +582,36 @@ class WebsiteBridgeServer:
 
         products = await self._load_products()
         product_id = str(normalized["id"])
-        replaced = False
-        for idx, existing in enumerate(products):
+        # Inventory holders ("" = product level, otherwise tier ids) whose keys come from the payload;
+        # the storage keeps its current keys for every other holder. None replaces everything.
+        replace_inventory: Optional[set[str]] = None
+        for existing in products:
             if str(existing.get("id")) == product_id:
-                # Keep existing inventory unless explicitly provided in payload.
-                if "inventory" not in product and isinstance(existing.get("inventory"), list):
-                    normalized["inventory"] = [str(item) for item in existing.get("inventory", []) if str(item).strip()]
+                replace_inventory = {""} if "inventory" in product else set()
                 if "tiers" not in product and isinstance(existing.get("tiers"), list):
-                    normalized["tiers"] = [
-                        self._normalize_tier(tier) for tier in existing.get("tiers", []) if isinstance(tier, dict)
-                    ]
+                    normalized["tiers"] = [dict(tier) for tier in existing.get("tiers", []) if isinstance(tier, dict)]
                 elif isinstance(product.get("tiers"), list):
                     incoming_tier_payload = {
                         str(tier.get("id", "")).strip(): tier
                         for tier in product.get("tiers", [])
                         if isinstance(tier, dict)
                     }
-                    existing_tiers = {
-                        str(tier.get("id", "")).strip(): tier
-                        for tier in existing.get("tiers", [])
-                        if isinstance(tier, dict)
+                    existing_tier_ids = {
+                        str(tier.get("id", "")).strip() for tier in existing.get("tiers", []) if isinstance(tier, dict)
                     }
-                    merged_tiers: list[dict[str, Any]] = []
                     for tier in normalized.get("tiers", []):
                         tier_id = str(tier.get("id", "")).strip()
-                        if not tier_id:
-                            continue
-                        raw_payload_tier = incoming_tier_payload.get(tier_id, {})
-                        existing_tier = existing_tiers.get(tier_id)
-                        if (
-                            isinstance(existing_tier, dict)
-                            and isinstance(raw_payload_tier, dict)
-                            and "inventory" not in raw_payload_tier
-                            and isinstance(existing_tier.get("inventory"), list)
-                        ):
-                            tier["inventory"] = [
-                                str(item).strip() for item in existing_tier.get("inventory", []) if str(item).strip()
-                            ]
-                            tier["stock"] = len(tier["inventory"])
-                        merged_tiers.append(self._normalize_tier(tier))
-                    normalized["tiers"] = merged_tiers
-
-                normalized["stock"] = self._compute_product_stock(normalized)
-                products[idx] = normalized
-                replaced = True
+                        if tier_id not in existing_tier_ids or "inventory" in incoming_tier_payload.get(tier_id, {}):
+                            replace_inventory.add(tier_id)
                 break
-        if not replaced:
-            products.append(normalized)
 
-        await self._save_products(products)
+        await self.storage.save_product(normalized, replace_inventory=replace_inventory)
+        products = await self._load_products()
+        saved = next((item for item in products if str(item.get("id")) == product_id), normalized)
         return web.json_response(
             {
                 "ok": True,
-                "product": self._public_product(normalized),
+                "product": self._public_product(saved),
                 "products": [self._public_product(product) for product in products],
             }
         )
@@ -326,13 +621,11 @@ class WebsiteBridgeServer:
         if not product_id:
             return web.json_response({"ok": False, "message": "product id is required"}, status=400)
 
-        products = await self._load_products()
-        filtered = [product for product in products if str(product.get("id")) != product_id]
-        if len(filtered) == len(products):
+        if not await self.storage.delete_product(product_id):
             return web.json_response({"ok": False, "message": "product not found"}, status=404)
 
-        await self._save_products(filtered)
-        return web.json_response({"ok": True, "products": [self._public_product(product) for product in filtered]})
+        products = await self._load_products()
+        return web.json_response({"ok": True, "products": [self._public_product(product) for product in products]})
 
     async def shop_get_inventory(self, request: web.Request):
         product_id = str(request.match_info.get("product_id", "")).strip()
@@ -341,34 +634,22 @@ class WebsiteBridgeServer:
             return web.json_response({"ok": False, "message": "product id is required"}, status=400)
 
         products = await self._load_products()
-        for product in products:
-            if str(product.get("id")) != product_id:
-                continue
-            if tier_id:
-                tier = self._find_tier(product, tier_id)
-                if tier is None:
-                    return web.json_response({"ok": False, "message": "tier not found"}, status=404)
-                tier_inventory = [str(item) for item in tier.get("inventory", []) if str(item).strip()]
-                return web.json_response(
-                    {
-                        "ok": True,
-                        "productId": product_id,
-                        "tierId": tier_id,
-                        "stock": len(tier_inventory),
-                        "inventory": tier_inventory,
-                    }
-                )
-            inventory = [str(item) for item in product.get("inventory", []) if str(item).strip()]
-            return web.json_response(
-                {
-                    "ok": True,
-                    "productId": product_id,
-                    "stock": len(inventory),
-                    "inventory": inventory,
-                }
-            )
+        product = next((item for item in products if str(item.get("id")) == product_id), None)
+        if product is None:
+            return web.json_response({"ok": False, "message": "product not found"}, status=404)
+        if tier_id and self._find_tier(product, tier_id) is None:
+            return web.json_response({"ok": False, "message": "tier not found"}, status=404)
+
+        inventory = await self.storage.get_inventory(product_id, tier_id)
+        if inventory is None:
+            return web.json_response({"ok": False, "message": "product not found"}, status=404)
 
-        return web.json_response({"ok": False, "message": "product not found"}, status=404)
+        response: dict[str, Any] = {"ok": True, "productId": product_id}
+        if tier_id:
+            response["tierId"] = tier_id
+        response["stock"] = len(inventory)
+        response["inventory"] = inventory
+        return web.json_response(response)
 
     async def shop_add_inventory(self, request: web.Request):
         payload = await self._safe_json(request)
@@ -388,47 +669,167 @@ class WebsiteBridgeServer:
             return web.json_response({"ok": False, "message": "at least one inventory item is required"}, status=400)
 
         products = await self._load_products()
-        for idx, product in enumerate(products):
-            if str(product.get("id")) != product_id:
-                continue
+        product = next((item for item in products if str(item.get("id")) == product_id), None)
+        if product is None:
+            return web.json_response({"ok": False, "message": "product not found"}, status=404)
+        if tier_id and self._find_tier(product, tier_id) is None:
+            return web.json_response({"ok": False, "message": "tier not found"}, status=404)
 
-            if tier_id:
-                tier = self._find_tier(product, tier_id)
-                if tier is None:
-                    return web.json_response({"ok": False, "message": "tier not found"}, status=404)
-                tier_inventory = [str(item) for item in tier.get("inventory", []) if str(item).strip()]
-                tier_inventory.extend(items)
-                tier["inventory"] = tier_inventory
-                tier["stock"] = len(tier_inventory)
-                product["stock"] = self._compute_product_stock(product)
-                products[idx] = self._normalize_product(product)
-                await self._save_products(products)
+        stock = await self.storage.add_inventory(product_id, tier_id, items)
+        if stock is None:
+            return web.json_response({"ok": False, "message": "product not found"}, status=404)
+
+        return await self._inventory_change_response(product_id, tier_id, stock=stock)
+
+    async def shop_import_inventory(self, request: web.Request):
+        """Stream keys from a text (one per line) or CSV body into stock, committing every ``import_batch_size`` keys.
+
+        Progress is streamed back as one JSON object per line after each batch, then a final summary.
+        """
+        product_id = request.query.get("productId", "").strip()
+        tier_id = request.query.get("tierId", "").strip()
+        import_format = request.query.get("format", "").strip().lower() or ("csv" if request.content_type == "text/csv" else "lines")
+        if import_format not in {"lines", "csv"}:
+            return web.json_response({"ok": False, "message": "format must be lines or csv"}, status=400)
+        if import_format == "lines" and not product_id:
+            return web.json_response({"ok": False, "message": "productId is required"}, status=400)
+
+        products_by_id = {str(product.get("id")): product for product in await self._load_products()}
+        if product_id:
+            product = products_by_id.get(product_id)
+            if product is None:
+                return web.json_response({"ok": False, "message": "product not found"}, status=404)
+            if self._has_tiers(product) and not tier_id:
+                # Product-level keys are never drawn by a tiered checkout.
                 return web.json_response(
-                    {
-                        "ok": True,
-                        "product": self._public_product(products[idx]),
-                        "stock": len(tier_inventory),
-                        "tierId": tier_id,
-                        "products": [self._public_product(item) for item in products],
-                    }
+                    {"ok": False, "message": "This product uses tiers. Provide tierId and add real keys per tier."},
+                    status=400,
                 )
+            if tier_id and self._find_tier(product, tier_id) is None:
+                return web.json_response({"ok": False, "message": "tier not found"}, status=404)
 
-            existing = [str(item) for item in product.get("inventory", []) if str(item).strip()]
-            existing.extend(items)
-            product["inventory"] = existing
-            product["stock"] = len(existing)
-            products[idx] = self._normalize_product(product)
-            await self._save_products(products)
-            return web.json_response(
-                {
-                    "ok": True,
-                    "product": self._public_product(products[idx]),
-                    "stock": len(existing),
-                    "products": [self._public_product(item) for item in products],
-                }
-            )
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        # Headers are sent before the handler returns, so CORS cannot be added by the middleware afterwards.
+        self._apply_cors_headers(request, response)
+        await response.prepare(request)
+
+        totals = {"received": 0, "added": 0, "duplicates": 0, "skipped": 0, "batches": 0}
+        stock: dict[str, int] = {}
+        batch: dict[tuple[str, str], list[str]] = {}
+        batch_size = 0
+        holders_ok: dict[tuple[str, str], bool] = {}
+
+        async def write(payload: dict[str, Any]) -> None:
+            await response.write(json.dumps(payload).encode("utf-8") + b"\n")
+
+        async def flush() -> None:
+            nonlocal batch_size
+            for (holder_product, holder_tier), items in batch.items():
+                result = await self.storage.import_inventory(holder_product, holder_tier, items)
+                if result is None:
+                    totals["skipped"] += len(items)
+                    continue
+                added, holder_stock = result
+                totals["added"] += added
+                totals["duplicates"] += len(items) - added
+                stock[f"{holder_product}::{holder_tier}" if holder_tier else holder_product] = holder_stock
+            batch.clear()
+            batch_size = 0
+            totals["batches"] += 1
+            await write({"ok": True, **totals})
 
-        return web.json_response({"ok": False, "message": "product not found"}, status=404)
+        try:
+            async for holder_product, holder_tier, item in self._import_rows(request, import_format, product_id, tier_id):
+                totals["received"] += 1
+                holder = (holder_product, holder_tier)
+                valid = holders_ok.get(holder)
+                if valid is None:
+                    product = products_by_id.get(holder_product)
+                    if product is None:
+                        valid = False
+                    elif holder_tier:
+                        valid = self._find_tier(product, holder_tier) is not None
+                    else:
+                        valid = not self._has_tiers(product)
+                    holders_ok[holder] = valid
+                if not valid or not item:
+                    totals["skipped"] += 1
+                    continue
+                batch.setdefault(holder, []).append(item)
+                batch_size += 1
+                if batch_size >= self.import_batch_size:
+                    await flush()
+            if batch_size:
+                await flush()
+        except (UnicodeDecodeError, csv.Error, ValueError) as exc:
+            await write({"ok": False, "message": f"import stopped: {exc}", **totals})
+            return response
+        except Exception as exc:
+            # The status line is already sent, so the error can only be reported in the body.
+            logger.exception(f"Inventory import failed: {exc}")
+            await write({"ok": False, "message": "import failed", **totals})
+            return response
+
+        unknown = sorted(f"{product}::{tier}" if tier else product for (product, tier), valid in holders_ok.items() if not valid)
+        await write({"ok": True, "done": True, **totals, "stock": stock, "unknownHolders": unknown[:50]})
+        await response.write_eof()
+        return response
+
+    async def _import_rows(
+        self,
+        request: web.Request,
+        import_format: str,
+        product_id: str,
+        tier_id: str,
+    ) -> AsyncIterator[tuple[str, str, str]]:
+        # CSV rows may name their own product/tier; the query string only supplies defaults.
+        columns: Optional[dict[str, int]] = None
+        async for line in self._iter_body_lines(request):
+            if not line.strip():
+                continue
+            if import_format == "lines":
+                yield product_id, tier_id, line.strip()
+                continue
+            row = [cell.strip() for cell in next(csv.reader([line]))]
+            if columns is None:
+                names = [re.sub(r"[^a-z]", "", cell.lower()) for cell in row]
+                key_column = next((names.index(name) for name in ("key", "item", "code", "account") if name in names), None)
+                if key_column is not None:
+                    columns = {"key": key_column}
+                    for name in ("productid", "tierid"):
+                        if name in names:
+                            columns[name] = names.index(name)
+                    continue
+                # No header: the last column is the key, preceded by [tierId] or [productId, tierId].
+                columns = {"key": -1}
+                if len(row) >= 3:
+                    columns.update(productid=-3, tierid=-2)
+                elif len(row) == 2:
+                    columns["tierid"] = -2
+
+            def cell(name: str, default: str) -> str:
+                index = columns.get(name)
+                if index is None or -len(row) > index or index >= len(row):
+                    return default
+                return row[index] or default
+
+            yield cell("productid", product_id), cell("tierid", tier_id), cell("key", "")
+
+    @staticmethod
+    async def _iter_body_lines(request: web.Request, max_line_bytes: int = 64 * 1024) -> AsyncIterator[str]:
+        decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        pending = ""
+        async for chunk in request.content.iter_chunked(64 * 1024):
+            pending += decoder.decode(chunk)
+            lines = pending.split("\n")
+            pending = lines.pop()
+            if len(pending) > max_line_bytes:
+                raise ValueError("line too long")
+            for line in lines:
+                yield line.rstrip("\r")
+        pending += decoder.decode(b"", final=True)
+        if pending:
+            yield pending.rstrip("\r")
 
     async def shop_update_stock(self, request: web.Request):
         payload = await self._safe_json(request)
@@ -444,73 +845,40 @@ class WebsiteBridgeServer:
             return web.json_response({"ok": False, "message": "delta is required"}, status=400)
 
         products = await self._load_products()
-        for idx, product in enumerate(products):
-            if str(product.get("id")) != product_id:
-                continue
-            has_tiers = isinstance(product.get("tiers"), list) and len(product.get("tiers", [])) > 0
-
-            if has_tiers and not tier_id:
-                return web.json_response(
-                    {"ok": False, "message": "This product uses tiers. Provide tierId and add real keys per tier."},
-                    status=400,
-                )
-
-            if tier_id:
-                tier = self._find_tier(product, tier_id)
-                if tier is None:
-                    return web.json_response({"ok": False, "message": "tier not found"}, status=404)
-                inventory = [str(item) for item in tier.get("inventory", []) if str(item).strip()]
-                if delta > 0:
-                    return web.json_response(
-                        {"ok": False, "message": "Cannot increase stock numerically. Add real stock keys via /shop/inventory/add."},
-                        status=400,
-                    )
-                if delta < 0 and inventory:
-                    remove_count = min(abs(delta), len(inventory))
-                    inventory = inventory[: len(inventory) - remove_count]
-                    tier["inventory"] = inventory
-                    tier["stock"] = len(inventory)
-                else:
-                    tier["stock"] = max(0, (self._to_int(tier.get("stock"), default=0) or 0) + delta)
-                product["stock"] = self._compute_product_stock(product)
-                products[idx] = self._normalize_product(product)
-                await self._save_products(products)
-                return web.json_response(
-                    {
-                        "ok": True,
-                        "product": self._public_product(products[idx]),
-                        "tierId": tier_id,
-                        "products": [self._public_product(item) for item in products],
-                    }
-                )
-
-            current_stock = self._to_int(product.get("stock"), default=0) or 0
-            inventory = [str(item) for item in product.get("inventory", []) if str(item).strip()]
-            if delta > 0:
-                return web.json_response(
-                    {"ok": False, "message": "Cannot increase stock numerically. Add real stock keys via /shop/inventory/add."},
-                    status=400,
-                )
-
-            if delta < 0 and inventory:
-                remove_count = min(abs(delta), len(inventory))
-                inventory = inventory[: len(inventory) - remove_count]
-                product["inventory"] = inventory
-                product["stock"] = len(inventory)
-            else:
-                product["stock"] = max(0, current_stock + delta)
+        product = next((item for item in products if str(item.get("id")) == product_id), None)
+        if product is None:
+            return web.json_response({"ok": False, "message": "product not found"}, status=404)
 
-            products[idx] = self._normalize_product(product)
-            await self._save_products(products)
+        if self._has_tiers(product) and not tier_id:
             return web.json_response(
-                {
-                    "ok": True,
-                    "product": self._public_product(products[idx]),
-                    "products": [self._public_product(item) for item in products],
-                }
+                {"ok": False, "message": "This product uses tiers. Provide tierId and add real keys per tier."},
+                status=400,
+            )
+        if tier_id and self._find_tier(product, tier_id) is None:
+            return web.json_response({"ok": False, "message": "tier not found"}, status=404)
+        if delta > 0:
+            return web.json_response(
+                {"ok": False, "message": "Cannot increase stock numerically. Add real stock keys via /shop/inventory/add."},
+                status=400,
             )
 
-        return web.json_response({"ok": False, "message": "product not found"}, status=404)
+        if delta < 0:
+            await self.storage.remove_inventory(product_id, tier_id, abs(delta))
+        return await self._inventory_change_response(product_id, tier_id)
+
+    async def _inventory_change_response(self, product_id: str, tier_id: str, stock: Optional[int] = None) -> web.Response:
+        products = await self._load_products()
+        product = next((item for item in products if str(item.get("id")) == product_id), None)
+        if product is None:
+            return web.json_response({"ok": False, "message": "product not found"}, status=404)
+
+        payload: dict[str, Any] = {"ok": True, "product": self._public_product(product)}
+        if stock is not None:
+            payload["stock"] = stock
+        if tier_id:
+            payload["tierId"] = tier_id
+        payload["products"] = [self._public_product(item) for item in products]
+        return web.json_response(payload)
 
     async def shop_buy(self, request: web.Request):
         payload = await self._safe_json(request)
@@ -537,7 +905,7 @@ class WebsiteBridgeServer:
             return purchase
 
         order_record, public_products = purchase
-        await self._send_order_log(order_record, user_data, payment_method)
+        self._queue_order_log(order_record, user_data, payment_method)
         return web.json_response({"ok": True, "orderId": order_record["id"], "order": order_record, "products": public_products})
 
     async def shop_create_payment(self, request: web.Request):
@@ -571,93 +939,10 @@ class WebsiteBridgeServer:
                         status=400,
                     )
                 pending_token = secrets.token_urlsafe(24)
-                pending = await self._load_pending_payments()
-                pending[pending_token] = {
-                    "order": order_data,
-                    "user": user_data,
-                    "paymentMethod": payment_method,
-                    "gateway": "oxapay",
-                    "createdAt": datetime.now(timezone.utc).isoformat(),
-                    "completed": False,
-                }
-
-                success_base = success_url or self.allowed_origins[0]
-                success_glue = "&" if "?" in success_base else "?"
-                return_url = (
-                    f"{success_base}{success_glue}checkout=success&payment_method=crypto"
-                    f"&token={pending_token}"
-                )
-
-                order_id = str(order_data.get("id") or pending_token)
-                description = f"Order {order_id}"
-                customer_email = str(user_data.get("email") or "").strip()
-                oxapay_request_payload: dict[str, Any] = {
-                    "merchant": self.oxapay_merchant_api_key,
-                    "amount": round(total, 2),
-                    "currency": self.oxapay_currency,
-                    "lifeTime": max(5, self.oxapay_lifetime_minutes),
-                    "feePaidByPayer": 1,
-                    "returnUrl": return_url,
-                    "orderId": order_id,
-                    "description": description,
-                }
-                if customer_email:
-                    oxapay_request_payload["email"] = customer_email
-
-                async with ClientSession() as session:
-                    async with session.post(
-                        f"{self.oxapay_api_url}/merchants/request",
-                        json=oxapay_request_payload,
-                    ) as oxapay_response:
-                        try:
-                            oxapay_payload = await oxapay_response.json(content_type=None)
-                        except Exception:
-                            raw_payload = await oxapay_response.text()
-                            oxapay_payload = {"raw": raw_payload}
-                        if oxapay_response.status >= 300:
-                            logger.error(f"OxaPay invoice creation failed: {oxapay_payload}")
-                            return web.json_response({"ok": False, "message": "failed to create OxaPay invoice"}, status=502)
-
-                checkout_url = str(
-                    oxapay_payload.get("payment_url")
-                    or oxapay_payload.get("payLink")
-                    or oxapay_payload.get("pay_link")
-                    or ""
-                ).strip()
-                track_id = str(
-                    oxapay_payload.get("track_id")
-                    or oxapay_payload.get("trackId")
-                    or ""
-                ).strip()
-                if not checkout_url:
-                    oxa_message = str(oxapay_payload.get("message") or "").strip()
-                    oxa_result = str(oxapay_payload.get("result") or "").strip()
-                    logger.error(f"OxaPay invoice response missing checkout URL: {oxapay_payload}")
-                    if oxa_message:
-                        status = 400 if oxa_result in {"127", "400"} else 502
-                        return web.json_response({"ok": False, "message": f"OxaPay: {oxa_message}"}, status=status)
-                    return web.json_response({"ok": False, "message": "invalid OxaPay response"}, status=502)
-
-                pending_entry = pending.get(pending_token, {})
-                if isinstance(pending_entry, dict):
-                    if track_id:
-                        pending_entry["oxapayTrackId"] = track_id
-                    pending_entry["oxapayRequest"] = {
-                        "amount": round(total, 2),
-                        "currency": self.oxapay_currency,
-                        "orderId": order_id,
-                    }
-                    pending[pending_token] = pending_entry
-                    await self._save_pending_payments(pending)
-
-                return web.json_response(
-                    {
-                        "ok": True,
-                        "checkoutUrl": checkout_url,
-                        "token": pending_token,
-                        "trackId": track_id,
-                        "manual": False,
-                    }
+                return await self._checkout_with_hold(
+                    pending_token,
+                    order_data,
+                    functools.partial(self._create_oxapay_checkout, pending_token, order_data, user_data, success_url, total),
                 )
 
             external_url = ""
@@ -684,15 +969,160 @@ class WebsiteBridgeServer:
             return web.json_response({"ok": False, "message": "order items are required"}, status=400)
 
         pending_token = secrets.token_urlsafe(24)
-        pending = await self._load_pending_payments()
-        pending[pending_token] = {
+        return await self._checkout_with_hold(
+            pending_token,
+            order_data,
+            functools.partial(
+                self._create_stripe_checkout, pending_token, order_data, user_data, payment_method, success_url, cancel_url
+            ),
+        )
+
+    async def _checkout_with_hold(
+        self,
+        pending_token: str,
+        order_data: dict[str, Any],
+        create_checkout: Callable[[], Awaitable[web.Response]],
+    ) -> web.Response:
+        # Keys are held before the gateway is called, so a sold-out drop is refused up front instead of
+        # after the buyer has paid; the hold lives as long as the pending payment.
+        products_by_id = {str(product.get("id")): product for product in await self._load_products()}
+        allocations = self._order_allocations(order_data.get("items", []), products_by_id)
+        if isinstance(allocations, web.Response):
+            return allocations
+        try:
+            await self.storage.reserve_stock(pending_token, allocations)
+        except InsufficientStock as exc:
+            return self._insufficient_stock_response(products_by_id.get(exc.product_id, {}), exc.product_id, exc.tier_id)
+
+        try:
+            response = await create_checkout()
+        except BaseException:
+            await self.storage.release_stock(pending_token)
+            raise
+        if response.status >= 300:
+            await self.storage.release_stock(pending_token)
+        return response
+
+    async def _create_oxapay_checkout(
+        self,
+        pending_token: str,
+        order_data: dict[str, Any],
+        user_data: dict[str, Any],
+        success_url: str,
+        total: float,
+    ) -> web.Response:
+        pending_entry: dict[str, Any] = {
             "order": order_data,
             "user": user_data,
-            "paymentMethod": payment_method,
+            "paymentMethod": "crypto",
+            "gateway": "oxapay",
             "createdAt": datetime.now(timezone.utc).isoformat(),
+            "expiresAt": self._pending_expiry(max(5, self.oxapay_lifetime_minutes)),
             "completed": False,
         }
-        await self._save_pending_payments(pending)
+
+        success_base = success_url or self.allowed_origins[0]
+        success_glue = "&" if "?" in success_base else "?"
+        return_url = (
+            f"{success_base}{success_glue}checkout=success&payment_method=crypto"
+            f"&token={pending_token}"
+        )
+
+        order_id = str(order_data.get("id") or pending_token)
+        description = f"Order {order_id}"
+        customer_email = str(user_data.get("email") or "").strip()
+        oxapay_request_payload: dict[str, Any] = {
+            "merchant": self.oxapay_merchant_api_key,
+            "amount": round(total, 2),
+            "currency": self.oxapay_currency,
+            "lifeTime": max(5, self.oxapay_lifetime_minutes),
+            "feePaidByPayer": 1,
+            "returnUrl": return_url,
+            # Echoed back in the signed callback, which finds the pending payment by it.
+            "orderId": pending_token,
+            "description": description,
+        }
+        if customer_email:
+            oxapay_request_payload["email"] = customer_email
+        if self.webhook_base_url:
+            oxapay_request_payload["callbackUrl"] = (
+                f"{self.webhook_base_url}/shop/webhooks/oxapay?{urlencode({'token': pending_token})}"
+            )
+
+        with payment_gateway_duration_seconds.time(gateway="oxapay", operation="create_invoice"):
+            async with http_client.session().post(
+                f"{self.oxapay_api_url}/merchants/request",
+                json=oxapay_request_payload,
+            ) as oxapay_response:
+                try:
+                    oxapay_payload = await oxapay_response.json(content_type=None)
+                except Exception:
+                    raw_payload = await oxapay_response.text()
+                    oxapay_payload = {"raw": raw_payload}
+                if oxapay_response.status >= 300:
+                    logger.error(f"OxaPay invoice creation failed: {oxapay_payload}")
+                    return web.json_response({"ok": False, "message": "failed to create OxaPay invoice"}, status=502)
+
+        checkout_url = str(
+            oxapay_payload.get("payment_url")
+            or oxapay_payload.get("payLink")
+            or oxapay_payload.get("pay_link")
+            or ""
+        ).strip()
+        track_id = str(
+            oxapay_payload.get("track_id")
+            or oxapay_payload.get("trackId")
+            or ""
+        ).strip()
+        if not checkout_url:
+            oxa_message = str(oxapay_payload.get("message") or "").strip()
+            oxa_result = str(oxapay_payload.get("result") or "").strip()
+            logger.error(f"OxaPay invoice response missing checkout URL: {oxapay_payload}")
+            if oxa_message:
+                status = 400 if oxa_result in {"127", "400"} else 502
+                return web.json_response({"ok": False, "message": f"OxaPay: {oxa_message}"}, status=status)
+            return web.json_response({"ok": False, "message": "invalid OxaPay response"}, status=502)
+
+        if track_id:
+            pending_entry["oxapayTrackId"] = track_id
+        pending_entry["oxapayRequest"] = {
+            "amount": round(total, 2),
+            "currency": self.oxapay_currency,
+            "orderId": order_id,
+        }
+        await self.storage.save_pending_payment(pending_token, pending_entry)
+
+        return web.json_response(
+            {
+                "ok": True,
+                "checkoutUrl": checkout_url,
+                "token": pending_token,
+                "trackId": track_id,
+                "manual": False,
+            }
+        )
+
+    async def _create_stripe_checkout(
+        self,
+        pending_token: str,
+        order_data: dict[str, Any],
+        user_data: dict[str, Any],
+        payment_method: str,
+        success_url: str,
+        cancel_url: str,
+    ) -> web.Response:
+        items = order_data.get("items", [])
+        await self.storage.save_pending_payment(
+            pending_token,
+            {
+                "order": order_data,
+                "user": user_data,
+                "paymentMethod": payment_method,
+                "createdAt": datetime.now(timezone.utc).isoformat(),
+                "expiresAt": self._pending_expiry(self.stripe_session_lifetime_minutes),
+                "completed": False,
+            },
+        )
 
         success_base = success_url or self.allowed_origins[0]
         cancel_base = cancel_url or self.allowed_origins[0]
@@ -709,6 +1139,7 @@ class WebsiteBridgeServer:
             ("success_url", stripe_success_url),
             ("cancel_url", stripe_cancel_url),
             ("payment_method_types[]", "card"),
+            ("expires_at", str(int(time.time()) + self.stripe_session_lifetime_minutes * 60)),
             ("metadata[token]", pending_token),
             ("metadata[order_id]", str(order_data.get("id") or "")),
         ]
@@ -730,9 +1161,9 @@ class WebsiteBridgeServer:
                 ]
             )
 
-        async with ClientSession() as session:
-            async with session.post(
-                "https://api.stripe.com/v1/checkout/sessions",
+        with payment_gateway_duration_seconds.time(gateway="stripe", operation="create_session"):
+            async with http_client.session().post(
+                f"{self.stripe_api_url}/v1/checkout/sessions",
                 data=form_data,
                 headers={"Authorization": f"Bearer {self.stripe_secret_key}"},
             ) as stripe_response:
@@ -760,27 +1191,47 @@ class WebsiteBridgeServer:
         if not token:
             return web.json_response({"ok": False, "message": "token is required"}, status=400)
 
-        pending = await self._load_pending_payments()
-        pending_entry = pending.get(token)
+        # One confirmation per token at a time so a double-submitted confirm cannot deliver twice.
+        async with self._payment_locks.hold(token):
+            return await self._confirm_pending_payment(token, session_id, track_id, requested_method)
+
+    async def _confirm_pending_payment(
+        self,
+        token: str,
+        session_id: str,
+        track_id: str,
+        requested_method: str,
+    ) -> web.Response:
+        pending_entry = await self.storage.get_pending_payment(token)
         if not isinstance(pending_entry, dict):
-            return web.json_response({"ok": False, "message": "payment token not found"}, status=404)
+            completed = await self._completed_payment_response(token)
+            return completed or web.json_response({"ok": False, "message": "payment token not found"}, status=404)
         if pending_entry.get("completed"):
-            return web.json_response({"ok": False, "message": "payment already processed"}, status=409)
+            # A gateway webhook may have fulfilled the order before the browser came back to confirm it.
+            order = await self.storage.get_order(str(pending_entry.get("orderId") or ""))
+            if order is None:
+                return web.json_response({"ok": False, "message": "payment already processed"}, status=409)
+            products = [self._public_product(product) for product in await self._get_catalog()]
+            return web.json_response({"ok": True, "order": order, "products": products})
+        if pending_entry.get("fulfilment") == "queued":
+            # Already verified with the gateway; wait on (or restart) the queued fulfilment instead.
+            return await self._await_fulfilment(token)
         payment_method = requested_method or str(pending_entry.get("paymentMethod", "")).strip().lower() or "card"
 
         if payment_method == "crypto":
             if not self.oxapay_merchant_api_key:
                 return web.json_response({"ok": False, "message": "OxaPay is not configured"}, status=503)
 
+            # Only the invoice created for this payment may confirm it, never one the client names.
             pending_track_id = str(pending_entry.get("oxapayTrackId") or "").strip()
-            track_id = track_id or pending_track_id
-            if not track_id:
-                return web.json_response({"ok": False, "message": "trackId is required for crypto verification"}, status=400)
-            if pending_track_id and pending_track_id != track_id:
+            if not pending_track_id:
+                return web.json_response({"ok": False, "message": "no OxaPay invoice recorded for this payment"}, status=409)
+            if track_id and track_id != pending_track_id:
                 return web.json_response({"ok": False, "message": "trackId mismatch"}, status=409)
+            track_id = pending_track_id
 
-            async with ClientSession() as session:
-                async with session.post(
+            with payment_gateway_duration_seconds.time(gateway="oxapay", operation="inquiry"):
+                async with http_client.session().post(
                     f"{self.oxapay_api_url}/merchants/inquiry",
                     json={"merchant": self.oxapay_merchant_api_key, "trackId": track_id},
                 ) as inquiry_response:
@@ -803,36 +1254,20 @@ class WebsiteBridgeServer:
             if payment_status not in {"paid", "completed", "complete", "confirmed"}:
                 return web.json_response({"ok": False, "message": f"crypto payment is {payment_status or 'pending'}"}, status=402)
 
-            order_data = pending_entry.get("order", {})
-            user_data = pending_entry.get("user", {})
-            purchase = await self._process_purchase(
-                order_data if isinstance(order_data, dict) else {},
-                user_data if isinstance(user_data, dict) else {},
+            return await self._fulfil_verified_payment(
+                token,
                 payment_method,
+                {"oxapayTrackId": track_id, "oxapayStatus": payment_status, "oxapayInquiry": inquiry_payload},
             )
-            if isinstance(purchase, web.Response):
-                return purchase
-
-            order_record, public_products = purchase
-            pending_entry["completed"] = True
-            pending_entry["completedAt"] = datetime.now(timezone.utc).isoformat()
-            pending_entry["oxapayTrackId"] = track_id
-            pending_entry["oxapayStatus"] = payment_status
-            pending_entry["oxapayInquiry"] = inquiry_payload
-            pending[token] = pending_entry
-            await self._save_pending_payments(pending)
-
-            await self._send_order_log(order_record, user_data if isinstance(user_data, dict) else {}, payment_method)
-            return web.json_response({"ok": True, "order": order_record, "products": public_products})
 
         if not session_id:
             return web.json_response({"ok": False, "message": "sessionId is required for card verification"}, status=400)
         if not self.stripe_secret_key:
             return web.json_response({"ok": False, "message": "Stripe is not configured"}, status=503)
 
-        async with ClientSession() as session:
-            async with session.get(
-                f"https://api.stripe.com/v1/checkout/sessions/{session_id}",
+        with payment_gateway_duration_seconds.time(gateway="stripe", operation="retrieve_session"):
+            async with http_client.session().get(
+                f"{self.stripe_api_url}/v1/checkout/sessions/{session_id}",
                 headers={"Authorization": f"Bearer {self.stripe_secret_key}"},
             ) as stripe_response:
                 stripe_payload = await stripe_response.json()
@@ -851,52 +1286,379 @@ class WebsiteBridgeServer:
         if metadata_token and metadata_token != token:
             return web.json_response({"ok": False, "message": "payment token mismatch"}, status=409)
 
-        order_data = pending_entry.get("order", {})
-        user_data = pending_entry.get("user", {})
         payment_method = str(pending_entry.get("paymentMethod", "card"))
+        return await self._fulfil_verified_payment(token, payment_method, {"stripeSessionId": session_id})
+
+    async def _fulfil_verified_payment(self, token: str, payment_method: str, details: dict[str, Any]) -> web.Response:
+        await self._queue_verified_payment(token, payment_method, details)
+        return await self._await_fulfilment(token)
+
+    async def _queue_verified_payment(self, token: str, payment_method: str, details: dict[str, Any]) -> asyncio.Future:
+        def mark_verified(entry: dict[str, Any]) -> dict[str, Any]:
+            entry.update(details)
+            entry.pop("fulfilmentError", None)
+            entry["fulfilment"] = "queued"
+            entry["fulfilmentMethod"] = payment_method
+            return entry
+
+        # Persist the verified payment before queueing it, so a restart can pick the job up again.
+        await self.storage.update_pending_payment(token, mark_verified)
+        return self._submit_payment_fulfilment(token)
+
+    def _submit_payment_fulfilment(self, token: str) -> asyncio.Future:
+        return self.fulfilment.submit(
+            f"payment:{token}",
+            functools.partial(self._run_payment_fulfilment, token),
+            kind="payment",
+        )
+
+    async def _await_fulfilment(self, token: str) -> web.Response:
+        future = self._submit_payment_fulfilment(token)
+        try:
+            status, body = await asyncio.wait_for(asyncio.shield(future), self.fulfilment_wait_seconds)
+        except asyncio.TimeoutError:
+            return web.json_response({"ok": True, "status": "processing", "token": token}, status=202)
+        return web.json_response(body, status=status)
+
+    async def _run_payment_fulfilment(self, token: str) -> tuple[int, dict[str, Any]]:
+        entry = await self.storage.get_pending_payment(token)
+        if not isinstance(entry, dict):
+            return 404, {"ok": False, "message": "payment token not found"}
+        order_data = entry.get("order", {})
+        user_data = entry.get("user", {})
+        user_data = user_data if isinstance(user_data, dict) else {}
+        payment_method = str(entry.get("fulfilmentMethod") or entry.get("paymentMethod") or "card")
 
         purchase = await self._process_purchase(
-            order_data if isinstance(order_data, dict) else {},
-            user_data if isinstance(user_data, dict) else {},
-            payment_method,
+            order_data if isinstance(order_data, dict) else {}, user_data, payment_method, hold_id=token
         )
         if isinstance(purchase, web.Response):
-            return purchase
+            body = json.loads(purchase.text)
+
+            def mark_failed(current: dict[str, Any]) -> dict[str, Any]:
+                current["fulfilment"] = "failed"
+                current["fulfilmentError"] = {"status": purchase.status, "message": body.get("message", "")}
+                return current
+
+            await self.storage.update_pending_payment(token, mark_failed)
+            return purchase.status, body
 
         order_record, public_products = purchase
-        pending_entry["completed"] = True
-        pending_entry["completedAt"] = datetime.now(timezone.utc).isoformat()
-        pending_entry["stripeSessionId"] = session_id
-        pending[token] = pending_entry
-        await self._save_pending_payments(pending)
+        await self._mark_payment_completed(token, {"fulfilment": "completed", "orderId": order_record["id"]})
+        self._queue_order_log(order_record, user_data, payment_method)
+        return 200, {"ok": True, "order": order_record, "products": public_products}
+
+    def _queue_order_log(self, order_record: dict[str, Any], user_data: dict[str, Any], payment_method: str) -> None:
+        if self.storage.order_events:
+            # commit_purchase already queued the log in the store; wake the local sender if there is one.
+            self.storage.order_events_ready.set()
+            return
+        # Discord can be slow; the buyer's response never waits on the order log channel.
+        self.fulfilment.submit(
+            f"order-log:{order_record['id']}",
+            functools.partial(self._send_order_log, order_record, user_data, payment_method),
+            kind="order_log",
+        )
+
+    async def _consume_order_events(self) -> None:
+        # Channels are only resolvable once the gateway has delivered the guilds.
+        wait_until_ready = getattr(self.bot, "wait_until_ready", None)
+        if wait_until_ready is not None:
+            await wait_until_ready()
+        ready = self.storage.order_events_ready
+        lease = timedelta(minutes=5)
+        while True:
+            ready.clear()
+            try:
+                while True:
+                    events = await self.storage.claim_order_events(20, lease)
+                    sent: list[int] = []
+                    for event_id, order in events:
+                        if not order:
+                            sent.append(event_id)
+                            continue
+                        user_data = order.get("user") if isinstance(order.get("user"), dict) else {}
+                        # An unsent log is left claimed; it is handed out again once the lease runs out.
+                        try:
+                            delivered = await self._send_order_log(order, user_data, str(order.get("paymentMethod") or ""))
+                        except Exception as exc:
+                            logger.error(f"Order log for {order.get('id')} failed: {exc}")
+                            continue
+                        if delivered:
+                            sent.append(event_id)
+                    await self.storage.ack_order_events(sent)
+                    if len(events) < 20:
+                        break
+            except Exception as exc:
+                logger.error(f"Order event delivery failed: {exc}")
+            try:
+                await asyncio.wait_for(ready.wait(), self.order_event_poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _resume_fulfilment(self) -> None:
+        pending = await self.storage.load_pending_payments()
+        resumed = 0
+        for token, entry in pending.items():
+            if entry.get("fulfilment") == "queued" and not entry.get("completed"):
+                self._submit_payment_fulfilment(token)
+                resumed += 1
+        if resumed:
+            logger.info(f"Resumed {resumed} queued payment fulfilment(s).")
+
+    async def shop_get_payment_status(self, request: web.Request):
+        token = request.match_info.get("token", "").strip()
+        entry = await self.storage.get_pending_payment(token)
+        if not isinstance(entry, dict):
+            completed = await self._completed_payment_response(token) if token else None
+            return completed or web.json_response({"ok": False, "message": "payment token not found"}, status=404)
+
+        if entry.get("completed"):
+            order = await self.storage.get_order(str(entry.get("orderId") or ""))
+            products = [self._public_product(product) for product in await self._get_catalog()]
+            return web.json_response({"ok": True, "status": "completed", "order": order, "products": products})
+        if entry.get("fulfilment") == "failed":
+            error = entry.get("fulfilmentError") if isinstance(entry.get("fulfilmentError"), dict) else {}
+            return web.json_response(
+                {"ok": False, "status": "failed", "message": error.get("message") or "order fulfilment failed"},
+                status=self._to_int(error.get("status"), default=409) or 409,
+            )
+        if entry.get("fulfilment") == "queued":
+            return web.json_response({"ok": True, "status": "processing"})
+        return web.json_response({"ok": True, "status": "pending"})
+
+    async def shop_cancel_payment(self, request: web.Request):
+        payload = await self._safe_json(request)
+        if payload is None:
+            return web.json_response({"ok": False, "message": "invalid json body"}, status=400)
+        token = str(payload.get("token", "")).strip()
+        if not token:
+            return web.json_response({"ok": False, "message": "token is required"}, status=400)
+
+        async with self._payment_locks.hold(token):
+            fulfilling = False
+
+            def mark_cancelled(current: dict[str, Any]) -> Optional[dict[str, Any]]:
+                nonlocal fulfilling
+                # Checked inside the update so a confirmation in another API worker cannot slip in between.
+                if current.get("completed") or current.get("fulfilment") == "queued":
+                    fulfilling = True
+                    return None
+                current["cancelled"] = True
+                current["expiresAt"] = datetime.now(timezone.utc).isoformat()
+                return current
+
+            entry = await self.storage.update_pending_payment(token, mark_cancelled)
+            if entry is None:
+                return web.json_response({"ok": False, "message": "payment token not found"}, status=404)
+            if fulfilling:
+                return web.json_response({"ok": False, "message": "payment is already being fulfilled"}, status=409)
+            released = await self.storage.release_stock(token)
+            await self.storage.archive_pending_payment(token)
+        return web.json_response({"ok": True, "released": released})
+
+    async def shop_stripe_webhook(self, request: web.Request):
+        if not self.stripe_webhook_secret:
+            return web.json_response({"ok": False, "message": "Stripe webhooks are not configured"}, status=503)
+        body = await request.read()
+        if not self._valid_stripe_signature(body, request.headers.get("Stripe-Signature", "")):
+            return web.json_response({"ok": False, "message": "invalid signature"}, status=400)
+        try:
+            event = json.loads(body)
+        except ValueError:
+            return web.json_response({"ok": False, "message": "invalid json body"}, status=400)
+
+        # Anything signed but shaped unlike a checkout session event is acknowledged, so Stripe stops retrying it.
+        if not isinstance(event, dict):
+            return web.json_response({"ok": True, "ignored": "unexpected payload"})
+        event_type = str(event.get("type") or "")
+        data = event.get("data")
+        session = data.get("object") if isinstance(data, dict) else None
+        if event_type not in {"checkout.session.completed", "checkout.session.async_payment_succeeded"}:
+            return web.json_response({"ok": True, "ignored": event_type})
+        if not isinstance(session, dict):
+            return web.json_response({"ok": True, "ignored": "unexpected payload"})
+        # Delayed payment methods complete the session before the money arrives; they send async_payment_succeeded later.
+        if str(session.get("payment_status") or "").lower() != "paid":
+            return web.json_response({"ok": True, "ignored": "unpaid"})
+
+        metadata = session.get("metadata") if isinstance(session.get("metadata"), dict) else {}
+        token = str(metadata.get("token") or "").strip()
+        session_id = str(session.get("id") or "").strip()
+        if not token:
+            return web.json_response({"ok": True, "ignored": "no token"})
+
+        await self._accept_webhook_payment(token, "stripe", {"stripeSessionId": session_id})
+        return web.json_response({"ok": True})
+
+    def _valid_stripe_signature(self, body: bytes, header: str) -> bool:
+        timestamp = ""
+        signatures: list[str] = []
+        for part in header.split(","):
+            key, _, value = part.strip().partition("=")
+            if key == "t":
+                timestamp = value
+            elif key == "v1":
+                signatures.append(value)
+        if not timestamp.isdigit() or not signatures:
+            return False
+        if abs(time.time() - int(timestamp)) > self.stripe_webhook_tolerance_seconds:
+            return False
+        expected = hmac.new(
+            self.stripe_webhook_secret.encode("utf-8"),
+            timestamp.encode("utf-8") + b"." + body,
+            hashlib.sha256,
+        ).hexdigest()
+        return any(hmac.compare_digest(expected, signature) for signature in signatures)
+
+    async def shop_oxapay_webhook(self, request: web.Request):
+        if not self.oxapay_merchant_api_key:
+            return web.json_response({"ok": False, "message": "OxaPay is not configured"}, status=503)
+        body = await request.read()
+        # OxaPay signs the raw callback body with HMAC-SHA512 keyed by the merchant API key.
+        expected = hmac.new(self.oxapay_merchant_api_key.encode("utf-8"), body, hashlib.sha512).hexdigest()
+        if not hmac.compare_digest(expected, request.headers.get("HMAC", "").strip().lower()):
+            return web.json_response({"ok": False, "message": "invalid signature"}, status=400)
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return web.json_response({"ok": False, "message": "invalid json body"}, status=400)
+        if not isinstance(payload, dict):
+            return web.Response(text="ok")
+
+        payment_status = str(payload.get("status") or "").strip().lower()
+        track_id = str(payload.get("trackId") or payload.get("track_id") or "").strip()
+        if payment_status not in {"paid", "completed", "complete", "confirmed"}:
+            # OxaPay retries until it gets a 200, so intermediate statuses are acknowledged too.
+            return web.Response(text="ok")
+
+        # The payment is looked up from the signed body; ?token= only covers invoices created before orderId
+        # carried the token. Either way the signed trackId must be the one stored with the payment, so a
+        # callback for one invoice cannot be replayed against another.
+        token = str(payload.get("orderId") or payload.get("order_id") or "").strip()
+        pending_entry = await self.storage.get_pending_payment(token) if token else None
+        if not isinstance(pending_entry, dict):
+            token = request.query.get("token", "").strip()
+            pending_entry = await self.storage.get_pending_payment(token) if token else None
+        if not isinstance(pending_entry, dict):
+            logger.warning(f"OxaPay callback for unknown invoice {track_id or '?'}")
+            return web.Response(text="ok")
+        pending_track_id = str(pending_entry.get("oxapayTrackId") or "").strip()
+        if not track_id or pending_track_id != track_id:
+            logger.warning(f"OxaPay callback for {token} has trackId {track_id}, expected {pending_track_id or 'none'}")
+            return web.json_response({"ok": False, "message": "trackId mismatch"}, status=409)
+
+        await self._accept_webhook_payment(
+            token,
+            "oxapay",
+            {"oxapayTrackId": track_id, "oxapayStatus": payment_status, "oxapayCallback": payload},
+        )
+        return web.Response(text="ok")
+
+    async def _accept_webhook_payment(self, token: str, gateway: str, details: dict[str, Any]) -> None:
+        async with self._payment_locks.hold(token):
+            pending_entry = await self.storage.get_pending_payment(token)
+            if not isinstance(pending_entry, dict):
+                logger.warning(f"{gateway} webhook for unknown payment token {token}")
+                return
+            if pending_entry.get("completed") or pending_entry.get("fulfilment") == "queued":
+                return
+            default_method = "crypto" if gateway == "oxapay" else "card"
+            payment_method = str(pending_entry.get("paymentMethod") or default_method).strip().lower()
+            await self._queue_verified_payment(token, payment_method, details)
+        logger.info(f"Queued fulfilment for {token} from {gateway} webhook")
+
+    async def _mark_payment_completed(self, token: str, details: dict[str, Any]) -> None:
+        completed_at = datetime.now(timezone.utc).isoformat()
+
+        def mark(entry: dict[str, Any]) -> dict[str, Any]:
+            entry.update(details)
+            entry["completed"] = True
+            entry["completedAt"] = completed_at
+            return entry
+
+        await self.storage.update_pending_payment(token, mark)
+        # Repeated confirmations and status polls find the order by its token-derived id from now on.
+        await self.storage.archive_pending_payment(token)
+
+    @staticmethod
+    def _payment_order_id(token: str) -> str:
+        return f"ord-{token[:16]}"
 
-        await self._send_order_log(order_record, user_data if isinstance(user_data, dict) else {}, payment_method)
-        return web.json_response({"ok": True, "order": order_record, "products": public_products})
+    async def _completed_payment_response(self, token: str) -> Optional[web.Response]:
+        """The order of a payment whose pending entry has been archived, or None if it never completed."""
+        order = await self.storage.get_order(self._payment_order_id(token))
+        if order is None:
+            return None
+        products = [self._public_product(product) for product in await self._get_catalog()]
+        return web.json_response({"ok": True, "status": "completed", "order": order, "products": products})
 
     async def _process_purchase(
         self,
         order_data: dict[str, Any],
         user_data: dict[str, Any],
         payment_method: str,
+        hold_id: Optional[str] = None,
     ) -> tuple[dict[str, Any], list[dict[str, Any]]] | web.Response:
         items = order_data.get("items", [])
-        if not isinstance(items, list) or not items:
-            return web.json_response({"ok": False, "message": "order items are required"}, status=400)
-
-        products = await self._load_products()
-        order_id = str(order_data.get("id") or "").strip()
+        if hold_id:
+            # A paid checkout always maps to the same order, whichever of the webhook, /payments/confirm, a
+            # resumed job or another API worker fulfils it; commit_purchase returns the order if it exists.
+            order_id = self._payment_order_id(hold_id)
+        else:
+            order_id = str(order_data.get("id") or "").strip()
         if order_id:
-            for existing_order in await self._load_orders():
-                if str(existing_order.get("id") or "").strip() == order_id:
-                    # Idempotent confirmation: if already processed, do not consume stock twice.
-                    return existing_order, [self._public_product(product) for product in products]
+            existing_order = await self.storage.get_order(order_id)
+            if existing_order is not None:
+                # Idempotent confirmation: if already processed, do not consume stock twice.
+                return existing_order, [self._public_product(product) for product in await self._load_products()]
 
+        products = await self._load_products()
         products_by_id = {str(product.get("id")): dict(product) for product in products}
-        credentials: dict[str, str] = {}
+        allocations = self._order_allocations(items, products_by_id)
+        if isinstance(allocations, web.Response):
+            return allocations
+
+        # Without a hold, fail fast on the catalog snapshot; held keys no longer count as stock,
+        # so checkouts that reserved them rely on commit_purchase alone.
+        if hold_id is None:
+            for _, item_id, tier_id, quantity in allocations:
+                holder = self._find_tier(products_by_id[item_id], tier_id) if tier_id else products_by_id[item_id]
+                if (self._to_int((holder or {}).get("stock"), default=0) or 0) < quantity:
+                    return self._insufficient_stock_response(products_by_id[item_id], item_id, tier_id)
+
+        order_record = {
+            "id": order_id or f"ord-{secrets.token_hex(8)}",
+            "userId": str(user_data.get("id") or order_data.get("userId") or "guest"),
+            "createdAt": datetime.now(timezone.utc).isoformat(),
+            "paymentMethod": payment_method,
+            "user": user_data if isinstance(user_data, dict) else {},
+            "items": items,
+            "total": self._to_float(order_data.get("total"), default=0.0) or 0.0,
+            "status": "completed",
+            "credentials": {},
+        }
+        try:
+            committed = await self.storage.commit_purchase(order_record, allocations, hold_id=hold_id)
+        except InsufficientStock as exc:
+            # The catalog snapshot said there was enough, but a concurrent order took the keys first.
+            return self._insufficient_stock_response(products_by_id.get(exc.product_id, {}), exc.product_id, exc.tier_id)
 
+        return committed, [self._public_product(product) for product in await self._load_products()]
+
+    def _order_allocations(
+        self,
+        items: Any,
+        products_by_id: dict[str, dict[str, Any]],
+    ) -> list[Allocation] | web.Response:
+        if not isinstance(items, list) or not items:
+            return web.json_response({"ok": False, "message": "order items are required"}, status=400)
+
+        allocations: list[Allocation] = []
         for item in items:
             if not isinstance(item, dict):
                 return web.json_response({"ok": False, "message": "invalid order item"}, status=400)
+            line_id = str(item.get("id") or "").strip()
             item_id = str(item.get("productId") or item.get("id") or "").strip()
             if not str(item.get("productId") or "").strip() and "::" in item_id:
                 item_id = item_id.split("::", 1)[0].strip()
@@ -907,79 +1669,33 @@ class WebsiteBridgeServer:
             product = products_by_id.get(item_id)
             if product is None:
                 return web.json_response({"ok": False, "message": f"product {item_id} not found"}, status=404)
-            if tier_id:
-                tier = self._find_tier(product, tier_id)
-                if tier is None:
-                    return web.json_response({"ok": False, "message": f"tier {tier_id} not found for {item_id}"}, status=404)
-                inventory = [str(entry).strip() for entry in tier.get("inventory", []) if str(entry).strip()]
-                if len(inventory) < quantity:
-                    return web.json_response(
-                        {
-                            "ok": False,
-                            "message": f"not enough deliverable stock for {product.get('name', item_id)} - {tier.get('name', tier_id)}.",
-                            "productId": item_id,
-                            "tierId": tier_id,
-                        },
-                        status=409,
-                    )
-            else:
-                inventory = [str(entry).strip() for entry in product.get("inventory", []) if str(entry).strip()]
-                if len(inventory) < quantity:
-                    return web.json_response(
-                        {
-                            "ok": False,
-                            "message": f"not enough deliverable stock for {product.get('name', item_id)}. Add stock keys in admin.",
-                            "productId": item_id,
-                        },
-                        status=409,
-                    )
-
-        for item in items:
-            line_id = str(item.get("id") or "").strip()
-            item_id = str(item.get("productId") or item.get("id") or "").strip()
-            if not str(item.get("productId") or "").strip() and "::" in item_id:
-                item_id = item_id.split("::", 1)[0].strip()
-            tier_id = str(item.get("tierId") or "").strip()
-            quantity = self._to_int(item.get("quantity"), default=0) or 0
-            product = products_by_id[item_id]
-            if tier_id:
-                tier = self._find_tier(product, tier_id)
-                if tier is None:
-                    return web.json_response({"ok": False, "message": f"tier {tier_id} not found for {item_id}"}, status=404)
-                inventory = [str(entry).strip() for entry in tier.get("inventory", []) if str(entry).strip()]
-                delivered = inventory[:quantity]
-                remaining = inventory[quantity:]
-                tier["inventory"] = remaining
-                tier["stock"] = len(remaining)
-                product["stock"] = self._compute_product_stock(product)
-            else:
-                inventory = [str(entry).strip() for entry in product.get("inventory", []) if str(entry).strip()]
-                delivered = inventory[:quantity]
-                remaining = inventory[quantity:]
-                product["inventory"] = remaining
-                product["stock"] = len(remaining)
+            if tier_id and self._find_tier(product, tier_id) is None:
+                return web.json_response({"ok": False, "message": f"tier {tier_id} not found for {item_id}"}, status=404)
             credential_key = line_id or (f"{item_id}::{tier_id}" if tier_id else item_id)
-            credentials[credential_key] = "\n".join(delivered)
+            allocations.append((credential_key, item_id, tier_id, quantity))
+        return allocations
 
-        normalized_products = [self._normalize_product(product) for product in products_by_id.values()]
-        await self._save_products(normalized_products)
-
-        order_record = {
-            "id": str(order_data.get("id") or f"ord-{int(datetime.now(timezone.utc).timestamp())}"),
-            "userId": str(user_data.get("id") or order_data.get("userId") or "guest"),
-            "createdAt": datetime.now(timezone.utc).isoformat(),
-            "paymentMethod": payment_method,
-            "user": user_data if isinstance(user_data, dict) else {},
-            "items": items,
-            "total": self._to_float(order_data.get("total"), default=0.0) or 0.0,
-            "status": "completed",
-            "credentials": credentials,
-        }
-        orders = await self._load_orders()
-        orders.append(order_record)
-        await self._save_orders(orders)
-
-        return order_record, [self._public_product(product) for product in normalized_products]
+    def _insufficient_stock_response(self, product: dict[str, Any], product_id: str, tier_id: str) -> web.Response:
+        product_name = product.get("name") or product_id
+        if tier_id:
+            tier = self._find_tier(product, tier_id) or {}
+            return web.json_response(
+                {
+                    "ok": False,
+                    "message": f"not enough deliverable stock for {product_name} - {tier.get('name') or tier_id}.",
+                    "productId": product_id,
+                    "tierId": tier_id,
+                },
+                status=409,
+            )
+        return web.json_response(
+            {
+                "ok": False,
+                "message": f"not enough deliverable stock for {product_name}. Add stock keys in admin.",
+                "productId": product_id,
+            },
+            status=409,
+        )
 
     async def chat(self, request: web.Request):
         payload = await self._safe_json(request)
@@ -993,7 +1709,11 @@ class WebsiteBridgeServer:
         if not isinstance(products, list):
             products = []
 
-        reply = self._build_reply(message, products)
+        # The server catalog is authoritative; the products the page sent are only used without one.
+        index = await self._get_search_index()
+        if not index.products:
+            index = ProductSearchIndex(products)
+        reply = self._build_reply(message, index)
         dispatched = await self._send_chat_log(message, reply)
 
         return web.json_response({"ok": True, "reply": reply, "dispatched": dispatched})
@@ -1014,6 +1734,60 @@ class WebsiteBridgeServer:
         dispatched = await self._send_order_log(order_data, user_data, payment_method)
         return web.json_response({"ok": True, "dispatched": dispatched})
 
+    @staticmethod
+    def _render_json(payload: Any) -> _RenderedJson:
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return _RenderedJson(
+            etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+            identity=body,
+            gzip=gzip.compress(body, compresslevel=6),
+            br=brotli.compress(body) if brotli is not None else None,
+        )
+
+    def _rendered_response(self, request: web.Request, rendered: _RenderedJson, cache_control: str) -> web.Response:
+        headers = {"ETag": rendered.etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if self._etag_matches(request.headers.get("If-None-Match", ""), rendered.etag):
+            return web.Response(status=304, headers=headers)
+
+        encodings = self._accepted_encodings(request.headers.get("Accept-Encoding", ""))
+        body = rendered.identity
+        if rendered.br is not None and "br" in encodings:
+            body = rendered.br
+            headers["Content-Encoding"] = "br"
+        elif "gzip" in encodings:
+            body = rendered.gzip
+            headers["Content-Encoding"] = "gzip"
+        return web.Response(body=body, headers=headers, content_type="application/json", charset="utf-8")
+
+    @staticmethod
+    def _etag_matches(if_none_match: str, etag: str) -> bool:
+        for candidate in if_none_match.split(","):
+            candidate = candidate.strip()
+            if candidate == "*":
+                return True
+            if candidate.startswith("W/"):
+                candidate = candidate[2:]
+            if candidate == etag:
+                return True
+        return False
+
+    @staticmethod
+    def _accepted_encodings(accept_encoding: str) -> set[str]:
+        accepted: set[str] = set()
+        for part in accept_encoding.split(","):
+            name, _, params = part.partition(";")
+            name = name.strip().lower()
+            quality = 1.0
+            params = params.strip().lower()
+            if params.startswith("q="):
+                try:
+                    quality = float(params[2:])
+                except ValueError:
+                    quality = 1.0
+            if name and quality > 0:
+                accepted.add(name)
+        return accepted
+
     async def _safe_json(self, request: web.Request) -> Optional[dict[str, Any]]:
         try:
             body = await request.json()
@@ -1088,38 +1862,15 @@ class WebsiteBridgeServer:
 
         return None
 
-    def _build_reply(self, message: str, products: list[Any]) -> str:
-        in_stock: list[dict[str, Any]] = []
-        for product in products:
-            if not isinstance(product, dict):
-                continue
-            stock = self._to_int(product.get("stock"), default=0)
-            if stock > 0:
-                in_stock.append(product)
-
+    def _build_reply(self, message: str, index: ProductSearchIndex) -> str:
+        in_stock = [product for product in index.products if (self._to_int(product.get("stock"), default=0) or 0) > 0]
         if not in_stock:
             return "Everything is out of stock right now. Ask support for a restock ETA."
 
-        words = [word for word in re.findall(r"[a-z0-9]+", message.lower()) if len(word) > 2]
-        if not words:
-            candidate = min(in_stock, key=lambda item: self._to_float(item.get("price"), default=999999))
-            return self._format_recommendation(candidate)
-
-        def score(product: dict[str, Any]) -> tuple[int, float]:
-            text = " ".join(
-                [
-                    str(product.get("name", "")).lower(),
-                    str(product.get("description", "")).lower(),
-                    " ".join(str(feature).lower() for feature in product.get("features", []) if isinstance(feature, str)),
-                ]
-            )
-            points = 0
-            for word in words:
-                if word in text:
-                    points += 2 if word in str(product.get("name", "")).lower() else 1
-            return points, -self._to_float(product.get("price"), default=999999)
-
-        candidate = max(in_stock, key=score)
+        matches = index.search(message, limit=1, in_stock_only=True)
+        if matches:
+            return self._format_recommendation(matches[0])
+        candidate = min(in_stock, key=lambda item: self._to_float(item.get("price"), default=999999))
         return self._format_recommendation(candidate)
 
     def _format_recommendation(self, product: dict[str, Any]) -> str:
@@ -1144,11 +1895,6 @@ class WebsiteBridgeServer:
         value = os.getenv(key)
         return self._to_int(value, default=None)
 
-    def _ensure_json_file(self, path: Path, default: Any) -> None:
-        if path.exists():
-            return
-        path.write_text(json.dumps(default, indent=2), encoding="utf-8")
-
     async def _init_supabase_storage(self) -> None:
         if not self.db_url:
             raise RuntimeError("DATABASE_URL or SUPABASE_DATABASE_URL is required for supabase storage")
@@ -1157,116 +1903,62 @@ class WebsiteBridgeServer:
         self.pg_pool = await asyncpg.create_pool(dsn=normalized_db_url, min_size=1, max_size=5, command_timeout=30)
 
         assert self.pg_pool is not None
-        async with self.pg_pool.acquire() as conn:
-            await conn.execute(
-                f"""
-                CREATE TABLE IF NOT EXISTS {self.shop_kv_table} (
-                    key TEXT PRIMARY KEY,
-                    value_json TEXT NOT NULL,
-                    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-                )
-                """
-            )
-
-        await self._seed_kv_from_json("products", self.products_file, [])
-        await self._seed_kv_from_json("orders", self.orders_file, [])
-        await self._seed_kv_from_json("pending_payments", self.pending_payments_file, {})
-
-    async def _seed_kv_from_json(self, key: str, path: Path, default: Any) -> None:
-        if self.pg_pool is None:
-            return
-
-        existing = await self._db_get_json(key, default=None)
-        if existing is not None:
-            return
-
-        value = self._read_json(path, default=default)
-        await self._db_set_json(key, value)
-
-    async def _db_get_json(self, key: str, default: Any) -> Any:
-        if self.pg_pool is None:
-            return default
-
-        row = await self.pg_pool.fetchrow(f"SELECT value_json FROM {self.shop_kv_table} WHERE key = $1", key)
-        if row is None:
-            return default
-        try:
-            return json.loads(str(row.get("value_json") or ""))
-        except Exception:
-            return default
-
-    async def _db_set_json(self, key: str, value: Any) -> None:
-        if self.pg_pool is None:
-            return
-        payload = json.dumps(value, ensure_ascii=False)
-        await self.pg_pool.execute(
-            f"""
-            INSERT INTO {self.shop_kv_table} (key, value_json, updated_at)
-            VALUES ($1, $2, NOW())
-            ON CONFLICT (key)
-            DO UPDATE SET value_json = EXCLUDED.value_json, updated_at = NOW()
-            """,
-            key,
-            payload,
+        storage = PostgresShopStorage(
+            self.pg_pool,
+            self._normalize_product,
+            kv_table=self.shop_kv_table,
+            table_prefix=self.shop_table_prefix,
+            legacy_data_dir=self.data_dir,
+            listen_dsn=normalized_db_url,
         )
+        await storage.init()
+        self.storage = storage
+        self._catalog = None
 
     async def _load_products(self) -> list[dict[str, Any]]:
-        if self.use_supabase_storage and self.pg_pool is not None:
-            data = await self._db_get_json("products", default=[])
-        else:
-            data = self._read_json(self.products_file, default=[])
-        if not isinstance(data, list):
-            return []
-        normalized: list[dict[str, Any]] = []
-        for item in data:
-            if isinstance(item, dict):
-                normalized.append(self._normalize_product(item))
-        return normalized
-
-    async def _save_products(self, products: list[dict[str, Any]]) -> None:
-        if self.use_supabase_storage and self.pg_pool is not None:
-            await self._db_set_json("products", products)
-            return
-        self._write_json(self.products_file, products)
-
-    async def _load_orders(self) -> list[dict[str, Any]]:
-        if self.use_supabase_storage and self.pg_pool is not None:
-            data = await self._db_get_json("orders", default=[])
-        else:
-            data = self._read_json(self.orders_file, default=[])
-        if not isinstance(data, list):
-            return []
-        return [item for item in data if isinstance(item, dict)]
-
-    async def _save_orders(self, orders: list[dict[str, Any]]) -> None:
-        if self.use_supabase_storage and self.pg_pool is not None:
-            await self._db_set_json("orders", orders)
-            return
-        self._write_json(self.orders_file, orders)
-
-    async def _load_pending_payments(self) -> dict[str, Any]:
-        if self.use_supabase_storage and self.pg_pool is not None:
-            data = await self._db_get_json("pending_payments", default={})
-        else:
-            data = self._read_json(self.pending_payments_file, default={})
-        if not isinstance(data, dict):
-            return {}
-        return data
-
-    async def _save_pending_payments(self, payload: dict[str, Any]) -> None:
-        if self.use_supabase_storage and self.pg_pool is not None:
-            await self._db_set_json("pending_payments", payload)
-            return
-        self._write_json(self.pending_payments_file, payload)
-
-    def _read_json(self, path: Path, default: Any) -> Any:
-        try:
-            return json.loads(path.read_text(encoding="utf-8"))
-        except Exception:
-            return default
-
-    def _write_json(self, path: Path, payload: Any) -> None:
-        path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        # Shallow copy: callers may reorder or append, but must not mutate the cached product dicts.
+        return list(await self._get_catalog())
+
+    async def _get_catalog(self) -> list[dict[str, Any]]:
+        if self._catalog is not None and self._catalog_version == self.storage.catalog_version:
+            now = time.monotonic()
+            if now - self._catalog_checked_at < self.catalog_refresh_seconds:
+                return self._catalog
+            if await self.storage.fetch_catalog_marker() == self._catalog_marker:
+                self._catalog_checked_at = now
+                return self._catalog
+
+        async with self._catalog_lock:
+            version = self.storage.catalog_version
+            fresh = time.monotonic() - self._catalog_checked_at < self.catalog_refresh_seconds
+            if self._catalog is not None and self._catalog_version == version and fresh:
+                return self._catalog
+            # Read the marker before the products so a concurrent write is picked up on the next check.
+            marker = await self.storage.fetch_catalog_marker()
+            self._catalog = await self.storage.load_products()
+            self._catalog_version = version
+            self._catalog_marker = marker
+            self._catalog_checked_at = time.monotonic()
+            return self._catalog
+
+    async def _get_search_index(self) -> ProductSearchIndex:
+        catalog = await self._get_catalog()
+        # The catalog list is replaced, never mutated, when products change; rebuild only then.
+        if self._search_index is None or self._search_index_source is not catalog:
+            self._search_index = ProductSearchIndex(catalog)
+            self._search_index_source = catalog
+        return self._search_index
+
+    async def _get_record_counts(self) -> dict[str, int]:
+        # Probes from every uptime monitor and open storefront tab share one storage round trip per window.
+        if self._record_counts is not None and time.monotonic() - self._record_counts_at < self.health_cache_seconds:
+            return self._record_counts
+        async with self._record_counts_lock:
+            if self._record_counts is not None and time.monotonic() - self._record_counts_at < self.health_cache_seconds:
+                return self._record_counts
+            self._record_counts = await self.storage.count_records()
+            self._record_counts_at = time.monotonic()
+            return self._record_counts
 
     @staticmethod
     def _normalize_postgres_dsn_for_asyncpg(db_url: str) -> str:
@@ -1304,16 +1996,26 @@ class WebsiteBridgeServer:
                 cleaned = dict(tier)
                 cleaned.pop("inventory", None)
                 cleaned["stock"] = self._to_int(cleaned.get("stock"), default=0) or 0
+                cleaned["reserved"] = self._to_int(cleaned.get("reserved"), default=0) or 0
                 public_tiers.append(cleaned)
             public["tiers"] = public_tiers
+        # Keys held by unpaid checkouts; they return to stock if the payment expires or is cancelled.
+        if public.get("tiers"):
+            public["reserved"] = sum(tier["reserved"] for tier in public["tiers"])
+        else:
+            public["reserved"] = self._to_int(public.get("reserved"), default=0) or 0
         return public
 
+    @staticmethod
+    def _normalize_inventory(value: Any) -> Optional[list[str]]:
+        if not isinstance(value, list):
+            return None
+        return [str(item).strip() for item in value if str(item).strip()]
+
     def _normalize_tier(self, tier: dict[str, Any]) -> dict[str, Any]:
-        inventory = tier.get("inventory", [])
-        if not isinstance(inventory, list):
-            inventory = []
-        normalized_inventory = [str(item).strip() for item in inventory if str(item).strip()]
-        return {
+        # Key lists only travel with admin payloads; products loaded from storage carry a stock count instead.
+        normalized_inventory = self._normalize_inventory(tier.get("inventory"))
+        normalized = {
             "id": str(tier.get("id", "")).strip(),
             "name": str(tier.get("name", "")).strip(),
             "description": str(tier.get("description", "")).strip(),
@@ -1321,9 +2023,18 @@ class WebsiteBridgeServer:
             "originalPrice": self._to_float(tier.get("originalPrice"), default=0.0) or 0.0,
             "image": str(tier.get("image", "")).strip(),
             "duration": str(tier.get("duration", "")).strip(),
-            "stock": len(normalized_inventory),
-            "inventory": normalized_inventory,
+            "stock": max(0, self._to_int(tier.get("stock"), default=0) or 0),
         }
+        if normalized_inventory is not None:
+            normalized["stock"] = len(normalized_inventory)
+            normalized["inventory"] = normalized_inventory
+        if "reserved" in tier:
+            normalized["reserved"] = max(0, self._to_int(tier.get("reserved"), default=0) or 0)
+        return normalized
+
+    @staticmethod
+    def _has_tiers(product: dict[str, Any]) -> bool:
+        return isinstance(product.get("tiers"), list) and len(product.get("tiers", [])) > 0
 
     def _find_tier(self, product: dict[str, Any], tier_id: str) -> Optional[dict[str, Any]]:
         tiers = product.get("tiers", [])
@@ -1341,18 +2052,13 @@ class WebsiteBridgeServer:
         if isinstance(tiers, list) and tiers:
             total = 0
             for tier in tiers:
-                if not isinstance(tier, dict):
-                    continue
-                tier_inventory = tier.get("inventory", [])
-                if isinstance(tier_inventory, list):
-                    total += len([str(item).strip() for item in tier_inventory if str(item).strip()])
-                else:
+                if isinstance(tier, dict):
                     total += self._to_int(tier.get("stock"), default=0) or 0
             return max(0, total)
-        inventory = product.get("inventory", [])
-        if not isinstance(inventory, list):
-            return 0
-        return len([str(item).strip() for item in inventory if str(item).strip()])
+        inventory = self._normalize_inventory(product.get("inventory"))
+        if inventory is not None:
+            return len(inventory)
+        return max(0, self._to_int(product.get("stock"), default=0) or 0)
 
     def _normalize_product(self, product: dict[str, Any]) -> dict[str, Any]:
         features = product.get("features", [])
@@ -1371,13 +2077,12 @@ class WebsiteBridgeServer:
             normalized_tier = self._normalize_tier(tier)
             if normalized_tier.get("id"):
                 normalized_tiers.append(normalized_tier)
-        inventory = product.get("inventory", [])
-        if not isinstance(inventory, list):
-            inventory = []
-        normalized_inventory = [str(item).strip() for item in inventory if str(item).strip()]
-        stock_value = self._compute_product_stock({"tiers": normalized_tiers, "inventory": normalized_inventory})
+        normalized_inventory = self._normalize_inventory(product.get("inventory"))
+        stock_value = self._compute_product_stock(
+            {"tiers": normalized_tiers, "inventory": normalized_inventory, "stock": product.get("stock")}
+        )
 
-        return {
+        normalized = {
             "id": str(product.get("id", "")).strip(),
             "name": str(product.get("name", "")).strip(),
             "description": str(product.get("description", "")).strip(),
@@ -1398,13 +2103,17 @@ class WebsiteBridgeServer:
             "showSalesCount": bool(product.get("showSalesCount", False)),
             "liveSalesTimespan": str(product.get("liveSalesTimespan", "all_time")).strip() or "all_time",
             "stock": stock_value,
-            "inventory": normalized_inventory,
             "tiers": normalized_tiers,
             "popular": bool(product.get("popular", False)),
             "featured": bool(product.get("featured", False)),
             "verified": bool(product.get("verified", False)),
             "instantDelivery": bool(product.get("instantDelivery", False)),
         }
+        if normalized_inventory is not None:
+            normalized["inventory"] = normalized_inventory
+        if "reserved" in product:
+            normalized["reserved"] = max(0, self._to_int(product.get("reserved"), default=0) or 0)
+        return normalized
 
     @staticmethod
     def _to_int(value: Any, default: Optional[int]) -> Optional[int]:
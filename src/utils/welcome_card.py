@@ -9,6 +9,7 @@ import aiohttp
 import discord
 from PIL import Image, ImageDraw, ImageFilter, ImageFont
 
+from ..services.http_client import http_client
 from .constants import Colors
 
 # Since Config might not be available or structured differently, we'll define a simple config default or import if available
@@ -189,9 +190,12 @@ def _role_badge_urls(member: discord.Member, *, limit: int = 6) -> list[str]:
     return urls
 
 
+_ASSET_TIMEOUT = aiohttp.ClientTimeout(total=15)
+
+
 async def _fetch_asset_image(session: aiohttp.ClientSession, url: str) -> Optional[Image.Image]:
     try:
-        async with session.get(url) as resp:
+        async with session.get(url, timeout=_ASSET_TIMEOUT) as resp:
             if resp.status != 200:
                 return None
             data = await resp.read()
@@ -228,58 +232,57 @@ async def build_welcome_card_png(
     *,
     options: WelcomeCardOptions = WelcomeCardOptions(),
 ) -> bytes:
-    timeout = aiohttp.ClientTimeout(total=15)
-    async with aiohttp.ClientSession(timeout=timeout) as session:
-        # fetch full user to access banner/decoration when available
-        try:
-            full_user = await bot.fetch_user(member.id)
-        except Exception:
-            full_user = member  # type: ignore[assignment]
+    session = http_client.session()
+    # fetch full user to access banner/decoration when available
+    try:
+        full_user = await bot.fetch_user(member.id)
+    except Exception:
+        full_user = member  # type: ignore[assignment]
 
-        avatar_asset = member.display_avatar
-        try:
-            avatar_url = avatar_asset.replace(size=512, static_format="png").url
-        except Exception:
-            avatar_url = str(avatar_asset.url)
-
-        banner_url: Optional[str] = options.brand_banner_url
-        if not banner_url:
-            banner_asset = getattr(full_user, "banner", None)
-            if banner_asset:
-                try:
-                    banner_url = banner_asset.replace(size=1024).url
-                except Exception:
-                    banner_url = str(banner_asset.url)
-
-        decoration_asset = getattr(full_user, "avatar_decoration", None)
-        decoration_url: Optional[str] = None
-        if decoration_asset:
+    avatar_asset = member.display_avatar
+    try:
+        avatar_url = avatar_asset.replace(size=512, static_format="png").url
+    except Exception:
+        avatar_url = str(avatar_asset.url)
+
+    banner_url: Optional[str] = options.brand_banner_url
+    if not banner_url:
+        banner_asset = getattr(full_user, "banner", None)
+        if banner_asset:
             try:
-                decoration_url = decoration_asset.replace(size=256).url
+                banner_url = banner_asset.replace(size=1024).url
             except Exception:
-                decoration_url = str(getattr(decoration_asset, "url", "") or "")
+                banner_url = str(banner_asset.url)
 
-        bg_img = await _fetch_asset_image(session, banner_url) if banner_url else None
-        avatar_img = await _fetch_asset_image(session, avatar_url)
-        decoration_img = await _fetch_asset_image(session, decoration_url) if decoration_url else None
-        brand_logo_img = (
-            await _fetch_asset_image(session, options.brand_logo_url) if options.brand_logo_url else None
-        )
+    decoration_asset = getattr(full_user, "avatar_decoration", None)
+    decoration_url: Optional[str] = None
+    if decoration_asset:
+        try:
+            decoration_url = decoration_asset.replace(size=256).url
+        except Exception:
+            decoration_url = str(getattr(decoration_asset, "url", "") or "")
+
+    bg_img = await _fetch_asset_image(session, banner_url) if banner_url else None
+    avatar_img = await _fetch_asset_image(session, avatar_url)
+    decoration_img = await _fetch_asset_image(session, decoration_url) if decoration_url else None
+    brand_logo_img = (
+        await _fetch_asset_image(session, options.brand_logo_url) if options.brand_logo_url else None
+    )
 
-        badge_items: list[_BadgeItem] = []
-        for label in _badge_labels(full_user, member=member):  # type: ignore[arg-type]
-            badge_items.append(_BadgeItem(label=label))
-
-        if options.role_badge_fallback and not badge_items:
-            for url in _role_badge_urls(member, limit=6):
-                img = await _fetch_asset_image(session, url)
-                if img is not None:
-                    badge_items.append(_BadgeItem(icon=img))
-                if len(badge_items) >= 6:
-                    break
-            tag = _role_tag_text(member)
-            if tag:
-                badge_items.append(_BadgeItem(label=tag))
+    badge_items: list[_BadgeItem] = []
+    for label in _badge_labels(full_user, member=member):  # type: ignore[arg-type]
+        badge_items.append(_BadgeItem(label=label))
+
+    if options.role_badge_fallback and not badge_items:
+        for url in _role_badge_urls(member, limit=6):
+            img = await _fetch_asset_image(session, url)
+            if img is not None:
+                badge_items.append(_BadgeItem(icon=img))
+            if len(badge_items) >= 6:
+                break
+        tag = _role_tag_text(member)
+        if tag:
+            badge_items.append(_BadgeItem(label=tag))
 
     w, h = options.width, options.height
     accent_rgb = _int_to_rgb(options.accent_color)
@@ -0,0 +1,48 @@
+import contextlib
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from src.services.http_client import http_client
+from src.services.web_bridge import WebsiteBridgeServer
+
+
+class _ApiOnlyBot:
+    guilds = []
+
+    def get_channel(self, channel_id):
+        return None
+
+
+@pytest.fixture
+def bridge(tmp_path, monkeypatch):
+    """Factory for a bridge on JSON storage in ``tmp_path``, served through an aiohttp test client."""
+    env = {
+        "SHOP_DATA_DIR": str(tmp_path / "data"),
+        "SHOP_STORAGE_BACKEND": "json",
+        "BOT_API_KEY": "",
+        "OXAPAY_MERCHANT_API_KEY": "oxapay-test",
+        "STRIPE_SECRET_KEY": "sk_test",
+        "STRIPE_WEBHOOK_SECRET": "whsec_test",
+        "SHOP_RATE_LIMITS": "off",
+    }
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    for name in ("DATABASE_URL", "SUPABASE_DATABASE_URL", "SHOP_WEBHOOK_BASE_URL"):
+        monkeypatch.delenv(name, raising=False)
+
+    @contextlib.asynccontextmanager
+    async def running():
+        server = WebsiteBridgeServer(_ApiOnlyBot(), send_order_logs=False)
+        await server.storage.init()
+        client = TestClient(TestServer(server.app))
+        await client.start_server()
+        try:
+            yield server, client
+        finally:
+            await client.close()
+            await server.fulfilment.stop()
+            await server.storage.close()
+            await http_client.close()
+
+    return running
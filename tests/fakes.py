@@ -0,0 +1,84 @@
+"""Stand-ins for the discord.py objects the transcript code reads; nothing here talks to Discord."""
+
+import random
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import discord
+
+
+class FakeMember(discord.Member):
+    def __init__(self, user_id: int, name: str, bot: bool = False):
+        self._user_id = user_id
+        self._name = name
+        self._bot = bot
+
+    id = property(lambda self: self._user_id)
+    name = property(lambda self: self._name)
+    display_name = property(lambda self: self._name.title())
+    bot = property(lambda self: self._bot)
+    color = property(lambda self: discord.Colour(0x3498DB))
+    display_avatar = property(lambda self: SimpleNamespace(url=f"https://cdn.example/{self._user_id}.png"))
+    avatar = None
+    created_at = property(lambda self: datetime(2020, 1, 1, tzinfo=timezone.utc))
+    joined_at = property(lambda self: datetime(2021, 1, 1, tzinfo=timezone.utc))
+
+
+_CONTENT = [
+    "hello **there** friend",
+    "need help with `order 123` please",
+    "*italic* and __under__ and ~~gone~~",
+    "```py\nprint('hi')\n```",
+    "see [docs](https://example.com) <@123456> in <#999>",
+    "ok",
+    "multi\nline\ncontent with _underscores_here_",
+    "<t:1700000000:R> timestamp",
+]
+
+
+class FakeChannel:
+    def __init__(self, messages: list):
+        self.messages = messages
+        self.name = "ticket-0001"
+        self.id = 555
+        self.created_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        members = {message.author.id: message.author for message in messages}
+        self.guild = SimpleNamespace(name="Guild", id=777, icon=None, get_member=members.get)
+        for message in messages:
+            message.channel = self
+
+    async def history(self, limit=None, after=None, oldest_first=True):
+        messages = [message for message in self.messages if after is None or message.id > after.id]
+        for message in messages[:limit]:
+            yield message
+
+
+def make_messages(count: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    authors = [FakeMember(1000 + index, f"user{index}", bot=index == 0) for index in range(4)]
+    moment = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    messages = []
+    for index in range(count):
+        moment += timedelta(seconds=rng.choice((5, 30, 600)))
+        messages.append(
+            SimpleNamespace(
+                id=10_000 + index,
+                type=discord.MessageType.default,
+                author=rng.choice(authors),
+                content=f"{rng.choice(_CONTENT)} #{index}",
+                edited_at=None,
+                embeds=[],
+                attachments=[],
+                stickers=[],
+                components=[],
+                reactions=[],
+                reference=None,
+                created_at=moment,
+                system_content="",
+            )
+        )
+    return messages
+
+
+def edited(message, content: str):
+    return SimpleNamespace(**{**message.__dict__, "content": content, "edited_at": message.created_at})
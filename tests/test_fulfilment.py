@@ -0,0 +1,57 @@
+import asyncio
+
+
+def _product(keys=5):
+    return {"id": "p1", "name": "Product", "price": 1.0, "inventory": [f"KEY-{n}" for n in range(keys)]}
+
+
+def _paid_entry():
+    order = {"id": "ord-from-client", "items": [{"id": "p1", "productId": "p1", "quantity": 2}], "total": 2.0}
+    return {"order": order, "user": {"id": "u1"}, "paymentMethod": "card", "fulfilment": "queued", "completed": False}
+
+
+def test_paid_checkout_fulfilled_twice_creates_one_order(bridge):
+    async def scenario():
+        async with bridge() as (server, client):
+            await server.storage.save_product(server._normalize_product(_product()))
+            token = "tok-0123456789abcdefXYZ"
+            await server.storage.reserve_stock(token, [("p1", "p1", "", 2)])
+            await server.storage.save_pending_payment(token, _paid_entry())
+
+            # Webhook and /payments/confirm racing each other, say.
+            results = await asyncio.gather(server._run_payment_fulfilment(token), server._run_payment_fulfilment(token))
+            orders = [body["order"] for status, body in results]
+            assert [status for status, _ in results] == [200, 200]
+            assert orders[0]["id"] == orders[1]["id"] == f"ord-{token[:16]}"
+            assert orders[0]["credentials"] == orders[1]["credentials"]
+            assert len(await server.storage.load_orders()) == 1
+            assert len(await server.storage.get_inventory("p1", "")) == 3
+
+    asyncio.run(scenario())
+
+
+def test_completed_and_cancelled_checkouts_leave_the_pending_store(bridge):
+    async def scenario():
+        async with bridge() as (server, client):
+            await server.storage.save_product(server._normalize_product(_product()))
+            paid, cancelled = "tok-paid0123456789", "tok-cancelled0123"
+            for token in (paid, cancelled):
+                await server.storage.reserve_stock(token, [("p1", "p1", "", 2)])
+                await server.storage.save_pending_payment(token, _paid_entry() | {"fulfilment": None})
+
+            status, body = await server._run_payment_fulfilment(paid)
+            assert status == 200
+            response = await client.post("/shop/payments/cancel", json={"token": cancelled})
+            assert (await response.json())["released"] == 2
+
+            assert (await server.storage.count_records())["pendingPayments"] == 0
+            assert len(await server.storage.get_inventory("p1", "")) == 3
+            # The completed checkout is still answered from its order once the entry is archived.
+            response = await client.get(f"/shop/payments/{paid}/status")
+            assert (await response.json())["order"]["id"] == body["order"]["id"]
+            response = await client.post("/shop/payments/confirm", json={"token": paid})
+            assert (await response.json())["status"] == "completed"
+            response = await client.get(f"/shop/payments/{cancelled}/status")
+            assert response.status == 404
+
+    asyncio.run(scenario())
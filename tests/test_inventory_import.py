@@ -0,0 +1,41 @@
+import asyncio
+import json
+
+
+def _tiered_product():
+    return {
+        "id": "p1",
+        "name": "Product",
+        "price": 1.0,
+        "tiers": [{"id": "t1", "name": "Tier", "price": 1.0, "inventory": []}],
+    }
+
+
+def test_lines_import_into_tiered_product_requires_tier(bridge):
+    async def scenario():
+        async with bridge() as (server, client):
+            await server.storage.save_product(server._normalize_product(_tiered_product()))
+            response = await client.post("/shop/inventory/import?productId=p1", data=b"KEY-1\nKEY-2\n")
+            assert response.status == 400
+            assert await server.storage.get_inventory("p1", "") == []
+
+            response = await client.post("/shop/inventory/import?productId=p1&tierId=t1", data=b"KEY-1\nKEY-2\nKEY-2\n")
+            assert response.status == 200
+            summary = json.loads((await response.text()).strip().splitlines()[-1])
+            assert (summary["added"], summary["duplicates"]) == (2, 1)
+            assert sorted(await server.storage.get_inventory("p1", "t1")) == ["KEY-1", "KEY-2"]
+
+    asyncio.run(scenario())
+
+
+def test_csv_rows_without_tier_for_tiered_product_are_skipped(bridge):
+    async def scenario():
+        async with bridge() as (server, client):
+            await server.storage.save_product(server._normalize_product(_tiered_product()))
+            body = b"productId,tierId,key\np1,,KEY-1\np1,t1,KEY-2\n"
+            response = await client.post("/shop/inventory/import?format=csv", data=body)
+            summary = json.loads((await response.text()).strip().splitlines()[-1])
+            assert (summary["added"], summary["skipped"]) == (1, 1)
+            assert await server.storage.get_inventory("p1", "") == []
+
+    asyncio.run(scenario())
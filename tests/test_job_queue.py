@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from src.services.job_queue import JobQueue
+from src.services.metrics import Counter, Gauge
+
+
+def _queue(workers):
+    depth = Gauge("test_queue_depth", "Jobs waiting.")
+    jobs = Counter("test_jobs_total", "Jobs finished.", ("kind", "outcome"))
+    return JobQueue("Test", depth, jobs, workers=workers), jobs
+
+
+def test_jobs_are_deduplicated_while_queued_or_running():
+    async def scenario():
+        queue, jobs = _queue(workers=2)
+        release = asyncio.Event()
+        runs = []
+
+        async def job():
+            runs.append("run")
+            await release.wait()
+            return len(runs)
+
+        first = queue.submit("tok-a", job)
+        await asyncio.sleep(0)
+        assert queue.submit("tok-a", job) is first
+        assert queue.pending("tok-a")
+        release.set()
+        assert await first == 1
+        assert not queue.pending("tok-a")
+        # Once finished, the same key runs again.
+        assert await queue.submit("tok-a", job) == 2
+        assert jobs.render()[-1] == 'test_jobs_total{kind="job",outcome="ok"} 2'
+        await queue.stop()
+
+    asyncio.run(scenario())
+
+
+def test_failed_job_surfaces_its_error_and_frees_the_key():
+    async def scenario():
+        queue, jobs = _queue(workers=1)
+
+        async def fail():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            await queue.submit("tok-a", fail)
+        assert not queue.pending("tok-a")
+        assert jobs.render()[-1] == 'test_jobs_total{kind="job",outcome="error"} 1'
+        await queue.stop()
+
+    asyncio.run(scenario())
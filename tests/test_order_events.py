@@ -0,0 +1,48 @@
+import asyncio
+
+
+class _OrderEvents:
+    """The order event queue of the Postgres backend, reduced to claim and ack."""
+
+    order_events = True
+
+    def __init__(self, events):
+        self.events = events
+        self.order_events_ready = asyncio.Event()
+        self.acked: list[int] = []
+        self.claimed = asyncio.Event()
+
+    async def claim_order_events(self, limit, lease):
+        self.claimed.set()
+        return [event for event in self.events if event[0] not in self.acked]
+
+    async def ack_order_events(self, event_ids):
+        self.acked.extend(event_ids)
+
+
+def test_order_events_are_only_acked_once_their_log_is_sent(bridge):
+    async def scenario():
+        async with bridge() as (server, client):
+            storage = server.storage
+            events = _OrderEvents([(1, {"id": "ord-a"}), (2, {"id": "ord-b"}), (3, {"id": "ord-c"})])
+
+            async def send_order_log(order, user_data, payment_method):
+                if order["id"] == "ord-b":
+                    return False  # channel not resolvable yet
+                if order["id"] == "ord-c":
+                    raise RuntimeError("discord is down")
+                return True
+
+            server.storage = events
+            server._send_order_log = send_order_log
+            consumer = asyncio.create_task(server._consume_order_events())
+            try:
+                await asyncio.wait_for(events.claimed.wait(), 5)
+                await asyncio.sleep(0)
+            finally:
+                consumer.cancel()
+                await asyncio.gather(consumer, return_exceptions=True)
+                server.storage = storage
+            assert events.acked == [1]
+
+    asyncio.run(scenario())
@@ -0,0 +1,36 @@
+from src.services import rate_limit
+from src.services.rate_limit import TokenBucketLimiter, parse_rate_limits
+
+
+def test_bucket_allows_a_burst_then_refills_at_the_rate(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: clock[0])
+    limiter = TokenBucketLimiter(rate=2, burst=3)
+
+    assert [limiter.acquire("client") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.acquire("client") == 0.5
+    assert limiter.acquire("other") == 0.0
+    clock[0] += 0.5
+    assert limiter.acquire("client") == 0.0
+    assert limiter.acquire("client") == 0.5
+
+
+def test_full_buckets_are_pruned_when_the_client_limit_is_reached(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: clock[0])
+    limiter = TokenBucketLimiter(rate=1, burst=2, max_clients=2)
+    limiter.acquire("a")
+    limiter.acquire("b")
+    clock[0] += 10
+    limiter.acquire("c")
+    assert set(limiter._buckets) == {"c"}
+
+
+def test_parse_rate_limits():
+    defaults = {"catalog": (10.0, 30.0), "chat": (0.2, 3.0)}
+    assert parse_rate_limits("off", defaults) is None
+    assert parse_rate_limits("chat=1/5, checkout=2, bogus=x", defaults) == {
+        "catalog": (10.0, 30.0),
+        "chat": (1.0, 5.0),
+        "checkout": (2.0, 2.0),
+    }
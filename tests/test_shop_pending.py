@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta, timezone
+
+from src.services.shop_pending import PendingPaymentStore
+
+
+def _store(tmp_path):
+    store = PendingPaymentStore(
+        tmp_path / "pending.json",
+        tmp_path / "pending.journal",
+        tmp_path / "pending.archive.jsonl",
+    )
+    store.load()
+    return store
+
+
+def test_entry_with_expires_at_is_archived(tmp_path):
+    store = _store(tmp_path)
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    store.put("a", {"expiresAt": (now + timedelta(minutes=5)).isoformat()})
+    store.put("b", {"expiresAt": (now + timedelta(hours=1)).isoformat()})
+
+    assert store.expire(now + timedelta(minutes=10), timedelta(hours=2)) == ["a"]
+    assert list(store.entries) == ["b"]
+    assert '"token":"a"' in (tmp_path / "pending.archive.jsonl").read_text(encoding="utf-8")
+
+
+def test_entry_without_expires_at_expires_after_fallback_ttl(tmp_path):
+    store = _store(tmp_path)
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    store.put("a", {"createdAt": (now - timedelta(hours=1)).isoformat()})
+
+    # Still inside the fallback TTL: the first sweep must keep it scheduled rather than drop it from the heap.
+    assert store.expire(now, timedelta(hours=2)) == []
+    assert "a" in store.entries
+    assert store.expire(now + timedelta(hours=3), timedelta(hours=2)) == ["a"]
+    assert store.entries == {}
+
+
+def test_re_put_with_later_expiry_is_not_expired_early(tmp_path):
+    store = _store(tmp_path)
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    store.put("a", {"expiresAt": (now + timedelta(minutes=5)).isoformat()})
+    store.put("a", {"expiresAt": (now + timedelta(minutes=30)).isoformat()})
+
+    assert store.expire(now + timedelta(minutes=10), timedelta(hours=2)) == []
+    assert store.expire(now + timedelta(minutes=31), timedelta(hours=2)) == ["a"]
+
+
+def test_entries_survive_reload(tmp_path):
+    store = _store(tmp_path)
+    store.put("a", {"createdAt": "2026-01-01T00:00:00+00:00"})
+    store.compact()
+    store.put("b", {"createdAt": "2026-01-01T00:00:00+00:00"})
+
+    reloaded = _store(tmp_path)
+    assert set(reloaded.entries) == {"a", "b"}
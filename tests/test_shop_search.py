@@ -0,0 +1,36 @@
+from src.services.shop_search import ProductSearchIndex, search_terms
+
+
+def _catalog():
+    return [
+        {"id": "a", "name": "Spotify Premium", "description": "music", "stock": 5, "price": 3},
+        {"id": "b", "name": "Netflix", "features": ["4K", "premium screens"], "stock": 2, "price": 5},
+        {"id": "c", "name": "Disney", "description": "premium family plan", "stock": 9, "price": 4},
+        {"id": "d", "name": "Netflix Basic", "stock": 0, "price": 2},
+    ]
+
+
+def test_search_terms_are_lowercased_deduplicated_and_skip_short_words():
+    assert search_terms("Netflix 4K UHD netflix a") == ["netflix", "uhd"]
+
+
+def test_results_rank_by_field_then_stock_then_price():
+    index = ProductSearchIndex(_catalog())
+    assert [product["id"] for product in index.search("premium")] == ["a", "b", "c"]
+    # A query word matches inside longer words, the same as a substring check would.
+    assert [product["id"] for product in index.search("net")] == ["b", "d"]
+    assert [product["id"] for product in index.search("net", in_stock_only=True)] == ["b"]
+    assert [product["id"] for product in index.search("netflix premium", limit=1)] == ["b"]
+
+
+def test_query_words_match_anywhere_inside_a_word():
+    index = ProductSearchIndex([{"id": "x", "name": "NetflixPremium bundle", "stock": 1, "price": 9}])
+    for query in ("flix", "premium", "xpre", "bundle", "ndl"):
+        assert [product["id"] for product in index.search(query)] == ["x"], query
+    assert index.search("premiums") == []
+
+
+def test_query_without_searchable_words_matches_nothing():
+    index = ProductSearchIndex(_catalog())
+    assert index.search("4k") == []
+    assert index.search("zzz") == []
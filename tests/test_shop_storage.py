@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from src.services.shop_storage import InsufficientStock
+
+
+def _product():
+    return {
+        "id": "p1",
+        "name": "Product",
+        "price": 1.0,
+        "inventory": ["KEY-0", "KEY-1", "KEY-2", "KEY-3"],
+    }
+
+
+def test_reserve_release_and_deliver_keep_every_key_accounted_for(bridge):
+    async def scenario():
+        async with bridge() as (server, client):
+            storage = server.storage
+            await storage.save_product(server._normalize_product(_product()))
+
+            await storage.reserve_stock("hold-a", [("p1", "p1", "", 2)])
+            assert len(await storage.get_inventory("p1", "")) == 2
+            # Reserving the same hold again holds nothing more.
+            await storage.reserve_stock("hold-a", [("p1", "p1", "", 2)])
+            assert len(await storage.get_inventory("p1", "")) == 2
+
+            with pytest.raises(InsufficientStock):
+                await storage.reserve_stock("hold-b", [("p1", "p1", "", 3)])
+            assert len(await storage.get_inventory("p1", "")) == 2
+            assert await storage.release_stock("hold-b") == 0
+
+            order = await storage.commit_purchase({"id": "ord-a", "items": []}, [("p1", "p1", "", 2)], hold_id="hold-a")
+            delivered = order["credentials"]["p1"].split("\n")
+            assert len(delivered) == 2
+            # A delivered hold has nothing left to release, and its keys never come back to stock.
+            assert await storage.release_stock("hold-a") == 0
+            stock = await storage.get_inventory("p1", "")
+            assert len(stock) == 2 and not set(stock) & set(delivered)
+
+            await storage.reserve_stock("hold-c", [("p1", "p1", "", 2)])
+            assert await storage.get_inventory("p1", "") == []
+            assert await storage.release_stock("hold-c") == 2
+            assert sorted(await storage.get_inventory("p1", "")) == sorted(stock)
+
+    asyncio.run(scenario())
+
+
+def test_commit_purchase_without_enough_stock_changes_nothing(bridge):
+    async def scenario():
+        async with bridge() as (server, client):
+            storage = server.storage
+            await storage.save_product(server._normalize_product(_product()))
+            await storage.reserve_stock("hold-a", [("p1", "p1", "", 3)])
+
+            with pytest.raises(InsufficientStock):
+                await storage.commit_purchase({"id": "ord-b", "items": []}, [("p1", "p1", "", 2)])
+            assert await storage.get_order("ord-b") is None
+            assert len(await storage.get_inventory("p1", "")) == 1
+            assert await storage.release_stock("hold-a") == 3
+
+    asyncio.run(scenario())
+
+
+def test_commit_purchase_is_idempotent_on_the_order_id(bridge):
+    async def scenario():
+        async with bridge() as (server, client):
+            storage = server.storage
+            await storage.save_product(server._normalize_product(_product()))
+
+            first = await storage.commit_purchase({"id": "ord-a", "items": []}, [("p1", "p1", "", 1)])
+            again = await storage.commit_purchase({"id": "ord-a", "items": []}, [("p1", "p1", "", 1)])
+            assert again["credentials"] == first["credentials"]
+            assert len(await storage.load_orders()) == 1
+            assert len(await storage.get_inventory("p1", "")) == 3
+
+    asyncio.run(scenario())
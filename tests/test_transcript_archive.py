@@ -0,0 +1,37 @@
+import io
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("tortoise")
+
+from src.services.transcript_archive import TranscriptArchive  # noqa: E402
+from src.services.transcript_service import RenderedTranscript  # noqa: E402
+
+
+def _transcript(html: str) -> RenderedTranscript:
+    data = html.encode("utf-8")
+    return RenderedTranscript(io.BytesIO(data), 3, {1000: 2, 1001: 1}, len(data))
+
+
+def test_archived_transcript_reads_back_unchanged(tmp_path):
+    archive = TranscriptArchive(tmp_path)
+    html = "<html>" + "message " * 10000 + "</html>"
+    digest, stored_size = archive.write(_transcript(html))
+    assert stored_size < len(html)
+
+    # The same HTML is stored once, under the same digest.
+    assert archive.write(_transcript(html)) == (digest, stored_size)
+    assert len(list(tmp_path.rglob("*.html.gz"))) == 1
+
+    record = SimpleNamespace(digest=digest, total_messages=3, participants={"1000": 2, "1001": 1})
+    restored = archive.read(record)
+    try:
+        assert restored.read_html() == html
+        assert restored.participants == {1000: 2, 1001: 1}
+        assert restored.size == len(html)
+    finally:
+        restored.close()
+
+    record.digest = "0" * 64
+    assert archive.read(record) is None
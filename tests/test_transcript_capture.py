@@ -0,0 +1,70 @@
+import asyncio
+import re
+
+from src.services.transcript_capture import TranscriptCapture
+from src.services.transcript_service import generate_transcript
+from tests.fakes import FakeChannel, edited, make_messages
+
+
+def _html(transcript) -> str:
+    try:
+        return re.sub(r"generated on [^<\"(]*", "", transcript.read_html())
+    finally:
+        transcript.close()
+
+
+def test_stitched_journal_matches_history_after_restart(tmp_path):
+    async def scenario():
+        messages = make_messages(300)
+        channel = FakeChannel(messages)
+        capture = TranscriptCapture(tmp_path)
+        capture.start(channel.id)
+        for message in messages[:-20]:  # the last 20 are posted while the bot is offline
+            capture.record(message)
+        channel.messages[10] = edited(messages[10], "**changed**")
+        capture.record(channel.messages[10])
+        capture.record_deleted(channel.id, [messages[20].id, messages[21].id])
+        del channel.messages[20:22]
+        await capture.flush()
+
+        restarted = TranscriptCapture(tmp_path)
+        await restarted.resume([channel.id, 424242])
+        assert restarted.tracked == {channel.id}
+        stitched = await restarted.render(channel)
+        assert stitched.total_messages == len(channel.messages)
+        assert _html(stitched) == _html(await generate_transcript(channel))
+
+    asyncio.run(scenario())
+
+
+def test_records_are_written_off_the_event_loop(tmp_path):
+    async def scenario():
+        messages = make_messages(50)
+        channel = FakeChannel(messages)
+        capture = TranscriptCapture(tmp_path)
+        capture.start(channel.id)
+        for message in messages:
+            capture.record(message)
+        journal = tmp_path / f"{channel.id}.jsonl"
+        # Nothing has touched the disk yet: the writes are queued for the flush task.
+        assert not journal.exists()
+        version = capture.version(channel.id)
+        await capture.flush()
+        assert journal.stat().st_size == version > 0
+
+    asyncio.run(scenario())
+
+
+def test_discard_drops_buffered_records(tmp_path):
+    async def scenario():
+        messages = make_messages(10)
+        channel = FakeChannel(messages)
+        capture = TranscriptCapture(tmp_path)
+        capture.start(channel.id)
+        for message in messages:
+            capture.record(message)
+        await capture.discard(channel.id)
+        await capture.flush()
+        assert list(tmp_path.iterdir()) == []
+
+    asyncio.run(scenario())
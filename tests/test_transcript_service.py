@@ -0,0 +1,32 @@
+import pytest
+
+from src.services.transcript_service import parse_markdown_basic
+
+
+@pytest.mark.parametrize(
+    ("text", "html"),
+    [
+        ("**bold** *it* __u__ ~~s~~", "<strong>bold</strong> <em>it</em> <u>u</u> <s>s</s>"),
+        ("**bold *it***", "<strong>bold <em>it</em></strong>"),
+        ("***a** b*", "<em><strong>a</strong> b</em>"),
+        ("**a*b** and **c**", "<strong>a*b</strong> and <strong>c</strong>"),
+        ("`**not bold**` <x>", '<span class="pre pre--inline">**not bold**</span> &lt;x&gt;'),
+        ("```py\n<b>**x**\n```", '<div class="pre pre--multiline language-py">&lt;b&gt;**x**</div>'),
+        ("[**docs**](https://example.com)", '<a href="https://example.com"><strong>docs</strong></a>'),
+        ("<@123> <#9>", '<span class="mention" title="123">@User</span> <span class="mention" title="9">#channel</span>'),
+        ("one\ntwo", "one<br>two"),
+    ],
+)
+def test_markdown_is_rendered_in_one_pass(text, html):
+    assert parse_markdown_basic(text) == html
+
+
+def test_long_markdown_skips_the_cache_but_renders_the_same():
+    text = "**bold** " * 400
+    assert parse_markdown_basic(text) == "<strong>bold</strong> " * 400
+
+
+def test_unclosed_delimiters_do_not_backtrack_exponentially():
+    # Each "*a" could start or end an italic run inside the bold one; none of them may be tried twice.
+    text = "**" + "a*" * 4000
+    assert "<strong>" not in parse_markdown_basic(text)
@@ -0,0 +1,133 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import time
+
+
+def _oxapay_callback(payload):
+    body = json.dumps(payload).encode("utf-8")
+    signature = hmac.new(b"oxapay-test", body, hashlib.sha512).hexdigest()
+    return body, {"HMAC": signature, "Content-Type": "application/json"}
+
+
+def _stripe_event(token, timestamp=None):
+    event = {
+        "type": "checkout.session.completed",
+        "data": {"object": {"id": "cs_test_1", "payment_status": "paid", "metadata": {"token": token}}},
+    }
+    return _stripe_signed(event, timestamp)
+
+
+def _stripe_signed(payload, timestamp=None):
+    body = json.dumps(payload).encode("utf-8")
+    timestamp = str(int(time.time()) if timestamp is None else timestamp)
+    signature = hmac.new(b"whsec_test", timestamp.encode("utf-8") + b"." + body, hashlib.sha256).hexdigest()
+    return body, {"Stripe-Signature": f"t={timestamp},v1={signature}", "Content-Type": "application/json"}
+
+
+def _pending(track_id=None):
+    entry = {"order": {"items": []}, "user": {}, "paymentMethod": "crypto", "gateway": "oxapay", "completed": False}
+    if track_id is not None:
+        entry["oxapayTrackId"] = track_id
+    return entry
+
+
+def test_oxapay_callback_with_bad_signature_is_rejected(bridge):
+    async def scenario():
+        async with bridge() as (server, client):
+            await server.storage.save_pending_payment("tok-a", _pending("111"))
+            body, headers = _oxapay_callback({"status": "Paid", "trackId": "111", "orderId": "tok-a"})
+            headers["HMAC"] = "0" * 128
+            response = await client.post("/shop/webhooks/oxapay", data=body, headers=headers)
+            assert response.status == 400
+            assert "fulfilment" not in await server.storage.get_pending_payment("tok-a")
+
+    asyncio.run(scenario())
+
+
+def test_oxapay_callback_is_matched_by_signed_order_id(bridge):
+    async def scenario():
+        async with bridge() as (server, client):
+            await server.storage.save_pending_payment("tok-a", _pending("111"))
+            await server.storage.save_pending_payment("tok-b", _pending("222"))
+            # The unsigned query token points elsewhere; the signed orderId wins.
+            body, headers = _oxapay_callback({"status": "Paid", "trackId": "111", "orderId": "tok-a"})
+            response = await client.post("/shop/webhooks/oxapay?token=tok-b", data=body, headers=headers)
+            assert response.status == 200
+            assert (await server.storage.get_pending_payment("tok-a")).get("oxapayStatus") == "paid"
+            assert "oxapayStatus" not in await server.storage.get_pending_payment("tok-b")
+
+    asyncio.run(scenario())
+
+
+def test_oxapay_callback_replayed_against_another_token_is_rejected(bridge):
+    async def scenario():
+        async with bridge() as (server, client):
+            await server.storage.save_pending_payment("cheap", _pending("111"))
+            await server.storage.save_pending_payment("victim", _pending("222"))
+            await server.storage.save_pending_payment("untracked", _pending())
+            # A validly signed callback for the cheap invoice, from before orderId carried the token.
+            body, headers = _oxapay_callback({"status": "Paid", "trackId": "111", "orderId": "client-order-1"})
+            for token in ("victim", "untracked"):
+                response = await client.post(f"/shop/webhooks/oxapay?token={token}", data=body, headers=headers)
+                assert response.status == 409
+                assert "fulfilment" not in await server.storage.get_pending_payment(token)
+
+    asyncio.run(scenario())
+
+
+def test_stripe_event_with_bad_or_stale_signature_is_rejected(bridge):
+    async def scenario():
+        async with bridge() as (server, client):
+            await server.storage.save_pending_payment("tok-a", _pending())
+            body, headers = _stripe_event("tok-a")
+            forged = dict(headers, **{"Stripe-Signature": headers["Stripe-Signature"].replace("v1=", "v1=0")})
+            # Correctly signed, but older than the tolerance: a captured event being replayed.
+            stale_body, stale_headers = _stripe_event("tok-a", timestamp=int(time.time()) - 3600)
+            for data, sent in ((body, forged), (stale_body, stale_headers), (body + b" ", headers)):
+                response = await client.post("/shop/webhooks/stripe", data=data, headers=sent)
+                assert response.status == 400
+            assert "fulfilment" not in await server.storage.get_pending_payment("tok-a")
+
+    asyncio.run(scenario())
+
+
+def test_stripe_event_delivered_twice_queues_one_fulfilment(bridge):
+    async def scenario():
+        async with bridge() as (server, client):
+            await server.storage.save_pending_payment("tok-a", _pending() | {"paymentMethod": "card", "gateway": "stripe"})
+            queued = []
+
+            async def queue(token, payment_method, details):
+                queued.append(token)
+                await server.storage.update_pending_payment(token, lambda entry: entry | {"fulfilment": "queued"})
+
+            server._queue_verified_payment = queue
+            body, headers = _stripe_event("tok-a")
+            for _ in range(2):
+                response = await client.post("/shop/webhooks/stripe", data=body, headers=headers)
+                assert response.status == 200
+            assert queued == ["tok-a"]
+
+    asyncio.run(scenario())
+
+
+def test_signed_events_of_unexpected_shape_are_acknowledged(bridge):
+    async def scenario():
+        async with bridge() as (server, client):
+            shapes = [
+                [],
+                "checkout.session.completed",
+                {"type": "checkout.session.completed", "data": []},
+                {"type": "checkout.session.completed", "data": {"object": "cs_test_1"}},
+            ]
+            for payload in shapes:
+                body, headers = _stripe_signed(payload)
+                response = await client.post("/shop/webhooks/stripe", data=body, headers=headers)
+                assert response.status == 200
+                body, headers = _oxapay_callback(payload)
+                response = await client.post("/shop/webhooks/oxapay", data=body, headers=headers)
+                assert response.status == 200
+
+    asyncio.run(scenario())